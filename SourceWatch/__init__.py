@@ -1,5 +1,15 @@
 from .query import Query
-from .server import Server
+from .async_query import AsyncQuery
+from .scanner import Scanner, ScanResult
+from .pool import QueryPool
+from .master import MasterServer
+from .server import CompactServer, Server, ServerRegistry
+from .cache import ChallengeCache, ResponseCache
+from .scheduler import RttScheduler
+from .resolver import Resolver
+from .changes import Change, SnapshotStore
+from .fleet import FleetStore
+from .metrics import HistogramCollector, QueryHooks
 from .buffer import SteamPacketBuffer
 from .packet import (
     InfoRequest,
@@ -18,7 +28,23 @@ from .models import (
 
 __all__ = [
     "Query",
+    "AsyncQuery",
+    "Scanner",
+    "ScanResult",
+    "QueryPool",
+    "MasterServer",
     "Server",
+    "CompactServer",
+    "ServerRegistry",
+    "ChallengeCache",
+    "ResponseCache",
+    "RttScheduler",
+    "Resolver",
+    "Change",
+    "SnapshotStore",
+    "FleetStore",
+    "QueryHooks",
+    "HistogramCollector",
     "SteamPacketBuffer",
     "BasicServerModel",
     "InfoRequest",
@@ -0,0 +1,334 @@
+"""
+Asyncio flavour of SourceWatch.Query.
+
+Every query owns a datagram endpoint on the running event loop instead of a
+blocking socket, so thousands of servers can be queried concurrently from a
+single thread.
+"""
+
+import asyncio
+import logging
+import socket
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from .buffer import SteamPacketReader
+from .cache import ChallengeCache, ResponseCache
+from .server import AnyServer, Server
+from .packet import (
+    NO_CHALLENGE,
+    ChallengeResponse,
+    Challengeable,
+    InfoRequest,
+    PlayersRequest,
+    RequestPacket,
+    ResponsePacket,
+    RulesRequest,
+    SourceWatchError,
+    create_response,
+)
+from .models import (
+    InfoResponseModel,
+    PlayersResponseModel,
+    RulesResponseModel,
+)
+from .query import (
+    REQUEST_PACKETS,
+    RESULT_FORMATS,
+    format_result,
+    is_expected_response,
+)
+from .reassembly import Reassembler
+from .resolver import Resolver, address_family, default_resolver
+from .scheduler import RttScheduler
+
+# Requested receive buffer of shared sockets, in bytes.
+RECEIVE_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+class QueryProtocol(asyncio.DatagramProtocol):
+    """Datagram protocol routing incoming packets by their source address.
+
+    Split responses are reassembled before they are handed out, so every
+    queue receives complete responses, or the SourceWatchError raised while
+    reading an invalid one.
+    """
+
+    def __init__(self) -> None:
+        self.logger = logging.getLogger("SourceWatch")
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self._queues: Dict[Tuple[str, int], asyncio.Queue] = {}
+        self._reassembler = Reassembler()
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: Tuple[Any, ...]) -> None:
+        queue = self._queues.get(addr[:2])
+        if queue is None:
+            self.logger.debug("Dropping datagram from unknown source %s", addr)
+            return
+        try:
+            packet = self._reassembler.feed(data, source=addr[:2])
+        except SourceWatchError as error:
+            queue.put_nowait(error)
+        else:
+            if packet is not None:
+                queue.put_nowait(packet)
+
+    def error_received(self, exc: Exception) -> None:
+        self.logger.debug("Datagram error: %s", exc)
+
+    def register(self, addr: Tuple[str, int]) -> asyncio.Queue:
+        """Start collecting datagrams sent from the given address."""
+        if addr in self._queues:
+            raise SourceWatchError("Address already registered", addr)
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues[addr] = queue
+        return queue
+
+    def unregister(self, addr: Tuple[str, int]) -> None:
+        self._queues.pop(addr, None)
+
+    def sendto(self, data: bytes, addr: Tuple[str, int]) -> None:
+        if self.transport is None:
+            raise SourceWatchError("Endpoint is not connected")
+        self.transport.sendto(data, addr)
+
+
+async def create_endpoint(
+    receive_buffer: int = RECEIVE_BUFFER_SIZE, family: int = socket.AF_INET
+) -> QueryProtocol:
+    """Open an unconnected UDP socket that can talk to any number of servers.
+
+    The receive buffer is enlarged so bursts of replies from many servers
+    are not dropped by the kernel. It is capped by the system limit
+    (net.core.rmem_max on Linux).
+    """
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        QueryProtocol, family=family
+    )
+    sock = transport.get_extra_info("socket")
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+    except OSError as error:
+        protocol.logger.debug("Could not set the receive buffer size: %s", error)
+    return protocol
+
+
+class AsyncQuery:
+    """
+    Example usage:
+
+    import asyncio
+    import SourceWatch
+
+    async def main():
+        async with SourceWatch.AsyncQuery('1.2.3.4', 27015) as server:
+            print(await server.ping())
+            print(await server.info())
+            print(await server.players())
+            print(await server.rules())
+
+    asyncio.run(main())
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 27015,
+        timeout: int = 10,
+        protocol: Optional[QueryProtocol] = None,
+        challenge_cache: Optional[ChallengeCache] = None,
+        result_format: str = "dict",
+        scheduler: Optional[RttScheduler] = None,
+        response_cache: Optional[ResponseCache] = None,
+        resolver: Optional[Resolver] = None,
+        server: Optional[AnyServer] = None,
+    ) -> None:
+        """Pass an existing `protocol` to share its socket with other queries.
+        Its address family must match the one of the server. Replies are
+        routed by source address, so only one query per server address may be
+        open on a shared protocol at a time; a second one raises
+        SourceWatchError until the first is closed.
+
+        Without a `protocol` the query opens a socket of its own on the first
+        request. Call close(), or use the query as an async context manager,
+        to release it.
+
+        See Query for the other options.
+        """
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result format: {result_format}")
+        self.logger = logging.getLogger("SourceWatch")
+        self.server: Optional[AnyServer] = None
+        self._resolved = server
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._result_format = result_format
+        self._scheduler = scheduler
+        self._response_cache = response_cache
+        self._resolver = resolver if resolver is not None else default_resolver
+        self._protocol = protocol
+        self._owns_protocol = protocol is None
+        self._queue: Optional[asyncio.Queue] = None
+        self._challenges = (
+            challenge_cache if challenge_cache is not None else ChallengeCache()
+        )
+
+    async def __aenter__(self) -> "AsyncQuery":
+        await self._connect()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        # Last resort only, the socket may stay open until garbage collection.
+        if getattr(self, "_queue", None) is not None:
+            try:
+                self.close()
+            except RuntimeError:
+                # The event loop is already closed.
+                pass
+
+    async def _resolve(self) -> AnyServer:
+        if self._resolved is not None:
+            return self._resolved
+        ip = await self._resolver.resolve_async(self._host)
+        return Server(ip, self._port)
+
+    async def _connect(self) -> None:
+        if self._queue is not None:
+            return
+        self.server = await self._resolve()
+        self.logger.info("Connecting to %s", self.server)
+        if self._protocol is None:
+            self._protocol = await create_endpoint(
+                family=address_family(self.server.ip)
+            )
+        try:
+            self._queue = self._protocol.register(self.server.as_tuple())
+        except SourceWatchError:
+            if self._owns_protocol:
+                self._protocol.transport.close()
+                self._protocol = None
+            raise
+
+    def close(self) -> None:
+        if self._queue is None:
+            return
+        self._protocol.unregister(self.server.as_tuple())
+        if self._owns_protocol:
+            self._protocol.transport.close()
+            self._protocol = None
+        self._queue = None
+
+    def _discard_pending(self) -> None:
+        """Drop stale datagrams left over from earlier requests."""
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+    async def _receive(self, request: RequestPacket) -> SteamPacketReader:
+        while True:
+            packet = await self._queue.get()
+            if isinstance(packet, SourceWatchError):
+                raise packet
+            if is_expected_response(request, packet):
+                return packet
+            self.logger.debug("Dropping stale response to %s", request)
+
+    async def _send(self, packet: RequestPacket) -> ResponsePacket:
+        await self._connect()
+
+        if not isinstance(packet, Challengeable):
+            return await self._exchange(packet)
+
+        challenge = self._challenges.get(self.server)
+        packet.challenge = NO_CHALLENGE if challenge is None else challenge
+        self.logger.debug("Using challenge: %s", packet.challenge)
+        response = await self._exchange(packet)
+
+        if isinstance(response, ChallengeResponse):
+            # The challenge was missing or expired. Retry once with the new one.
+            packet.challenge = response.raw
+            self._challenges.set(self.server, packet.challenge)
+            self.logger.debug("Retrying with challenge: %s", packet.challenge)
+            response = await self._exchange(packet)
+
+        return response
+
+    async def _exchange(self, packet: RequestPacket) -> ResponsePacket:
+        if self._scheduler is None:
+            return await self._roundtrip(packet, self._timeout)
+
+        for attempt in range(self._scheduler.retries + 1):
+            timeout = self._scheduler.timeout(self.server, attempt)
+            try:
+                response = await self._roundtrip(packet, timeout)
+            except asyncio.TimeoutError:
+                if attempt == self._scheduler.retries:
+                    self._scheduler.failure(self.server)
+                    raise
+                self.logger.debug("Retrying request to %s", self.server)
+            else:
+                self._scheduler.observe(self.server, response.ping)
+                return response
+
+    async def _roundtrip(self, packet: RequestPacket, timeout: float) -> ResponsePacket:
+        self._discard_pending()
+        self.logger.debug("Sending packet: %s", packet)
+        timer_start = time.perf_counter()
+        self._protocol.sendto(packet.as_bytes(), self.server.as_tuple())
+        result = await asyncio.wait_for(self._receive(packet), timeout)
+        response_type = result.read_byte()
+        # Reset buffer position and skip reading the request format.
+        result.seek(0)
+        result.read_long()
+        ping = round((time.perf_counter() - timer_start) * 1000, 2)
+        response = create_response(response_type, result, ping)
+        self.logger.debug("Received package: %s", response)
+
+        return response
+
+    def request(request: Callable) -> Callable:
+        async def wrapper(self: "AsyncQuery") -> Optional[Dict[str, Any]]:
+            response = await request(self)
+            return format_result(
+                response, self.server, self._result_format, self._response_cache
+            )
+
+        return wrapper
+
+    async def ping(self, num_requests: int = 3) -> float:
+        """Fake ping request. Send InfoRequests and calculate an average ping."""
+        self.logger.info("Sending fake ping request")
+        total = 0.0
+        for _ in range(num_requests):
+            response = await self._send(InfoRequest())
+            total += response.ping
+        return round(total / num_requests, 2)
+
+    async def fetch(self, request: str) -> ResponsePacket:
+        """See Query.fetch."""
+        self.logger.info("Sending %s request", request)
+        return await self._send(REQUEST_PACKETS[request]())
+
+    @request
+    async def info(self) -> InfoResponseModel:
+        """Request basic server information."""
+        self.logger.info("Sending info request")
+        return await self._send(InfoRequest())
+
+    @request
+    async def players(self) -> PlayersResponseModel:
+        """Request players."""
+        self.logger.info("Sending players request")
+        return await self._send(PlayersRequest())
+
+    @request
+    async def rules(self) -> RulesResponseModel:
+        """Request server rules."""
+        self.logger.info("Sending rules request")
+        return await self._send(RulesRequest())
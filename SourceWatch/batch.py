@@ -0,0 +1,107 @@
+"""
+Decode many raw responses in one call.
+
+decode_batch() takes (server, datagram, rtt) tuples as they come off the
+socket and dispatches every datagram on its response header byte straight
+to SourceWatch.decoders, without building buffers or packet objects in
+between. Decoding dominates either way, so a single process decodes at
+about the speed of the per-packet path (see benchmarks/batch.py); the gain
+is one call with per-item errors. Large batches can be split across worker
+processes.
+
+Example usage:
+
+from SourceWatch.batch import decode_batch
+
+for item in decode_batch(received, workers=4):
+    print(item.server, item.request, item.result or item.error)
+"""
+
+import multiprocessing
+import multiprocessing.pool
+import struct
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .decoders import decode_goldsrc_info, decode_info, decode_players, decode_rules
+from .packet import (
+    InfoGoldSrcResponse,
+    InfoResponse,
+    PlayersResponse,
+    RulesResponse,
+    SourceWatchError,
+)
+from .query import SINGLE_PACKET_HEADER
+from .scanner import ScanResult
+from .utils import chunked
+
+# Response header -> request name and decoder of the payload.
+DECODERS: Dict[int, Tuple[str, Callable[[bytes, int], Any]]] = {
+    InfoResponse.RESPONSE_HEADER: ("info", decode_info),
+    InfoGoldSrcResponse.RESPONSE_HEADER: ("info", decode_goldsrc_info),
+    PlayersResponse.RESPONSE_HEADER: ("players", decode_players),
+    RulesResponse.RESPONSE_HEADER: ("rules", decode_rules),
+}
+# Raised by the decoders for truncated or otherwise malformed payloads.
+DECODE_ERRORS = (SourceWatchError, struct.error, UnicodeDecodeError, IndexError)
+
+# (server, raw datagram including its packet header, round trip time in ms)
+BatchItem = Tuple[Any, bytes, float]
+
+
+def _decode(items: Sequence[BatchItem]) -> List[ScanResult]:
+    results = []
+    append = results.append
+    decoders = DECODERS
+    for server, data, rtt in items:
+        request = None
+        try:
+            if data[:4] != SINGLE_PACKET_HEADER:
+                raise SourceWatchError("Not a single packet response")
+            entry = decoders.get(data[4])
+            if entry is None:
+                raise SourceWatchError("Unknown response type", data[4])
+            request, decode = entry
+            result = {
+                request: decode(data, 5),
+                "server": {"ip": server.ip, "port": server.port, "ping": rtt},
+            }
+        except DECODE_ERRORS as error:
+            append(ScanResult(server, request, None, error))
+        else:
+            append(ScanResult(server, request, result, None))
+    return results
+
+
+def decode_batch(
+    items: Sequence[BatchItem],
+    workers: int = 1,
+    chunk_size: int = 2000,
+    pool: Optional[multiprocessing.pool.Pool] = None,
+) -> List[ScanResult]:
+    """Decode raw info, players and rules responses.
+
+    Returns one ScanResult per item, in the order of `items`. Results are
+    shaped like the dict results of Query, with the rtt as ping. Malformed
+    datagrams, split fragments and unknown responses set the error of their
+    item instead of raising; `request` is None if the type is unknown.
+
+    With more than one worker, or an existing multiprocessing `pool`, the
+    batch is split into chunks of `chunk_size` items which are decoded in
+    parallel. Servers must be picklable then. This only pays off for large
+    batches, as every item travels to a worker process and back.
+    """
+    if workers < 1 or chunk_size < 1:
+        raise ValueError("workers and chunk_size must be positive.")
+    if (pool is None and workers == 1) or len(items) <= chunk_size:
+        return _decode(items)
+
+    results: List[ScanResult] = []
+    chunks = chunked(items, chunk_size)
+    if pool is not None:
+        for decoded in pool.imap(_decode, chunks):
+            results.extend(decoded)
+        return results
+    with multiprocessing.Pool(workers) as own_pool:
+        for decoded in own_pool.imap(_decode, chunks):
+            results.extend(decoded)
+    return results
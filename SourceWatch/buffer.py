@@ -1,5 +1,7 @@
-import struct
 import io
+import re
+import struct
+from typing import Union
 
 
 class SteamPacketBuffer(io.BytesIO):
@@ -8,7 +10,8 @@ class SteamPacketBuffer(io.BytesIO):
     __NULL_BYTE = b"\x00"
 
     def __len__(self) -> int:
-        return len(self.getvalue())
+        with self.getbuffer() as view:
+            return view.nbytes
 
     def __repr__(self) -> str:
         data = self.getvalue()
@@ -83,3 +86,121 @@ class SteamPacketBuffer(io.BytesIO):
     def write_string(self, value: str) -> None:
         """Write a UTF-8 string followed by a null terminator."""
         self.write(value.encode("utf-8") + self.__NULL_BYTE)
+
+
+_NULL_BYTE = b"\x00"
+# Locates string terminators in memoryviews, which have no find().
+_NULL_PATTERN = re.compile(_NULL_BYTE)
+_BYTE = struct.Struct("<B").unpack_from
+_SHORT = struct.Struct("<h").unpack_from
+_FLOAT = struct.Struct("<f").unpack_from
+_LONG = struct.Struct("<l").unpack_from
+_LONG_LONG = struct.Struct("<Q").unpack_from
+
+
+class SteamPacketReader:
+    """Read-only buffer decoding straight from a received datagram.
+
+    Provides the same read methods as SteamPacketBuffer, but numbers are
+    unpacked in place at the current offset and strings are located with
+    bytes.find, so reading does not copy the underlying data. A memoryview
+    is wrapped as it is, without copying it either.
+    """
+
+    __slots__ = ("_data", "_view", "_position")
+
+    def __init__(self, data: Union[bytes, memoryview] = b"") -> None:
+        if isinstance(data, memoryview):
+            data = data.cast("B")
+        self._data = data
+        self._view = memoryview(data)
+        self._position = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        max_display = 20  # Limit display length for readability
+        data_display = bytes(self._view[:max_display]) + (
+            b"..." if len(self._data) > max_display else b""
+        )
+        return f"<SteamPacketReader length={len(self)} data={data_display!r}>"
+
+    def __str__(self) -> str:
+        return str(bytes(self._view))
+
+    def getvalue(self) -> Union[bytes, memoryview]:
+        """Return the underlying data without copying it."""
+        return self._data
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._data)
+        self._position = max(offset, 0)
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to `size` bytes, or everything left if size is negative."""
+        start = self._position
+        end = len(self._data) if size < 0 else min(start + size, len(self._data))
+        self._position = max(end, start)
+        return bytes(self._view[start:end])
+
+    # The readers call the precompiled unpack_from directly, a shared helper
+    # method would cost as much as it saves.
+
+    def read_byte(self) -> int:
+        """Read a 8 bit character or unsigned integer (1 byte)."""
+        value = _BYTE(self._data, self._position)[0]
+        self._position += 1
+        return value
+
+    def read_char(self) -> str:
+        """Read a single ASCII character."""
+        value = _BYTE(self._data, self._position)[0]
+        self._position += 1
+        return chr(value)
+
+    def read_short(self) -> int:
+        """Read a 16 bit signed integer (2 bytes)."""
+        value = _SHORT(self._data, self._position)[0]
+        self._position += 2
+        return value
+
+    def read_float(self) -> float:
+        """Read a 32 bit floating point (4 bytes)."""
+        value = _FLOAT(self._data, self._position)[0]
+        self._position += 4
+        return value
+
+    def read_long(self) -> int:
+        """Read a 32 bit signed integer (4 bytes)."""
+        value = _LONG(self._data, self._position)[0]
+        self._position += 4
+        return value
+
+    def read_long_long(self) -> int:
+        """Read a 64 bit unsigned integer (8 bytes)."""
+        value = _LONG_LONG(self._data, self._position)[0]
+        self._position += 8
+        return value
+
+    def read_string(self) -> str:
+        """Read a null-terminated UTF-8 string."""
+        start = self._position
+        data = self._data
+        if type(data) is bytes:
+            end = data.find(_NULL_BYTE, start)
+        else:
+            match = _NULL_PATTERN.search(data, start)
+            end = -1 if match is None else match.start()
+        if end == -1:
+            end = self._position = max(len(data), start)
+        else:
+            self._position = end + 1
+        return str(self._view[start:end], "utf-8")
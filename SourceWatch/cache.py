@@ -0,0 +1,106 @@
+"""
+Small in-process caches shared between queries.
+
+The caches are thread safe, so one instance can back the workers of a
+QueryPool.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class ChallengeCache:
+    """Remember the last challenge number handed out by each server.
+
+    Entries expire after `ttl` seconds and the least recently used entry is
+    evicted once `max_size` servers are cached.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_size: int = 10000) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be positive.")
+        self._ttl = ttl
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[int, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, server: Hashable) -> Optional[int]:
+        """Return the cached challenge or None if unknown or expired."""
+        with self._lock:
+            entry = self._entries.get(server)
+            if entry is None:
+                return None
+            challenge, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[server]
+                return None
+            self._entries.move_to_end(server)
+            return challenge
+
+    def set(self, server: Hashable, challenge: int) -> None:
+        with self._lock:
+            self._entries[server] = (challenge, time.monotonic() + self._ttl)
+            self._entries.move_to_end(server)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, server: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(server, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class ResponseCache:
+    """Remember the last parsed result of each server and request type.
+
+    Results are stored together with the digest of the raw response they
+    were parsed from, so a byte-identical response can reuse the result
+    without decoding it again. The least recently used entry is evicted once
+    `max_size` entries are cached.
+
+    Cached results are handed out to every caller. Do not modify them.
+    """
+
+    def __init__(self, max_size: int = 10000) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be positive.")
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, digest: bytes) -> Optional[Any]:
+        """Return the cached result if it was parsed from the same payload."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != digest:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, digest: bytes, result: Any) -> None:
+        with self._lock:
+            self._entries[key] = (digest, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
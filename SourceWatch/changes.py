@@ -0,0 +1,184 @@
+"""
+Change detection between polls.
+
+A SnapshotStore keeps the last info, players and rules result of every
+server and turns each new result into the list of changes since the last
+poll, so unchanged servers produce no output at all.
+"""
+
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from .packet import ResponsePacket
+from .query import SNAPSHOT_RESPONSES
+
+INFO_CHANGED = "info_changed"
+MAP_CHANGED = "map_changed"
+PLAYER_JOINED = "player_joined"
+PLAYER_LEFT = "player_left"
+PLAYER_CHANGED = "player_changed"
+RULE_ADDED = "rule_added"
+RULE_REMOVED = "rule_removed"
+RULE_CHANGED = "rule_changed"
+
+# Player fields compared between polls. The play time grows with every poll
+# and the index is just the position in the response.
+PLAYER_FIELDS = ("kills",)
+
+PlayerKey = Tuple[str, int]
+
+
+class Change(NamedTuple):
+    """A single difference between two polls of a server.
+
+    `key` is the info field, player name or rule name which changed. `old`
+    is None for additions and `new` is None for removals.
+    """
+
+    server: Hashable
+    kind: str
+    key: str
+    old: Any
+    new: Any
+
+
+class _Snapshot:
+    __slots__ = ("digest", "value")
+
+    def __init__(self, digest: Optional[bytes], value: Any) -> None:
+        self.digest = digest
+        self.value = value
+
+
+def _player_keys(players: List[Dict[str, Any]]) -> Dict[PlayerKey, Dict[str, Any]]:
+    """Key players by name, numbering players which share a name."""
+    keyed: Dict[PlayerKey, Dict[str, Any]] = {}
+    seen: Dict[str, int] = {}
+    for player in players:
+        name = player["name"]
+        seen[name] = seen.get(name, -1) + 1
+        keyed[(name, seen[name])] = player
+    return keyed
+
+
+def diff_info(
+    server: Hashable, old: Dict[str, Any], new: Dict[str, Any]
+) -> List[Change]:
+    changes = []
+    for key, value in new.items():
+        previous = old.get(key)
+        if previous != value:
+            kind = MAP_CHANGED if key == "game_map" else INFO_CHANGED
+            changes.append(Change(server, kind, key, previous, value))
+    for key in old.keys() - new.keys():
+        changes.append(Change(server, INFO_CHANGED, key, old[key], None))
+    return changes
+
+
+def diff_players(
+    server: Hashable,
+    old: Dict[PlayerKey, Dict[str, Any]],
+    new: Dict[PlayerKey, Dict[str, Any]],
+) -> List[Change]:
+    changes = []
+    for key, player in new.items():
+        previous = old.get(key)
+        if previous is None:
+            changes.append(Change(server, PLAYER_JOINED, key[0], None, player))
+        elif any(previous[field] != player[field] for field in PLAYER_FIELDS):
+            changes.append(Change(server, PLAYER_CHANGED, key[0], previous, player))
+    for key in old.keys() - new.keys():
+        changes.append(Change(server, PLAYER_LEFT, key[0], old[key], None))
+    return changes
+
+
+def diff_rules(
+    server: Hashable, old: Dict[str, str], new: Dict[str, str]
+) -> List[Change]:
+    changes = []
+    for name, value in new.items():
+        if name not in old:
+            changes.append(Change(server, RULE_ADDED, name, None, value))
+        elif old[name] != value:
+            changes.append(Change(server, RULE_CHANGED, name, old[name], value))
+    for name in old.keys() - new.keys():
+        changes.append(Change(server, RULE_REMOVED, name, old[name], None))
+    return changes
+
+
+class SnapshotStore:
+    """Keep the last result of every server and request and emit diffs.
+
+    Example usage:
+
+    store = SourceWatch.SnapshotStore()
+    server = SourceWatch.Query('1.2.3.4', 27015)
+    for change in store.update_packet(server.server, server.fetch('rules')):
+        print(change)
+
+    The first result of a server is diffed against an empty snapshot, so
+    every field, player and rule shows up as a change once.
+    """
+
+    def __init__(self) -> None:
+        self._snapshots: Dict[Tuple[Hashable, str], _Snapshot] = {}
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def get(self, server: Hashable, request: str) -> Any:
+        """Return the last stored value of a request, None if never stored.
+
+        Info and rules are returned as the dicts they were stored as. Players
+        are a dict keyed by (name, n) tuples, where n numbers the players
+        sharing a name in the order they were listed, e.g.
+        {("Gordon", 0): {...}, ("Gordon", 1): {...}}.
+        """
+        snapshot = self._snapshots.get((server, request))
+        return None if snapshot is None else snapshot.value
+
+    def update(
+        self,
+        server: Hashable,
+        request: str,
+        result: Dict[str, Any],
+        digest: Optional[bytes] = None,
+    ) -> List[Change]:
+        """Store a result of info(), players() or rules() and return the changes.
+
+        `result` is the dict returned by the request, `request` its name.
+        """
+        value = result[request]
+        snapshot = self._snapshots.get((server, request))
+        old = {} if snapshot is None else snapshot.value
+
+        if request == "info":
+            changes = diff_info(server, old, value)
+        elif request == "players":
+            value = _player_keys(value)
+            changes = diff_players(server, old, value)
+        elif request == "rules":
+            changes = diff_rules(server, old, value)
+        else:
+            raise ValueError(f"Unknown request {request!r}.")
+
+        self._snapshots[(server, request)] = _Snapshot(digest, value)
+        return changes
+
+    def update_packet(self, server: Hashable, response: ResponsePacket) -> List[Change]:
+        """Store a response packet and return the changes.
+
+        Responses byte-identical to the previous one are not parsed at all.
+        """
+        request = SNAPSHOT_RESPONSES.get(response.header)
+        if request is None:
+            raise ValueError(f"Unexpected response {response}.")
+
+        digest = response.digest()
+        snapshot = self._snapshots.get((server, request))
+        if snapshot is not None and snapshot.digest == digest:
+            return []
+        return self.update(server, request, response.result(), digest)
+
+    def forget(self, server: Hashable) -> None:
+        for request in ("info", "players", "rules"):
+            self._snapshots.pop((server, request), None)
@@ -0,0 +1,171 @@
+"""
+Fast decoders for response payloads.
+
+Each decoder takes the raw payload and the offset right after the response
+header byte. Runs of fixed-width fields are unpacked with a single
+precompiled struct call. The step-by-step parsers in packet.py are kept as
+the reference implementation.
+"""
+
+import struct
+from typing import Any, Dict, List, Tuple
+
+NULL_BYTE = b"\x00"
+
+# game_app_id, players_current, players_max_slots, players_bots, server_type,
+# server_os, server_password_protected, server_vac_secured
+SOURCE_INFO = struct.Struct("<hBBBBBBB")
+# players_current, players_max_slots, server_protocol_version, server_type,
+# server_os, server_password_protected, game_mod, server_vac_secured,
+# players_bots
+GOLDSRC_INFO = struct.Struct("<BBBBBBBBB")
+# kills, play_time
+PLAYER_SCORE = struct.Struct("<lf")
+BYTE = struct.Struct("<B")
+SHORT = struct.Struct("<h")
+LONG_LONG = struct.Struct("<Q")
+
+
+def read_string(data: bytes, offset: int) -> Tuple[str, int]:
+    """Return the null-terminated string at offset and the offset after it."""
+    end = data.find(NULL_BYTE, offset)
+    if end == -1:
+        end = max(len(data), offset)
+        return data[offset:end].decode("utf-8"), end
+    return data[offset:end].decode("utf-8"), end + 1
+
+
+def decode_info(data: bytes, offset: int) -> Dict[str, Any]:
+    """Decode the body of a Source InfoResponse."""
+    (protocol_version,) = BYTE.unpack_from(data, offset)
+    server_name, offset = read_string(data, offset + 1)
+    game_map, offset = read_string(data, offset)
+    game_directory, offset = read_string(data, offset)
+    game_title, offset = read_string(data, offset)
+    (
+        game_app_id,
+        players_current,
+        players_max_slots,
+        players_bots,
+        server_type,
+        server_os,
+        password_protected,
+        vac_secured,
+    ) = SOURCE_INFO.unpack_from(data, offset)
+    game_version, offset = read_string(data, offset + SOURCE_INFO.size)
+
+    info = {
+        "server_protocol_version": protocol_version,
+        "server_name": server_name,
+        "game_map": game_map,
+        "game_directory": game_directory,
+        "game_title": game_title,
+        "game_app_id": game_app_id,
+        "players_current": players_current,
+        "players_max_slots": players_max_slots,
+        "players_bots": players_bots,
+        "server_type": chr(server_type),
+        "server_os": chr(server_os),
+        "server_password_protected": password_protected,
+        "server_vac_secured": vac_secured,
+        "game_version": game_version,
+    }
+
+    if offset < len(data):
+        extra_data_flags = data[offset]
+        offset += 1
+        if extra_data_flags & 0x80:
+            (info["server_port"],) = SHORT.unpack_from(data, offset)
+            offset += SHORT.size
+        if extra_data_flags & 0x10:
+            (info["server_steam_id"],) = LONG_LONG.unpack_from(data, offset)
+            offset += LONG_LONG.size
+        if extra_data_flags & 0x40:
+            (info["server_spectator_port"],) = SHORT.unpack_from(data, offset)
+            name, offset = read_string(data, offset + SHORT.size)
+            info["server_spectator_name"] = name
+        if extra_data_flags & 0x20:
+            info["server_tags"], offset = read_string(data, offset)
+        if extra_data_flags & 0x01:
+            # A more accurate AppID as the earlier appID could have been truncated.
+            (info["game_app_id"],) = LONG_LONG.unpack_from(data, offset)
+
+    info["players_humans"] = players_current - players_bots
+    info["players_free_slots"] = players_max_slots - players_current
+    return info
+
+
+def decode_goldsrc_info(data: bytes, offset: int) -> Dict[str, Any]:
+    """Decode the body of an InfoGoldSrcResponse."""
+    server_address, offset = read_string(data, offset)
+    server_name, offset = read_string(data, offset)
+    game_map, offset = read_string(data, offset)
+    game_directory, offset = read_string(data, offset)
+    game_title, offset = read_string(data, offset)
+    (
+        players_current,
+        players_max_slots,
+        protocol_version,
+        server_type,
+        server_os,
+        password_protected,
+        game_mod,
+        vac_secured,
+        players_bots,
+    ) = GOLDSRC_INFO.unpack_from(data, offset)
+
+    return {
+        "server_address": server_address,
+        "server_name": server_name,
+        "game_map": game_map,
+        "game_directory": game_directory,
+        "game_title": game_title,
+        "players_current": players_current,
+        "players_max_slots": players_max_slots,
+        "server_protocol_version": protocol_version,
+        "server_type": chr(server_type),
+        "server_os": chr(server_os),
+        "server_password_protected": password_protected,
+        "game_mod": game_mod,
+        "server_vac_secured": vac_secured,
+        "players_bots": players_bots,
+        "players_humans": players_current,
+        "players_free_slots": players_max_slots - players_current,
+    }
+
+
+def decode_players(data: bytes, offset: int) -> List[Dict[str, Any]]:
+    """Decode the body of a PlayersResponse."""
+    (total_players,) = BYTE.unpack_from(data, offset)
+    offset += 1
+    players = []
+    for index in range(total_players):
+        (player_id,) = BYTE.unpack_from(data, offset)
+        name, offset = read_string(data, offset + 1)
+        kills, play_time = PLAYER_SCORE.unpack_from(data, offset)
+        offset += PLAYER_SCORE.size
+        players.append(
+            {
+                "index": index,
+                "id": player_id,
+                "name": name,
+                "kills": kills,
+                "play_time": play_time,
+            }
+        )
+    return players
+
+
+def decode_rules(data: bytes, offset: int) -> Dict[str, str]:
+    """Decode the body of a RulesResponse."""
+    (total_rules,) = SHORT.unpack_from(data, offset)
+    if total_rules <= 0:
+        return {}
+    total_strings = 2 * total_rules
+    # Split all key/value strings at once. Missing strings of a truncated
+    # response decode as empty strings, just like read_string does.
+    strings = data[offset + SHORT.size :].split(NULL_BYTE, total_strings)
+    del strings[total_strings:]
+    strings.extend([b""] * (total_strings - len(strings)))
+    decoded = [string.decode("utf-8") for string in strings]
+    return dict(zip(decoded[::2], decoded[1::2]))
@@ -0,0 +1,591 @@
+"""
+A2S emulator for load tests and deterministic tests.
+
+Serves any number of virtual servers from one event loop, each on its own
+UDP port. Replies are built from the same models the library returns, and
+every virtual server can hand out challenges, add latency, drop or reorder
+datagrams, and split (and bzip2 compress) large responses. A master server
+listing all virtual servers can be served as well.
+
+Each virtual server needs a socket, so thousands of them may require a
+higher open files limit (ulimit -n).
+
+Example usage:
+
+python -m SourceWatch.emulator --servers 1000 --base-port 30000 --latency 0.05 --loss 0.01
+"""
+
+import argparse
+import asyncio
+import bz2
+import functools
+import logging
+import random
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from .buffer import SteamPacketBuffer
+from .master import FIRST_SEED, LAST_ADDRESS, PAGE_SIZE, encode_page, parse_request
+from .models import GoldSrcResponseModel, PlayerModel, SourceInfoResponseModel
+from .packet import (
+    ChallengeResponse,
+    SourceWatchError,
+    InfoGoldSrcResponse,
+    InfoRequest,
+    InfoResponse,
+    PlayersRequest,
+    PlayersResponse,
+    RulesRequest,
+    RulesResponse,
+)
+from .query import PACKET_SIZE
+from .reassembly import COMPRESSED_FLAG, MULTIPLE_PACKET_RESPONSE
+
+SINGLE_PACKET_HEADER = b"\xff\xff\xff\xff"
+# Payload bytes per fragment of a split response, as sent by Source servers.
+SPLIT_SIZE = 1248
+
+InfoModel = Union[SourceInfoResponseModel, GoldSrcResponseModel]
+
+
+def _signed_long(value: int) -> int:
+    return value - (1 << 32) if value >= 1 << 31 else value
+
+
+def encode_info(info: SourceInfoResponseModel) -> bytes:
+    """Encode a Source info reply, starting with the response header."""
+    buffer = SteamPacketBuffer()
+    buffer.write_byte(InfoResponse.RESPONSE_HEADER)
+    buffer.write_byte(info.server_protocol_version)
+    buffer.write_string(info.server_name)
+    buffer.write_string(info.game_map)
+    buffer.write_string(info.game_directory)
+    buffer.write_string(info.game_title)
+    # The short field holds the truncated app ID, the extra data the full one.
+    app_id = info.game_app_id & 0xFFFF
+    buffer.write_short(app_id - 0x10000 if app_id >= 0x8000 else app_id)
+    buffer.write_byte(info.players_current)
+    buffer.write_byte(info.players_max_slots)
+    buffer.write_byte(info.players_bots)
+    buffer.write_char(info.server_type)
+    buffer.write_char(info.server_os)
+    buffer.write_byte(info.server_password_protected)
+    buffer.write_byte(info.server_vac_secured)
+    buffer.write_string(info.game_version)
+
+    extra_data_flags = 0
+    if info.server_port is not None:
+        extra_data_flags |= 0x80
+    if info.server_steam_id is not None:
+        extra_data_flags |= 0x10
+    if info.server_spectator_port is not None:
+        extra_data_flags |= 0x40
+    if info.server_tags is not None:
+        extra_data_flags |= 0x20
+    if info.game_app_id > 0x7FFF:
+        extra_data_flags |= 0x01
+    if not extra_data_flags:
+        return buffer.getvalue()
+
+    buffer.write_byte(extra_data_flags)
+    if extra_data_flags & 0x80:
+        buffer.write_short(info.server_port)
+    if extra_data_flags & 0x10:
+        buffer.write_long_long(info.server_steam_id)
+    if extra_data_flags & 0x40:
+        buffer.write_short(info.server_spectator_port)
+        buffer.write_string(info.server_spectator_name or "")
+    if extra_data_flags & 0x20:
+        buffer.write_string(info.server_tags)
+    if extra_data_flags & 0x01:
+        buffer.write_long_long(info.game_app_id)
+    return buffer.getvalue()
+
+
+def encode_goldsrc_info(info: GoldSrcResponseModel) -> bytes:
+    """Encode an obsolete GoldSrc info reply, starting with the response header."""
+    buffer = SteamPacketBuffer()
+    buffer.write_byte(InfoGoldSrcResponse.RESPONSE_HEADER)
+    buffer.write_string(info.server_address)
+    buffer.write_string(info.server_name)
+    buffer.write_string(info.game_map)
+    buffer.write_string(info.game_directory)
+    buffer.write_string(info.game_title)
+    buffer.write_byte(info.players_current)
+    buffer.write_byte(info.players_max_slots)
+    buffer.write_byte(info.server_protocol_version)
+    buffer.write_char(info.server_type)
+    buffer.write_char(info.server_os)
+    buffer.write_byte(info.server_password_protected)
+    buffer.write_byte(info.game_mod)
+    buffer.write_byte(info.server_vac_secured)
+    buffer.write_byte(info.players_bots)
+    return buffer.getvalue()
+
+
+def encode_players(players: Sequence[PlayerModel]) -> bytes:
+    buffer = SteamPacketBuffer()
+    buffer.write_byte(PlayersResponse.RESPONSE_HEADER)
+    buffer.write_byte(len(players))
+    for player in players:
+        buffer.write_byte(player.id)
+        buffer.write_string(player.name)
+        buffer.write_long(player.kills)
+        buffer.write_float(player.play_time)
+    return buffer.getvalue()
+
+
+def encode_rules(rules: Dict[str, str]) -> bytes:
+    buffer = SteamPacketBuffer()
+    buffer.write_byte(RulesResponse.RESPONSE_HEADER)
+    buffer.write_short(len(rules))
+    for name, value in rules.items():
+        buffer.write_string(name)
+        buffer.write_string(value)
+    return buffer.getvalue()
+
+
+def encode_challenge(challenge: int) -> bytes:
+    buffer = SteamPacketBuffer()
+    buffer.write_byte(ChallengeResponse.RESPONSE_HEADER)
+    buffer.write_long(challenge)
+    return buffer.getvalue()
+
+
+def split_response(
+    payload: bytes,
+    request_id: int,
+    split_size: int = SPLIT_SIZE,
+    compress: bool = False,
+) -> List[bytes]:
+    """Frame a reply as a single datagram, or as fragments if it is too large.
+
+    Compression is only applied to split responses, like Source servers do.
+    """
+    data = SINGLE_PACKET_HEADER + payload
+    if len(data) <= PACKET_SIZE:
+        return [data]
+
+    if compress:
+        request_id |= COMPRESSED_FLAG
+        header = SteamPacketBuffer()
+        header.write_long(len(data))
+        header.write_long(_signed_long(zlib.crc32(data)))
+        data = header.getvalue() + bz2.compress(data)
+
+    chunks = [data[i : i + split_size] for i in range(0, len(data), split_size)]
+    fragments = []
+    for number, chunk in enumerate(chunks):
+        fragment = SteamPacketBuffer()
+        fragment.write_long(MULTIPLE_PACKET_RESPONSE)
+        fragment.write_long(_signed_long(request_id))
+        fragment.write_byte(len(chunks))
+        fragment.write_byte(number)
+        fragment.write_short(len(chunk))
+        fragment.write(chunk)
+        fragments.append(fragment.getvalue())
+    return fragments
+
+
+class VirtualServer:
+    """State and network behaviour of one emulated server.
+
+    `latency` and `jitter` are in seconds, `loss` is the probability of
+    dropping a datagram and `reorder` the probability of shuffling the
+    fragments of a split response. Players and rules requests, and info
+    requests if `info_challenge` is set, must carry the client's challenge.
+    """
+
+    def __init__(
+        self,
+        info: InfoModel,
+        players: Sequence[PlayerModel] = (),
+        rules: Optional[Dict[str, str]] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        loss: float = 0.0,
+        reorder: float = 0.0,
+        compress: bool = False,
+        split_size: int = SPLIT_SIZE,
+        info_challenge: bool = False,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.reorder = reorder
+        self.compress = compress
+        self.split_size = split_size
+        self.info_challenge = info_challenge
+        self._replies: Dict[int, bytes] = {}
+        self.update(info, players, rules or {})
+
+    def update(
+        self,
+        info: Optional[InfoModel] = None,
+        players: Optional[Sequence[PlayerModel]] = None,
+        rules: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Replace the state served from now on."""
+        if info is not None:
+            self.info = info
+            self._replies.pop(InfoRequest.REQUEST_HEADER, None)
+        if players is not None:
+            self.players = list(players)
+            self._replies.pop(PlayersRequest.REQUEST_HEADER, None)
+        if rules is not None:
+            self.rules = dict(rules)
+            self._replies.pop(RulesRequest.REQUEST_HEADER, None)
+
+    def reply(self, request_header: int) -> Optional[bytes]:
+        """Return the encoded reply to a request or None if it is unknown."""
+        reply = self._replies.get(request_header)
+        if reply is not None:
+            return reply
+        if request_header == InfoRequest.REQUEST_HEADER:
+            if isinstance(self.info, GoldSrcResponseModel):
+                reply = encode_goldsrc_info(self.info)
+            else:
+                reply = encode_info(self.info)
+        elif request_header == PlayersRequest.REQUEST_HEADER:
+            reply = encode_players(self.players)
+        elif request_header == RulesRequest.REQUEST_HEADER:
+            reply = encode_rules(self.rules)
+        else:
+            return None
+        self._replies[request_header] = reply
+        return reply
+
+
+class EmulatorProtocol(asyncio.DatagramProtocol):
+    """Answer the A2S requests sent to one virtual server."""
+
+    def __init__(self, server: VirtualServer, rng: random.Random) -> None:
+        self.logger = logging.getLogger("SourceWatch")
+        self.server = server
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.received = 0
+        self.sent = 0
+        self._rng = rng
+        # Challenges are bound to the client IP, like real servers do.
+        self._challenges: Dict[str, int] = {}
+        self._request_id = 0
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+
+    def challenge(self, host: str) -> int:
+        """Return the challenge handed out to a client IP."""
+        challenge = self._challenges.get(host)
+        if challenge is None:
+            challenge = self._challenges[host] = self._rng.randint(1, 0x7FFFFFFF)
+        return challenge
+
+    def datagram_received(self, data: bytes, addr: Tuple[Any, ...]) -> None:
+        self.received += 1
+        if len(data) < 5 or data[:4] != SINGLE_PACKET_HEADER:
+            self.logger.debug("Ignoring invalid request from %s", addr)
+            return
+
+        header = data[4]
+        if header == InfoRequest.REQUEST_HEADER:
+            # The challenge follows the "Source Engine Query" string, if any.
+            needs_challenge = self.server.info_challenge
+            challenge = data[-4:] if len(data) >= 29 else b""
+        else:
+            needs_challenge = True
+            challenge = data[5:9]
+
+        reply = self.server.reply(header)
+        if reply is None:
+            self.logger.debug("Ignoring unknown request %s from %s", header, addr)
+            return
+        if needs_challenge:
+            expected = self.challenge(addr[0])
+            if int.from_bytes(challenge, "little", signed=True) != expected:
+                reply = encode_challenge(expected)
+
+        self._request_id = (self._request_id + 1) & 0x7FFFFFFF
+        datagrams = split_response(
+            reply, self._request_id, self.server.split_size, self.server.compress
+        )
+        self._send(datagrams, addr)
+
+    def _send(self, datagrams: List[bytes], addr: Tuple[Any, ...]) -> None:
+        server = self.server
+        if len(datagrams) > 1 and self._rng.random() < server.reorder:
+            self._rng.shuffle(datagrams)
+        loop = asyncio.get_running_loop()
+        for datagram in datagrams:
+            if server.loss and self._rng.random() < server.loss:
+                continue
+            delay = server.latency
+            if server.jitter:
+                delay += self._rng.uniform(0, server.jitter)
+            self.sent += 1
+            if delay > 0:
+                loop.call_later(delay, self._sendto, datagram, addr)
+            else:
+                self._sendto(datagram, addr)
+
+    def _sendto(self, datagram: bytes, addr: Tuple[Any, ...]) -> None:
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.sendto(datagram, addr)
+
+
+class MasterEmulatorProtocol(asyncio.DatagramProtocol):
+    """Serve a list of addresses like a Steam master server.
+
+    Filters and regions are ignored, every request gets the page following
+    its seed address.
+    """
+
+    def __init__(
+        self, addresses: Sequence[Tuple[str, int]], page_size: int = PAGE_SIZE
+    ) -> None:
+        self.logger = logging.getLogger("SourceWatch")
+        self.addresses = list(addresses)
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.received = 0
+        self._page_size = page_size
+        # "ip:port" -> index of the page following that address.
+        self._offsets = {
+            f"{ip}:{port}": index + 1 for index, (ip, port) in enumerate(addresses)
+        }
+        self._offsets[FIRST_SEED] = 0
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: Tuple[Any, ...]) -> None:
+        self.received += 1
+        try:
+            _, seed, _ = parse_request(data)
+        except (SourceWatchError, UnicodeDecodeError):
+            self.logger.debug("Ignoring invalid request from %s", addr)
+            return
+        start = self._offsets.get(seed)
+        if start is None:
+            self.logger.debug("Ignoring unknown seed %s from %s", seed, addr)
+            return
+        page = self.addresses[start : start + self._page_size]
+        if start + self._page_size >= len(self.addresses):
+            page.append(LAST_ADDRESS)
+        self.transport.sendto(encode_page(page), addr)
+
+
+class Emulator:
+    """Serve virtual servers on consecutive ports starting at `base_port`.
+
+    With base_port=0 every server gets a free ephemeral port. Pass `seed` to
+    make challenges, loss and reordering reproducible. With a `master_port`
+    (0 for a free one) a master server listing all servers is served at
+    `master_address`.
+
+    Example usage:
+
+    async with SourceWatch.emulator.Emulator([server]) as emulator:
+        host, port = emulator.addresses[0]
+        print(await SourceWatch.AsyncQuery(host, port).info())
+    """
+
+    def __init__(
+        self,
+        servers: Sequence[VirtualServer],
+        host: str = "127.0.0.1",
+        base_port: int = 0,
+        seed: Optional[int] = None,
+        master_port: Optional[int] = None,
+    ) -> None:
+        self.logger = logging.getLogger("SourceWatch")
+        self.servers = list(servers)
+        self.protocols: List[EmulatorProtocol] = []
+        self.addresses: List[Tuple[str, int]] = []
+        self.master: Optional[MasterEmulatorProtocol] = None
+        self.master_address: Optional[Tuple[str, int]] = None
+        self._host = host
+        self._base_port = base_port
+        self._master_port = master_port
+        self._rng = random.Random(seed)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def __aenter__(self) -> "Emulator":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        for index, server in enumerate(self.servers):
+            port = self._base_port + index if self._base_port else 0
+            transport, protocol = await loop.create_datagram_endpoint(
+                functools.partial(EmulatorProtocol, server, self._rng),
+                local_addr=(self._host, port),
+            )
+            self.protocols.append(protocol)
+            self.addresses.append(transport.get_extra_info("sockname")[:2])
+        if self._master_port is not None:
+            transport, self.master = await loop.create_datagram_endpoint(
+                functools.partial(MasterEmulatorProtocol, self.addresses),
+                local_addr=(self._host, self._master_port),
+            )
+            self.master_address = transport.get_extra_info("sockname")[:2]
+        self.logger.info("Emulating %d servers", len(self.servers))
+
+    def start_in_thread(self) -> None:
+        """Run the emulator on its own event loop in a daemon thread.
+
+        Lets blocking code such as Query talk to the emulator.
+        """
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self.start())
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._close_transports)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = self._thread = None
+        else:
+            self._close_transports()
+
+    def _close_transports(self) -> None:
+        for protocol in [*self.protocols, self.master]:
+            if protocol is not None and protocol.transport is not None:
+                protocol.transport.close()
+
+
+def sample_server(
+    index: int, players: int = 12, rules: int = 40, **options: Any
+) -> VirtualServer:
+    """Build a virtual server with generated info, players and rules."""
+    bots = min(2, players)
+    info = SourceInfoResponseModel(
+        server_protocol_version=17,
+        server_name=f"SourceWatch Emulated Server #{index}",
+        game_map="de_dust2",
+        game_directory="cstrike",
+        game_title="Counter-Strike: Source",
+        game_app_id=240,
+        players_current=players,
+        players_max_slots=max(32, players),
+        players_bots=bots,
+        server_type="d",
+        server_os="l",
+        server_password_protected=0,
+        server_vac_secured=1,
+        game_version="9540945",
+        players_humans=players - bots,
+        players_free_slots=max(32, players) - players,
+        server_tags="emulated",
+    )
+    player_list = [
+        PlayerModel(index=i, id=0, name=f"Player {i}", kills=i * 3, play_time=i * 61.5)
+        for i in range(players)
+    ]
+    rule_dict = {f"sv_setting_{i}": str(i % 7) for i in range(rules)}
+    return VirtualServer(info, player_list, rule_dict, **options)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m SourceWatch.emulator",
+        description="Emulate Source servers answering A2S queries.",
+    )
+    parser.add_argument("--servers", type=int, default=1, help="(default: 1)")
+    parser.add_argument("--host", default="127.0.0.1", help="(default: 127.0.0.1)")
+    parser.add_argument(
+        "--base-port",
+        type=int,
+        default=27015,
+        help="port of the first server, the others follow (default: 27015)",
+    )
+    parser.add_argument("--players", type=int, default=12, help="(default: 12)")
+    parser.add_argument("--rules", type=int, default=40, help="(default: 40)")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="reply delay in seconds"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="random extra delay in seconds"
+    )
+    parser.add_argument(
+        "--loss", type=float, default=0.0, help="probability of dropping a datagram"
+    )
+    parser.add_argument(
+        "--reorder",
+        type=float,
+        default=0.0,
+        help="probability of shuffling the fragments of a split response",
+    )
+    parser.add_argument(
+        "--compress", action="store_true", help="bzip2 compress split responses"
+    )
+    parser.add_argument(
+        "--split-size",
+        type=int,
+        default=SPLIT_SIZE,
+        help=f"payload bytes per fragment (default: {SPLIT_SIZE})",
+    )
+    parser.add_argument(
+        "--master-port",
+        type=int,
+        default=None,
+        help="also serve a master server listing all servers on this port",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.servers < 1:
+        parser.error("--servers must be positive")
+    if not 0 < args.split_size <= PACKET_SIZE - 12:
+        parser.error(f"--split-size must be between 1 and {PACKET_SIZE - 12}")
+    for name in ("loss", "reorder"):
+        if not 0 <= getattr(args, name) <= 1:
+            parser.error(f"--{name} must be between 0 and 1")
+    return args
+
+
+async def serve(args: argparse.Namespace) -> None:
+    servers = [
+        sample_server(
+            index,
+            args.players,
+            args.rules,
+            latency=args.latency,
+            jitter=args.jitter,
+            loss=args.loss,
+            reorder=args.reorder,
+            compress=args.compress,
+            split_size=args.split_size,
+        )
+        for index in range(args.servers)
+    ]
+    async with Emulator(
+        servers, args.host, args.base_port, args.seed, args.master_port
+    ) as emulator:
+        first, last = emulator.addresses[0], emulator.addresses[-1]
+        print(f"Serving {len(servers)} servers on {first[0]}:{first[1]}-{last[1]}")
+        if emulator.master_address is not None:
+            host, port = emulator.master_address
+            print(f"Serving the master server on {host}:{port}")
+        await asyncio.Event().wait()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Columnar store of the info results of a whole fleet.
+
+Every server owns a slot, a row in NumPy arrays holding its player counts,
+app id and ping, while maps and game directories are dictionary encoded into
+integer codes. New results overwrite the slot in place, and filters,
+group-bys and top-k queries run vectorized over all servers at once.
+
+Requires NumPy: pip install sourcewatch[fleet]
+"""
+
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from .packet import ResponsePacket
+from .query import SNAPSHOT_RESPONSES
+from .records import InfoResult
+
+# Column name -> NumPy dtype.
+NUMERIC_COLUMNS = {
+    "players_current": "int16",
+    "players_max_slots": "int16",
+    "players_bots": "int16",
+    "game_app_id": "uint32",
+    "ping": "float32",
+}
+# Columns stored as integer codes into a list of distinct values.
+CATEGORICAL_COLUMNS = ("game_map", "game_directory")
+# Columns computed from the stored ones on demand.
+DERIVED_COLUMNS = ("players_humans", "players_free_slots")
+
+AGGREGATES = ("sum", "count", "mean", "min", "max")
+
+
+def app_id(game_app_id: int) -> int:
+    """Return the Steam app id of a decoded game_app_id.
+
+    The info header carries it as a signed short, so ids from 32768 up come
+    back negative. With EDF 0x01 it is the 64-bit GameID instead, whose low
+    24 bits are the app id.
+    """
+    if -32768 <= game_app_id < 0:
+        return game_app_id & 0xFFFF
+    return game_app_id & 0xFFFFFF
+
+
+def _convert(name: str, value: Any) -> Any:
+    dtype = np.dtype(NUMERIC_COLUMNS[name])
+    if dtype.kind in "iu":
+        limits = np.iinfo(dtype)
+        if not limits.min <= value <= limits.max:
+            raise ValueError(f"{name} out of range: {value!r}")
+    return dtype.type(value)
+
+
+class _Dictionary:
+    """Map the distinct values of a categorical column to integer codes."""
+
+    __slots__ = ("codes", "values")
+
+    def __init__(self) -> None:
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value: str) -> int:
+        """Return the code of a value, -1 if it was never stored."""
+        return self.codes.get(value, -1)
+
+
+class FleetStore:
+    """Keep the last info result of every server in columns.
+
+    Example usage:
+
+    fleet = SourceWatch.FleetStore()
+    fleet.update(server, query.info())
+    humans = fleet.group_by("game_app_id", "players_humans")
+    mask = fleet.mask(game_map="de_dust2", min_free_slots=1)
+    print(fleet.servers(mask))
+    print(fleet.top_k("players_current", 10))
+
+    Queries consider all stored servers, or only those selected by a
+    boolean `mask` as returned by mask().
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        if np is None:
+            raise ImportError(
+                "FleetStore requires NumPy, install it with: pip install sourcewatch[fleet]"
+            )
+        if capacity < 1:
+            raise ValueError("capacity must be positive.")
+        self._capacity = capacity
+        # Slots below _size have been used, _active tells which still are.
+        self._size = 0
+        self._active = np.zeros(capacity, dtype=bool)
+        self._columns: Dict[str, Any] = {
+            name: np.zeros(capacity, dtype=dtype)
+            for name, dtype in NUMERIC_COLUMNS.items()
+        }
+        for name in CATEGORICAL_COLUMNS:
+            self._columns[name] = np.full(capacity, -1, dtype="int32")
+        self._dictionaries = {name: _Dictionary() for name in CATEGORICAL_COLUMNS}
+        self._slots: Dict[Hashable, int] = {}
+        self._servers: List[Optional[Hashable]] = []
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, server: Hashable) -> bool:
+        return server in self._slots
+
+    def _grow(self) -> None:
+        capacity = self._capacity * 2
+        self._active = np.resize(self._active, capacity)
+        self._active[self._capacity :] = False
+        for name, column in self._columns.items():
+            grown = np.resize(column, capacity)
+            grown[self._capacity :] = -1 if name in CATEGORICAL_COLUMNS else 0
+            self._columns[name] = grown
+        self._capacity = capacity
+
+    def slot(self, server: Hashable) -> int:
+        """Return the slot of a server, assigning a free one on first use."""
+        slot = self._slots.get(server)
+        if slot is not None:
+            return slot
+        if self._free:
+            slot = self._free.pop()
+            self._servers[slot] = server
+        else:
+            if self._size == self._capacity:
+                self._grow()
+            slot = self._size
+            self._size += 1
+            self._servers.append(server)
+        self._slots[server] = slot
+        self._active[slot] = True
+        return slot
+
+    def update(
+        self, server: Hashable, result: Union[Dict[str, Any], InfoResult]
+    ) -> int:
+        """Store an info() result in place and return the slot of the server.
+
+        `result` is the dict or, with result_format="record", the InfoResult
+        returned by info(). The ping is taken from its "server" entry, if any.
+        A result with missing or out of range values raises before the server
+        is stored.
+        """
+        if isinstance(result, InfoResult):
+            result = {"info": result.info._asdict(), "server": result.server._asdict()}
+        elif not isinstance(result, dict):
+            raise TypeError(f"Unsupported result type {type(result).__name__}")
+        info = result["info"]
+        values = {
+            "players_current": info["players_current"],
+            "players_max_slots": info["players_max_slots"],
+            "players_bots": info["players_bots"],
+            # GoldSrc servers do not report their app id.
+            "game_app_id": app_id(info.get("game_app_id", 0)),
+            "ping": result.get("server", {}).get("ping", float("nan")),
+        }
+        values = {name: _convert(name, value) for name, value in values.items()}
+        for name in CATEGORICAL_COLUMNS:
+            values[name] = self._dictionaries[name].encode(info[name])
+
+        slot = self.slot(server)
+        for name, value in values.items():
+            self._columns[name][slot] = value
+        return slot
+
+    def update_packet(self, server: Hashable, response: ResponsePacket) -> int:
+        """Store an InfoResponse or InfoGoldSrcResponse packet."""
+        if SNAPSHOT_RESPONSES.get(response.header) != "info":
+            raise ValueError(f"Unexpected response {response}.")
+        result = response.result()
+        result["server"] = {"ping": response.ping}
+        return self.update(server, result)
+
+    def remove(self, server: Hashable) -> None:
+        slot = self._slots.pop(server, None)
+        if slot is None:
+            return
+        self._active[slot] = False
+        self._servers[slot] = None
+        self._free.append(slot)
+
+    def column(self, name: str) -> Any:
+        """Return a column over all slots, see mask() for the valid ones.
+
+        Categorical columns are returned as their integer codes. Stored
+        columns are views, do not modify them.
+        """
+        if name == "players_humans":
+            return self.column("players_current") - self.column("players_bots")
+        if name == "players_free_slots":
+            return self.column("players_max_slots") - self.column("players_current")
+        if name not in self._columns:
+            raise ValueError(f"Unknown column {name!r}.")
+        return self._columns[name][: self._size]
+
+    def mask(
+        self,
+        game_map: Optional[str] = None,
+        game_directory: Optional[str] = None,
+        game_app_id: Optional[int] = None,
+        min_players: Optional[int] = None,
+        min_free_slots: Optional[int] = None,
+        max_ping: Optional[float] = None,
+    ) -> Any:
+        """Return a boolean array selecting the servers matching all filters."""
+        mask = self._active[: self._size].copy()
+        for name, value in (("game_map", game_map), ("game_directory", game_directory)):
+            if value is not None:
+                mask &= self.column(name) == self._dictionaries[name].code(value)
+        if game_app_id is not None:
+            mask &= self.column("game_app_id") == game_app_id
+        if min_players is not None:
+            mask &= self.column("players_current") >= min_players
+        if min_free_slots is not None:
+            mask &= self.column("players_free_slots") >= min_free_slots
+        if max_ping is not None:
+            mask &= self.column("ping") <= max_ping
+        return mask
+
+    def servers(self, mask: Any = None) -> List[Hashable]:
+        """Return the servers selected by `mask`, all of them by default."""
+        if mask is None:
+            mask = self.mask()
+        return [self._servers[slot] for slot in np.flatnonzero(mask)]
+
+    def decode(self, name: str, codes: Any) -> List[str]:
+        """Turn codes of a categorical column back into their values."""
+        values = self._dictionaries[name].values
+        return [values[code] for code in codes]
+
+    def group_by(
+        self,
+        by: str,
+        column: str = "players_current",
+        aggregate: str = "sum",
+        mask: Any = None,
+    ) -> Dict[Any, Any]:
+        """Aggregate `column` per distinct value of `by`.
+
+        `aggregate` is one of "sum", "count", "mean", "min" or "max".
+        Example: total humans per app id with
+        group_by("game_app_id", "players_humans").
+        """
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate {aggregate!r}.")
+        if mask is None:
+            mask = self.mask()
+        keys = self.column(by)[mask]
+        values = self.column(column)[mask]
+        groups, inverse = np.unique(keys, return_inverse=True)
+        if by in CATEGORICAL_COLUMNS:
+            labels = self.decode(by, groups)
+        else:
+            labels = groups.tolist()
+
+        counts = np.bincount(inverse, minlength=len(groups))
+        if aggregate == "count":
+            result = counts
+        elif aggregate in ("sum", "mean"):
+            result = np.bincount(inverse, weights=values, minlength=len(groups))
+            if aggregate == "mean":
+                result = result / counts
+            elif values.dtype.kind in "iu":
+                result = result.astype("int64")
+        else:
+            order = np.argsort(inverse, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            reduce = np.minimum if aggregate == "min" else np.maximum
+            result = reduce.reduceat(values[order], starts) if len(groups) else []
+        return dict(zip(labels, np.asarray(result).tolist()))
+
+    def top_k(
+        self, column: str, k: int = 10, mask: Any = None, largest: bool = True
+    ) -> List[Tuple[Hashable, Any]]:
+        """Return up to `k` (server, value) pairs with the largest values.
+
+        Servers without a value, such as an unknown ping, are left out.
+        """
+        if k < 1:
+            return []
+        if mask is None:
+            mask = self.mask()
+        slots = np.flatnonzero(mask)
+        values = self.column(column)[slots]
+        if values.dtype.kind == "f":
+            known = ~np.isnan(values)
+            slots, values = slots[known], values[known]
+        if not largest:
+            values = -values.astype("float64")
+        if k < len(slots):
+            best = np.argpartition(values, -k)[-k:]
+        else:
+            best = np.arange(len(slots))
+        best = best[np.argsort(values[best], kind="stable")[::-1]]
+        selected = self.column(column)[slots[best]].tolist()
+        return [
+            (self._servers[slot], value)
+            for slot, value in zip(slots[best].tolist(), selected)
+        ]
@@ -0,0 +1,224 @@
+"""
+Steam master server client.
+
+Pages through the server list of the master server query protocol (request
+0x31). Every reply carries up to 231 addresses. The next page is requested
+with the last address of a page as seed as soon as the page arrives, before
+its addresses are decoded and handed out, so the round trip of the next page
+overlaps with the processing of the current one.
+
+Example usage:
+
+import SourceWatch
+from SourceWatch.master import MasterServer, REGION_EUROPE
+
+master = MasterServer(region=REGION_EUROPE, filter=r"\\appid\\240")
+for server in master.servers():
+    print(server)
+"""
+
+import asyncio
+import logging
+import socket
+import struct
+from typing import AsyncIterator, Iterator, List, Optional, Sequence, Tuple
+
+from .async_query import create_endpoint
+from .packet import SourceWatchError
+from .resolver import Resolver, address_family, default_resolver
+from .server import Server
+
+MASTER_SERVER = ("hl2master.steampowered.com", 27011)
+
+MASTER_REQUEST_HEADER = 0x31
+MASTER_RESPONSE_HEADER = b"\xff\xff\xff\xff\x66\x0a"
+# The first request starts at, and the last page ends with, this address.
+FIRST_SEED = "0.0.0.0:0"
+LAST_ADDRESS = ("0.0.0.0", 0)
+# Addresses per reply sent by the Steam master servers.
+PAGE_SIZE = 231
+RECEIVE_SIZE = 4096
+
+REGION_US_EAST = 0x00
+REGION_US_WEST = 0x01
+REGION_SOUTH_AMERICA = 0x02
+REGION_EUROPE = 0x03
+REGION_ASIA = 0x04
+REGION_AUSTRALIA = 0x05
+REGION_MIDDLE_EAST = 0x06
+REGION_AFRICA = 0x07
+REGION_WORLD = 0xFF
+
+# An IPv4 address and a big-endian port.
+_ADDRESS = struct.Struct(">4sH")
+_LAST_ADDRESS = _ADDRESS.pack(socket.inet_aton(LAST_ADDRESS[0]), LAST_ADDRESS[1])
+
+
+def build_request(
+    seed: str = FIRST_SEED, region: int = REGION_WORLD, filter: str = ""
+) -> bytes:
+    """Build the request for the page following the address `seed`."""
+    return (
+        bytes((MASTER_REQUEST_HEADER, region))
+        + seed.encode("ascii")
+        + b"\x00"
+        + filter.encode("utf-8")
+        + b"\x00"
+    )
+
+
+def parse_request(data: bytes) -> Tuple[int, str, str]:
+    """Return the region, seed and filter of a request."""
+    if len(data) < 4 or data[0] != MASTER_REQUEST_HEADER:
+        raise SourceWatchError("Invalid master server request")
+    seed, _, rest = data[2:].partition(b"\x00")
+    filter = rest.split(b"\x00", 1)[0]
+    return data[1], seed.decode("ascii"), filter.decode("utf-8", "replace")
+
+
+def encode_page(addresses: Sequence[Tuple[str, int]]) -> bytes:
+    """Encode a reply listing IPv4 addresses."""
+    return MASTER_RESPONSE_HEADER + b"".join(
+        _ADDRESS.pack(socket.inet_aton(ip), port) for ip, port in addresses
+    )
+
+
+def _check_page(data: bytes) -> None:
+    if data[:6] != MASTER_RESPONSE_HEADER or (len(data) - 6) % _ADDRESS.size:
+        raise SourceWatchError("Invalid master server response")
+
+
+def decode_page(data: bytes) -> List[Server]:
+    """Decode the servers of a reply, leaving out the end marker."""
+    _check_page(data)
+    inet_ntoa = socket.inet_ntoa
+    return [
+        Server(inet_ntoa(ip), port)
+        for ip, port in _ADDRESS.iter_unpack(memoryview(data)[6:])
+        if port
+    ]
+
+
+class _Pages:
+    """Track the pages of a listing and the seed of the next one."""
+
+    def __init__(self) -> None:
+        self.seed = FIRST_SEED
+        self.done = False
+        self._seeds = {FIRST_SEED}
+
+    def accept(self, data: bytes) -> bool:
+        """Check a reply. Returns False for pages that were seen already."""
+        _check_page(data)
+        last = data[-_ADDRESS.size :] if len(data) > 6 else _LAST_ADDRESS
+        if last == _LAST_ADDRESS:
+            self.done = True
+            return True
+        ip, port = _ADDRESS.unpack(last)
+        seed = f"{socket.inet_ntoa(ip)}:{port}"
+        if seed in self._seeds:
+            # A late reply to a request which was sent again.
+            return False
+        self._seeds.add(seed)
+        self.seed = seed
+        return True
+
+
+class MasterServer:
+    """Stream the server list of a master server.
+
+    `filter` is a filter string like r"\\appid\\240\\empty\\1". Unanswered page
+    requests are sent again up to `retries` times before socket.timeout
+    (asyncio.TimeoutError for servers_async) is raised.
+    """
+
+    def __init__(
+        self,
+        host: str = MASTER_SERVER[0],
+        port: int = MASTER_SERVER[1],
+        region: int = REGION_WORLD,
+        filter: str = "",
+        timeout: float = 10,
+        retries: int = 2,
+        resolver: Optional[Resolver] = None,
+    ) -> None:
+        if retries < 0:
+            raise ValueError("retries must not be negative.")
+        self.logger = logging.getLogger("SourceWatch")
+        self._host = host
+        self._port = port
+        self._region = region
+        self._filter = filter
+        self._timeout = timeout
+        self._retries = retries
+        self._resolver = resolver if resolver is not None else default_resolver
+
+    def _request(self, seed: str) -> bytes:
+        self.logger.debug("Requesting servers after %s", seed)
+        return build_request(seed, self._region, self._filter)
+
+    def servers(self) -> Iterator[Server]:
+        """Yield the listed servers while the following pages are fetched."""
+        ip = self._resolver.resolve(self._host)
+        pages = _Pages()
+        with socket.socket(address_family(ip), socket.SOCK_DGRAM) as connection:
+            connection.settimeout(self._timeout)
+            connection.connect((ip, self._port))
+            connection.send(self._request(pages.seed))
+            attempt = 0
+            while True:
+                try:
+                    data = connection.recv(RECEIVE_SIZE)
+                except socket.timeout:
+                    if attempt == self._retries:
+                        raise
+                    attempt += 1
+                    connection.send(self._request(pages.seed))
+                    continue
+                if not pages.accept(data):
+                    continue
+                attempt = 0
+                if not pages.done:
+                    connection.send(self._request(pages.seed))
+                yield from decode_page(data)
+                if pages.done:
+                    return
+
+    async def servers_async(self) -> AsyncIterator[Server]:
+        """Like servers(), on the running event loop.
+
+        Can be passed to Scanner.scan() directly, which then queries the
+        first pages while later ones are still arriving.
+        """
+        ip = await self._resolver.resolve_async(self._host)
+        address = (ip, self._port)
+        pages = _Pages()
+        protocol = await create_endpoint(family=address_family(ip))
+        queue = protocol.register(address)
+        try:
+            protocol.sendto(self._request(pages.seed), address)
+            attempt = 0
+            while True:
+                try:
+                    packet = await asyncio.wait_for(queue.get(), self._timeout)
+                except asyncio.TimeoutError:
+                    if attempt == self._retries:
+                        raise
+                    attempt += 1
+                    protocol.sendto(self._request(pages.seed), address)
+                    continue
+                if isinstance(packet, SourceWatchError):
+                    raise packet
+                data = packet.getvalue()
+                if not pages.accept(data):
+                    continue
+                attempt = 0
+                if not pages.done:
+                    protocol.sendto(self._request(pages.seed), address)
+                for server in decode_page(data):
+                    yield server
+                if pages.done:
+                    return
+        finally:
+            protocol.unregister(address)
+            protocol.transport.close()
@@ -0,0 +1,206 @@
+"""
+Instrumentation hooks and metrics.
+
+Pass a QueryHooks instance to Query to see where the time of a request
+goes. HistogramCollector aggregates the measurements in memory and
+render_prometheus() turns them into the Prometheus text format.
+"""
+
+import bisect
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Upper bounds of the buckets of timing histograms, in seconds.
+SECONDS_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+FRAGMENT_BUCKETS = (1, 2, 3, 4, 6, 8, 16, 32)
+
+
+class ExchangeStats(NamedTuple):
+    """Measurements of a single request/response round trip."""
+
+    # Seconds from sending the request until the first datagram arrived.
+    first_byte: float
+    # Seconds from the first until the last datagram of the response.
+    reassembly: float
+    bytes_out: int
+    bytes_in: int
+    # Datagrams received, including fragments of split responses.
+    fragments: int
+
+
+class QueryHooks:
+    """Callbacks invoked by Query. Every hook does nothing by default.
+
+    Hooks run on the hot path, so keep them cheap.
+    """
+
+    def dns(self, host: str, seconds: float) -> None:
+        """The host name was resolved."""
+
+    def challenge(self, server: Any, seconds: float) -> None:
+        """A round trip was spent on fetching a new challenge."""
+
+    def exchange(self, server: Any, packet: Any, stats: ExchangeStats) -> None:
+        """A response to the request `packet` was received."""
+
+    def parse(self, server: Any, response: Any, seconds: float) -> None:
+        """A response packet was turned into the result."""
+
+    def timeout(self, server: Any, packet: Any) -> None:
+        """The request `packet` timed out."""
+
+    def invalid_response(self, server: Any, error: Exception) -> None:
+        """A response could not be reassembled or decoded."""
+
+
+class Histogram:
+    """Counts of observations per bucket, like a Prometheus histogram."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = tuple(bounds)
+        # The last bucket counts the observations above all bounds.
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """Return (upper bound, observations <= bound) pairs, ending with inf."""
+        buckets = []
+        total = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket holding it."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float("inf")
+
+
+class HistogramCollector(QueryHooks):
+    """Aggregate the hooks into histograms and counters in memory.
+
+    Metrics are labelled by request type only, not by server, so their
+    number stays constant across a fleet of any size. A collector is thread
+    safe, so one instance can be shared by the queries of many threads.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.counters: Dict[Tuple[str, str], float] = {}
+
+    def observe(
+        self,
+        name: str,
+        request: str,
+        value: float,
+        bounds: Sequence[float] = SECONDS_BUCKETS,
+    ) -> None:
+        with self._lock:
+            histogram = self.histograms.get((name, request))
+            if histogram is None:
+                histogram = self.histograms[(name, request)] = Histogram(bounds)
+            histogram.observe(value)
+
+    def count(self, name: str, request: str, value: float = 1) -> None:
+        key = (name, request)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def dns(self, host: str, seconds: float) -> None:
+        self.observe("dns_seconds", "", seconds)
+
+    def challenge(self, server: Any, seconds: float) -> None:
+        self.observe("challenge_seconds", "", seconds)
+
+    def exchange(self, server: Any, packet: Any, stats: ExchangeStats) -> None:
+        request = packet.class_name()
+        self.observe("first_byte_seconds", request, stats.first_byte)
+        self.observe("reassembly_seconds", request, stats.reassembly)
+        self.observe("fragments", request, stats.fragments, FRAGMENT_BUCKETS)
+        self.count("bytes_sent_total", request, stats.bytes_out)
+        self.count("bytes_received_total", request, stats.bytes_in)
+
+    def parse(self, server: Any, response: Any, seconds: float) -> None:
+        self.observe("parse_seconds", response.class_name(), seconds)
+
+    def timeout(self, server: Any, packet: Any) -> None:
+        self.count("timeouts_total", packet.class_name())
+
+    def invalid_response(self, server: Any, error: Exception) -> None:
+        self.count("invalid_responses_total", "")
+
+
+def _labels(request: str, **extra: str) -> str:
+    labels = {"request": request} if request else {}
+    labels.update(extra)
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def render_prometheus(
+    collector: HistogramCollector, namespace: str = "sourcewatch"
+) -> str:
+    """Render the collected metrics in the Prometheus text exposition format."""
+    with collector._lock:
+        return _render(collector, namespace)
+
+
+def _render(collector: HistogramCollector, namespace: str) -> str:
+    lines: List[str] = []
+    typed = set()
+
+    for (name, request), histogram in sorted(collector.histograms.items()):
+        metric = f"{namespace}_{name}"
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} histogram")
+        for bound, total in histogram.cumulative():
+            labels = _labels(request, le=_format_bound(bound))
+            lines.append(f"{metric}_bucket{labels} {total}")
+        lines.append(f"{metric}_sum{_labels(request)} {histogram.sum!r}")
+        lines.append(f"{metric}_count{_labels(request)} {histogram.count}")
+
+    for (name, request), value in sorted(collector.counters.items()):
+        metric = f"{namespace}_{name}"
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{_labels(request)} {value!r}")
+
+    return "\n".join(lines) + "\n"
@@ -1,13 +1,30 @@
+import hashlib
+import io
 import struct
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple, Union
 
 from SourceWatch.models import (
     GoldSrcResponseModel,
+    InfoResponseModel,
     PlayersResponseModel,
     RulesResponseModel,
     SourceInfoResponseModel,
 )
-from .buffer import SteamPacketBuffer
+from .buffer import SteamPacketBuffer, SteamPacketReader
+from .records import (
+    GoldSrcInfo,
+    InfoResult,
+    Player,
+    PlayersResult,
+    Rules,
+    RulesResult,
+    ServerRecord,
+    SourceInfo,
+)
+from .decoders import decode_goldsrc_info, decode_info, decode_players, decode_rules
+
+# Challenge number asking the server to hand out a new challenge.
+NO_CHALLENGE = -1
 
 
 class SourceWatchError(Exception):
@@ -68,12 +85,17 @@ class RequestPacket(BasePacket):
 
     @challenge.setter
     def challenge(self, value: int) -> None:
+        if self._challenge is not None:
+            # Overwrite the challenge written previously.
+            self._buffer.seek(-4, io.SEEK_END)
         self._challenge = value
         self._buffer.write_long(value)
 
 
 class ResponsePacket(BasePacket):
-    def __init__(self, buffer: SteamPacketBuffer, ping: float) -> None:
+    def __init__(
+        self, buffer: Union[SteamPacketBuffer, SteamPacketReader], ping: float
+    ) -> None:
         super().__init__()
         self._buffer = buffer
         self._ping = ping
@@ -92,6 +114,22 @@ class ResponsePacket(BasePacket):
         self._buffer.seek(0)
         return self._result
 
+    def record(self, server: ServerRecord) -> Any:
+        """Return the result as a compact record. See SourceWatch.records."""
+        return None
+
+    def model(self, result: Dict[str, Any]) -> Any:
+        """Turn a result dict including its "server" entry into a Pydantic model."""
+        return None
+
+    def digest(self) -> bytes:
+        """Hash of the raw response. Byte-identical responses share a digest."""
+        return hashlib.blake2b(self._buffer.getvalue(), digest_size=16).digest()
+
+    def _payload(self) -> Tuple[bytes, int]:
+        """Return the raw payload and the offset of the unread body."""
+        return self._buffer.getvalue(), self._buffer.tell()
+
 
 class InfoRequest(RequestPacket, Challengeable):
     REQUEST_HEADER = 0x54
@@ -106,6 +144,16 @@ class InfoResponse(ResponsePacket):
     RESPONSE_HEADER = 0x49  # 0x6D  Counter-Strike 1.6
 
     def result(self) -> SourceInfoResponseModel:
+        return {"info": decode_info(*self._payload())}
+
+    def record(self, server: ServerRecord) -> InfoResult:
+        return InfoResult(SourceInfo.from_dict(decode_info(*self._payload())), server)
+
+    def model(self, result: Dict[str, Any]) -> InfoResponseModel:
+        return InfoResponseModel.model_validate(result)
+
+    def reference_result(self) -> SourceInfoResponseModel:
+        """Step-by-step parser kept as reference for decode_info."""
         info = {
             "server_protocol_version": self._buffer.read_byte(),
             "server_name": self._buffer.read_string(),
@@ -154,6 +202,17 @@ class InfoGoldSrcResponse(ResponsePacket, Challengeable):
     RESPONSE_HEADER = 0x6D
 
     def result(self) -> GoldSrcResponseModel:
+        return {"info": decode_goldsrc_info(*self._payload())}
+
+    def record(self, server: ServerRecord) -> InfoResult:
+        info = decode_goldsrc_info(*self._payload())
+        return InfoResult(GoldSrcInfo.from_dict(info), server)
+
+    def model(self, result: Dict[str, Any]) -> InfoResponseModel:
+        return InfoResponseModel.model_validate(result)
+
+    def reference_result(self) -> GoldSrcResponseModel:
+        """Step-by-step parser kept as reference for decode_goldsrc_info."""
         info = {
             "server_address": self._buffer.read_string(),
             "server_name": self._buffer.read_string(),
@@ -181,7 +240,7 @@ class InfoGoldSrcResponse(ResponsePacket, Challengeable):
 
 class ChallengeRequest(RequestPacket):
     REQUEST_HEADER = 0x56
-    REQUEST_CHALLENGE = -1
+    REQUEST_CHALLENGE = NO_CHALLENGE
 
     def __init__(self) -> None:
         super().__init__()
@@ -207,6 +266,16 @@ class RulesResponse(ResponsePacket):
     RESPONSE_HEADER = 0x45
 
     def result(self) -> RulesResponseModel:
+        return {"rules": decode_rules(*self._payload())}
+
+    def record(self, server: ServerRecord) -> RulesResult:
+        return RulesResult(Rules.from_dict(decode_rules(*self._payload())), server)
+
+    def model(self, result: Dict[str, Any]) -> RulesResponseModel:
+        return RulesResponseModel.model_validate(result)
+
+    def reference_result(self) -> RulesResponseModel:
+        """Step-by-step parser kept as reference for decode_rules."""
         rules = {}
         total_rules = self._buffer.read_short()
         for _ in range(total_rules):
@@ -224,6 +293,17 @@ class PlayersResponse(ResponsePacket):
     RESPONSE_HEADER = 0x44
 
     def result(self) -> PlayersResponseModel:
+        return {"players": decode_players(*self._payload())}
+
+    def record(self, server: ServerRecord) -> PlayersResult:
+        players = decode_players(*self._payload())
+        return PlayersResult(tuple(map(Player.from_dict, players)), server)
+
+    def model(self, result: Dict[str, Any]) -> PlayersResponseModel:
+        return PlayersResponseModel.model_validate(result)
+
+    def reference_result(self) -> PlayersResponseModel:
+        """Step-by-step parser kept as reference for decode_players."""
         total_players = self._buffer.read_byte()
         players = []
         for i in range(total_players):
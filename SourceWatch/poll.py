@@ -0,0 +1,190 @@
+"""
+Poll a list of servers and write the results as NDJSON.
+
+The server list ("ip:port" per line) is split into chunks which are handed
+to a pool of worker processes. Every worker queries its chunk concurrently
+with a Scanner.
+
+Example usage:
+
+python -m SourceWatch.poll servers.txt --requests info players --workers 8
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .scanner import REQUESTS, Scanner, ScanResult
+from .utils import chunked
+
+
+def read_servers(lines: Iterable[str]) -> Iterator[str]:
+    """Yield server addresses, skipping blank lines and # comments."""
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if line:
+            yield line
+
+
+def serialize(item: ScanResult) -> str:
+    record: Dict[str, Any] = {
+        "server": str(item.server),
+        "request": item.request,
+        "result": item.result,
+        "error": None,
+    }
+    if item.error is not None:
+        message = str(item.error)
+        name = type(item.error).__name__
+        record["error"] = f"{name}: {message}" if message else name
+    return json.dumps(record, ensure_ascii=False)
+
+
+def poll_chunk(servers: List[str], options: Dict[str, Any]) -> List[str]:
+    """Query a chunk of servers and return the NDJSON lines."""
+    scanner = Scanner(**options)
+    return [serialize(item) for item in scanner.run(servers)]
+
+
+def _poll_chunk(args: Any) -> List[str]:
+    return poll_chunk(*args)
+
+
+def poll(
+    servers: Sequence[str],
+    output: IO[str],
+    workers: int,
+    chunk_size: int,
+    options: Dict[str, Any],
+) -> int:
+    """Poll all servers and write one line per request. Returns the count."""
+    tasks = ((chunk, options) for chunk in chunked(servers, chunk_size))
+    written = 0
+
+    if workers == 1:
+        results: Iterable[List[str]] = map(_poll_chunk, tasks)
+        for lines in results:
+            written += write_lines(output, lines)
+        return written
+
+    with multiprocessing.Pool(workers) as pool:
+        for lines in pool.imap_unordered(_poll_chunk, tasks):
+            written += write_lines(output, lines)
+    return written
+
+
+def write_lines(output: IO[str], lines: List[str]) -> int:
+    for line in lines:
+        output.write(line)
+        output.write("\n")
+    output.flush()
+    return len(lines)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m SourceWatch.poll",
+        description="Poll Source/GoldSrc servers and write NDJSON results.",
+    )
+    parser.add_argument(
+        "input",
+        nargs="?",
+        type=argparse.FileType("r"),
+        default=sys.stdin,
+        help='server list with one "ip:port" per line (default: stdin)',
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=argparse.FileType("w"),
+        default=sys.stdout,
+        help="write results to this file (default: stdout)",
+    )
+    parser.add_argument(
+        "-r",
+        "--requests",
+        nargs="+",
+        choices=REQUESTS,
+        default=["info"],
+        help="requests to send to every server (default: info)",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=500,
+        help="servers queried concurrently per worker (default: 500)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=2000,
+        help="servers handed to a worker at once (default: 2000)",
+    )
+    parser.add_argument(
+        "-t",
+        "--timeout",
+        type=float,
+        default=2.0,
+        help="timeout per request in seconds (default: 2)",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=1,
+        help="retries of timed out requests (default: 1)",
+    )
+    parser.add_argument(
+        "--sockets",
+        type=int,
+        default=1,
+        help="UDP sockets per worker (default: 1)",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    for name in ("workers", "concurrency", "chunk_size", "sockets"):
+        if getattr(args, name) < 1:
+            parser.error(f"--{name.replace('_', '-')} must be positive")
+    if args.retries < 0:
+        parser.error("--retries must not be negative")
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    servers = list(read_servers(args.input))
+    if args.input is not sys.stdin:
+        args.input.close()
+
+    options = {
+        "requests": args.requests,
+        "max_in_flight": args.concurrency,
+        "timeout": args.timeout,
+        "sockets": args.sockets,
+        "retries": args.retries,
+    }
+    workers = min(args.workers, max(1, -(-len(servers) // args.chunk_size)))
+
+    try:
+        poll(servers, args.output, workers, args.chunk_size, options)
+    finally:
+        if args.output is not sys.stdout:
+            args.output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Query many servers from synchronous code on a bounded thread pool.
+
+Every task queries one server with a Query of its own. Idle queries are
+kept per server address, so repeated polls reuse their sockets, resolved
+addresses and challenges instead of starting from scratch.
+"""
+
+import collections
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Sequence, Tuple
+from .cache import ChallengeCache, ResponseCache
+from .packet import SourceWatchError
+from .query import RESULT_FORMATS, Query
+from .resolver import Resolver, default_resolver
+from .scanner import REQUESTS, ScanResult, ScanTarget, as_server, resolve_server
+from .scheduler import RttScheduler
+from .server import AnyServer
+
+
+class QueryPool:
+    """
+    Example usage:
+
+    import SourceWatch
+
+    servers = ['1.2.3.4:27015', SourceWatch.Server('5.6.7.8', 27016)]
+    with SourceWatch.QueryPool(requests=('info', 'players')) as pool:
+        for item in pool.as_completed(servers):
+            print(item.server, item.request, item.result or item.error)
+    """
+
+    def __init__(
+        self,
+        requests: Sequence[str] = ("info",),
+        max_workers: int = 32,
+        timeout: int = 10,
+        max_idle: int = 256,
+        challenge_cache: Optional[ChallengeCache] = None,
+        result_format: str = "dict",
+        scheduler: Optional[RttScheduler] = None,
+        response_cache: Optional[ResponseCache] = None,
+        resolver: Optional[Resolver] = None,
+    ) -> None:
+        """`timeout` applies to every single request, not to the whole batch.
+
+        Up to `max_idle` queries are kept open between tasks, the least
+        recently used ones are closed first.
+
+        Host names are resolved on the worker threads, not by the caller.
+        See Query and Scanner for the other options.
+        """
+        for request in requests:
+            if request not in REQUESTS:
+                raise ValueError(f"Unknown request type: {request}")
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result format: {result_format}")
+        if max_workers < 1 or max_idle < 0:
+            raise ValueError("max_workers must be positive, max_idle not negative.")
+        self.logger = logging.getLogger("SourceWatch")
+        self._requests = tuple(requests)
+        self._max_workers = max_workers
+        self._timeout = timeout
+        self._max_idle = max_idle
+        self._result_format = result_format
+        self._scheduler = scheduler
+        self._response_cache = response_cache
+        self._resolver = resolver if resolver is not None else default_resolver
+        self._challenges = (
+            challenge_cache if challenge_cache is not None else ChallengeCache()
+        )
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers, thread_name_prefix="SourceWatch"
+        )
+        self._lock = threading.Lock()
+        self._idle: "collections.OrderedDict[Tuple[str, int], Query]" = (
+            collections.OrderedDict()
+        )
+
+    def __enter__(self) -> "QueryPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Wait for running tasks and close all sockets."""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for query in self._idle.values():
+                query.close()
+            self._idle.clear()
+
+    def _checkout(self, server: AnyServer) -> Query:
+        with self._lock:
+            query = self._idle.pop(server.as_tuple(), None)
+        if query is None:
+            query = Query(
+                server.ip,
+                server.port,
+                self._timeout,
+                challenge_cache=self._challenges,
+                result_format=self._result_format,
+                scheduler=self._scheduler,
+                response_cache=self._response_cache,
+                resolver=self._resolver,
+                lazy=True,
+                server=server,
+            )
+        return query
+
+    def _checkin(self, server: AnyServer, query: Query) -> None:
+        closing = []
+        with self._lock:
+            previous = self._idle.pop(server.as_tuple(), None)
+            if previous is not None:
+                closing.append(previous)
+            self._idle[server.as_tuple()] = query
+            while len(self._idle) > self._max_idle:
+                closing.append(self._idle.popitem(last=False)[1])
+        for idle in closing:
+            idle.close()
+
+    def _query(self, server: AnyServer) -> List[ScanResult]:
+        try:
+            ip = self._resolver.resolve(server.ip)
+        except OSError as error:
+            return [
+                ScanResult(server, request, None, error) for request in self._requests
+            ]
+
+        # The scheduler and caches are keyed on the resolved address.
+        resolved = resolve_server(server, ip)
+        if self._scheduler is not None and not self._scheduler.is_due(resolved):
+            error = SourceWatchError("Skipped unresponsive server", str(server))
+            return [
+                ScanResult(server, request, None, error) for request in self._requests
+            ]
+
+        query = self._checkout(resolved)
+        results = []
+        # Once the server is unreachable, its remaining requests are not sent.
+        unreachable: Optional[Exception] = None
+        try:
+            for request in self._requests:
+                if unreachable is not None:
+                    results.append(ScanResult(server, request, None, unreachable))
+                    continue
+                try:
+                    result = getattr(query, request)()
+                except OSError as error:
+                    unreachable = error
+                    results.append(ScanResult(server, request, None, error))
+                except Exception as error:
+                    self.logger.debug(
+                        "Request %s to %s failed: %r", request, server, error
+                    )
+                    results.append(ScanResult(server, request, None, error))
+                else:
+                    results.append(ScanResult(server, request, result, None))
+        finally:
+            self._checkin(resolved, query)
+        return results
+
+    def _servers(self, targets: Iterable[ScanTarget]) -> Iterator[AnyServer]:
+        for target in targets:
+            try:
+                yield as_server(target)
+            except (ValueError, TypeError) as error:
+                self.logger.warning("Skipping invalid server %r: %s", target, error)
+
+    def map(self, servers: Iterable[ScanTarget]) -> Iterator[ScanResult]:
+        """Query all servers and yield the results in the order of `servers`."""
+        pending: Deque[concurrent.futures.Future] = collections.deque()
+        for server in self._servers(servers):
+            if len(pending) >= 2 * self._max_workers:
+                yield from pending.popleft().result()
+            pending.append(self._executor.submit(self._query, server))
+        while pending:
+            yield from pending.popleft().result()
+
+    def as_completed(self, servers: Iterable[ScanTarget]) -> Iterator[ScanResult]:
+        """Query all servers and yield the results as they complete.
+
+        The results of a server are yielded together, in request order.
+        """
+        pending = set()
+        for server in self._servers(servers):
+            if len(pending) >= 2 * self._max_workers:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    yield from future.result()
+            pending.add(self._executor.submit(self._query, server))
+        for future in concurrent.futures.as_completed(pending):
+            yield from future.result()
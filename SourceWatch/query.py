@@ -1,26 +1,40 @@
-# See: http://developer.valvesoftware.com/wiki/Server_Queries
-#
-# TODO: according to spec, packets may be bzip2 compressed.
-#       not implemented yet because I couldn't find a server that does this.
+"""
+Blocking A2S queries over a UDP socket.
 
+See: http://developer.valvesoftware.com/wiki/Server_Queries
+"""
 
 import logging
+import selectors
 import socket
+import struct
 import time
-from typing import Dict, List, Optional, Callable, Any
-from .buffer import SteamPacketBuffer
-from .server import Server
+from typing import Dict, List, Optional, Callable, Any, Tuple
+from .buffer import SteamPacketReader
+from .cache import ChallengeCache, ResponseCache
+from .server import AnyServer, Server
 from .packet import (
+    NO_CHALLENGE,
     ChallengeRequest,
+    ChallengeResponse,
     Challengeable,
+    InfoGoldSrcResponse,
     InfoRequest,
+    InfoResponse,
     PlayersRequest,
+    PlayersResponse,
     RequestPacket,
     ResponsePacket,
     RulesRequest,
+    RulesResponse,
     SourceWatchError,
     create_response,
 )
+from .reassembly import Reassembler
+from .metrics import ExchangeStats, QueryHooks
+from .records import ServerRecord
+from .resolver import Resolver, address_family, default_resolver
+from .scheduler import RttScheduler
 from .models import (
     InfoResponseModel,
     PlayersResponseModel,
@@ -28,8 +42,126 @@ from .models import (
 )
 
 PACKET_SIZE = 1400
-SINGLE_PACKET_RESPONSE = -1
-MULTIPLE_PACKET_RESPONSE = -2
+
+SINGLE_PACKET_HEADER = b"\xff\xff\xff\xff"
+MULTIPLE_PACKET_HEADER = b"\xfe\xff\xff\xff"
+# Single packet replies accepted as answer to a latency probe.
+PROBE_RESPONSES = {
+    bytes([InfoResponse.RESPONSE_HEADER]),
+    bytes([InfoGoldSrcResponse.RESPONSE_HEADER]),
+    bytes([ChallengeResponse.RESPONSE_HEADER]),
+}
+
+# Request name -> packet class, see fetch().
+REQUEST_PACKETS = {
+    "info": InfoRequest,
+    "players": PlayersRequest,
+    "rules": RulesRequest,
+}
+
+# Request class -> headers of the responses answering it, besides challenges.
+EXPECTED_RESPONSES = {
+    ChallengeRequest: (),
+    InfoRequest: (InfoResponse.RESPONSE_HEADER, InfoGoldSrcResponse.RESPONSE_HEADER),
+    PlayersRequest: (PlayersResponse.RESPONSE_HEADER,),
+    RulesRequest: (RulesResponse.RESPONSE_HEADER,),
+}
+
+# Response header -> name of the snapshot entry it answers.
+SNAPSHOT_RESPONSES = {
+    InfoResponse.RESPONSE_HEADER: "info",
+    InfoGoldSrcResponse.RESPONSE_HEADER: "info",
+    PlayersResponse.RESPONSE_HEADER: "players",
+    RulesResponse.RESPONSE_HEADER: "rules",
+}
+
+# "dict" returns nested dicts, "record" returns compact SourceWatch.records
+# and "model" returns validated Pydantic models.
+RESULT_FORMATS = ("dict", "record", "model")
+
+
+def probe_statistics(sent: int, rtts: List[int]) -> Dict[str, Any]:
+    """Summarize round trip times given in nanoseconds."""
+    stats: Dict[str, Any] = {
+        "sent": sent,
+        "received": len(rtts),
+        "loss": round((sent - len(rtts)) / sent * 100, 2) if sent else 0.0,
+        "min": None,
+        "avg": None,
+        "max": None,
+        "jitter": None,
+    }
+    if rtts:
+        # Jitter is the mean difference between consecutive round trips.
+        deltas = [abs(b - a) for a, b in zip(rtts, rtts[1:])]
+        stats["min"] = round(min(rtts) / 1e6, 3)
+        stats["avg"] = round(sum(rtts) / len(rtts) / 1e6, 3)
+        stats["max"] = round(max(rtts) / 1e6, 3)
+        stats["jitter"] = round(sum(deltas) / len(deltas) / 1e6, 3) if deltas else 0.0
+    return stats
+
+
+def is_expected_response(packet: RequestPacket, result: SteamPacketReader) -> bool:
+    """Tell whether a reassembled response answers the request `packet`.
+
+    Late replies to earlier requests on a reused socket are either of another
+    type, or a challenge the request already carries. A ChallengeRequest is
+    answered by a challenge only.
+    """
+    position = result.tell()
+    try:
+        response_type = result.read_byte()
+        if response_type == ChallengeResponse.RESPONSE_HEADER:
+            return (
+                isinstance(packet, (Challengeable, ChallengeRequest))
+                and result.read_long() != packet.challenge
+            )
+    finally:
+        result.seek(position)
+    expected = EXPECTED_RESPONSES.get(type(packet))
+    return expected is None or response_type in expected
+
+
+def format_result(
+    response: ResponsePacket,
+    server: Server,
+    result_format: str,
+    response_cache: Optional[ResponseCache] = None,
+) -> Any:
+    """Turn a response packet into the result handed out to the caller.
+
+    With a `response_cache`, byte-identical responses of a server are not
+    decoded again.
+    """
+
+    def decode(kind: str, parse: Callable[[], Any]) -> Any:
+        if response_cache is None:
+            return parse()
+        key = (server, response.header, kind)
+        digest = response.digest()
+        result = response_cache.get(key, digest)
+        if result is None:
+            result = parse()
+            response_cache.set(key, digest, result)
+        return result
+
+    if result_format == "record":
+        record = ServerRecord(server.ip, server.port, response.ping)
+        result = decode("record", lambda: response.record(record))
+        return None if result is None else result._replace(server=record)
+
+    result = decode("dict", response.result)
+    if result is not None:
+        # Copy the outer dict, the decoded body may be shared via the cache.
+        result = dict(result)
+        result["server"] = {
+            "ip": server.ip,
+            "port": server.port,
+            "ping": response.ping,
+        }
+        if result_format == "model":
+            return response.model(result)
+    return result
 
 
 class Query:
@@ -37,118 +169,415 @@ class Query:
     Example usage:
 
     import SourceWatch
-    server = SourceWatch.Query('1.2.3.4', 27015)
-    print(server.ping())
-    print(server.info())
-    print(server.players())
-    print(server.rules())
+    with SourceWatch.Query('1.2.3.4', 27015) as server:
+        print(server.ping())
+        print(server.info())
+        print(server.players())
+        print(server.rules())
     """
 
-    def __init__(self, host: str, port: int = 27015, timeout: int = 10) -> None:
+    def __init__(
+        self,
+        host: str,
+        port: int = 27015,
+        timeout: int = 10,
+        challenge_cache: Optional[ChallengeCache] = None,
+        result_format: str = "dict",
+        scheduler: Optional[RttScheduler] = None,
+        response_cache: Optional[ResponseCache] = None,
+        hooks: Optional[QueryHooks] = None,
+        resolver: Optional[Resolver] = None,
+        lazy: bool = False,
+        reuse_connection: bool = True,
+        server: Optional[AnyServer] = None,
+    ) -> None:
+        """Share a `challenge_cache` between queries to skip challenge round trips.
+
+        Pass result_format="record" to get compact records instead of dicts, or
+        "model" to get Pydantic models.
+
+        With a `scheduler` the timeout of every request is derived from the
+        round trip times seen so far and timed out requests are retried.
+
+        With a `response_cache` the parsed results are reused as long as a
+        server sends byte-identical responses. Cached results are shared, so
+        do not modify them.
+
+        `hooks` are notified about DNS, challenge, round trip and parse times,
+        transferred bytes, timeouts and invalid responses. See
+        SourceWatch.metrics.
+
+        Host names are resolved through `resolver`, by default a cache shared
+        by all queries, to IPv4 or IPv6 addresses. With `lazy` the host is
+        resolved and the socket opened on the first request instead of here.
+        An already resolved `server`, such as an interned CompactServer, is
+        used as is instead; it also keys the caches and the scheduler.
+
+        The socket is kept open between requests; late replies to earlier
+        requests are told apart by their type and challenge and dropped. Pass
+        reuse_connection=False to open a new socket for every request instead.
+        Call close(), or use the query as a context manager, to release it.
+        """
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result format: {result_format}")
         self.logger = logging.getLogger("SourceWatch")
-        self.server = Server(socket.gethostbyname(host), port)
+        self._hooks = hooks
+        self._host = host
+        self._port = port
+        self._resolver = resolver if resolver is not None else default_resolver
+        self._server = server
+        self._connection: Optional[socket.socket] = None
         self._timeout = timeout
-        self._connect()
+        self._result_format = result_format
+        self._scheduler = scheduler
+        self._response_cache = response_cache
+        self._reuse_connection = reuse_connection
+        self._reassembler = Reassembler(timeout)
+        # (arrival time, size) of the datagrams received, tracked for hooks.
+        self._datagrams: List[Tuple[float, int]] = []
+        self._challenges = (
+            challenge_cache if challenge_cache is not None else ChallengeCache()
+        )
+        if not lazy:
+            self._connect()
+
+    def __enter__(self) -> "Query":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
 
     def __del__(self) -> None:
-        self._connection.close()
+        # Last resort only, the socket may stay open until garbage collection.
+        if getattr(self, "_connection", None) is not None:
+            self.close()
+
+    def close(self) -> None:
+        """Close the socket. A later request opens a new one."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """The host and port as given, without resolving the host."""
+        return (self._host, self._port)
+
+    @property
+    def server(self) -> AnyServer:
+        """The server address, resolving the host on first use."""
+        if self._server is None:
+            resolve_start = time.perf_counter()
+            ip = self._resolver.resolve(self._host)
+            if self._hooks is not None:
+                self._hooks.dns(self._host, time.perf_counter() - resolve_start)
+            self._server = Server(ip, self._port)
+        return self._server
 
     def _connect(self) -> None:
-        self.logger.info("Connecting to %s", self.server)
-        self._connection = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server = self.server
+        self.logger.info("Connecting to %s", server)
+        self._connection = socket.socket(address_family(server.ip), socket.SOCK_DGRAM)
         self._connection.settimeout(self._timeout)
-        self._connection.connect(self.server.as_tuple())
+        self._connection.connect(server.as_tuple())
 
     def _reconnect(self) -> None:
         """Reconnect to ensure fresh connection state"""
-        self._connection.close()
+        if self._connection is not None:
+            self._connection.close()
         self._connect()
 
-    def _receive(
-        self, packet_buffer: Optional[Dict[int, List[bytes]]] = None
-    ) -> SteamPacketBuffer:
-        response = self._connection.recv(PACKET_SIZE)
-        packet = SteamPacketBuffer(response)
-        response_format = packet.read_long()
-
-        if response_format == SINGLE_PACKET_RESPONSE:
-            self.logger.debug("Got single packet response")
-            return packet
-
-        elif response_format == MULTIPLE_PACKET_RESPONSE:
-            self.logger.debug("Got multiple packet response")
-            request_id = packet.read_long()  # TODO: compressed?
-
-            if packet_buffer is None:
-                packet_buffer = {}
-
-            if request_id not in packet_buffer:
-                packet_buffer[request_id] = []
-
-            total_packets = packet.read_byte()
-            current_packet_number = packet.read_byte()
-            packet_size = packet.read_short()
-            payload = packet.read()
-
-            # Validate packet size matches what we received
-            if len(payload) != packet_size:
-                self.logger.warning(
-                    "Packet size mismatch: expected %d, got %d",
-                    packet_size,
-                    len(payload),
-                )
-
-            packet_buffer[request_id].insert(current_packet_number, payload)
-
-            if current_packet_number == total_packets - 1:
-                full_packet = SteamPacketBuffer(b"".join(packet_buffer[request_id]))
-
-                if full_packet.read_long() == SINGLE_PACKET_RESPONSE:
-                    return full_packet
-            else:
-                return self._receive(packet_buffer)
+    def _refresh_connection(self) -> None:
+        """Prepare the socket for a new challenge-based exchange."""
+        if self._connection is None:
+            self._connect()
+        elif self._reuse_connection:
+            self._discard_pending()
         else:
-            self.logger.error("Received invalid response type: %s", response_format)
-            raise SourceWatchError("Received invalid response type")
+            self._reconnect()
 
-    def _get_challenge(self) -> int:
-        response = self._send(ChallengeRequest())
-        response.is_valid()
-        return response.raw
+    def _discard_pending(self) -> None:
+        """Drop stale datagrams left over from earlier requests."""
+        self._connection.setblocking(False)
+        try:
+            while True:
+                try:
+                    self._connection.recv(PACKET_SIZE)
+                except ConnectionRefusedError:
+                    continue
+        except BlockingIOError:
+            pass
+        finally:
+            self._connection.settimeout(self._timeout)
+
+    def _receive(self) -> SteamPacketReader:
+        while True:
+            response = self._connection.recv(PACKET_SIZE)
+            if self._hooks is None:
+                packet = self._reassembler.feed(response)
+            else:
+                self._datagrams.append((time.perf_counter(), len(response)))
+                try:
+                    packet = self._reassembler.feed(response)
+                except (SourceWatchError, struct.error) as error:
+                    self._hooks.invalid_response(self.server, error)
+                    raise
+            if packet is not None:
+                return packet
 
     def _send(self, packet: RequestPacket) -> ResponsePacket:
-        if isinstance(packet, Challengeable):
-            # Reconnect to ensure fresh state for challenge-based queries
-            self._reconnect()
-            challenge = self._get_challenge()
-            self.logger.debug("Using challenge: %s", challenge)
-            packet.challenge = challenge
+        if self._connection is None:
+            self._connect()
+        if not isinstance(packet, Challengeable):
+            return self._exchange(packet)
+
+        self._refresh_connection()
+        challenge = self._challenges.get(self.server)
+        packet.challenge = NO_CHALLENGE if challenge is None else challenge
+        self.logger.debug("Using challenge: %s", packet.challenge)
+        response = self._exchange(packet)
+
+        if isinstance(response, ChallengeResponse):
+            if self._hooks is not None:
+                self._hooks.challenge(self.server, response.ping / 1000)
+            # The challenge was missing or expired. Retry once with the new one.
+            packet.challenge = response.raw
+            self._challenges.set(self.server, packet.challenge)
+            self.logger.debug("Retrying with challenge: %s", packet.challenge)
+            response = self._exchange(packet)
+
+        return response
 
+    def _exchange(self, packet: RequestPacket) -> ResponsePacket:
+        if self._scheduler is None:
+            return self._roundtrip(packet)
+
+        try:
+            for attempt in range(self._scheduler.retries + 1):
+                self._connection.settimeout(
+                    self._scheduler.timeout(self.server, attempt)
+                )
+                try:
+                    response = self._roundtrip(packet)
+                except socket.timeout:
+                    if attempt == self._scheduler.retries:
+                        self._scheduler.failure(self.server)
+                        raise
+                    self.logger.debug("Retrying request to %s", self.server)
+                else:
+                    self._scheduler.observe(self.server, response.ping)
+                    return response
+        finally:
+            self._connection.settimeout(self._timeout)
+
+    def _roundtrip(self, packet: RequestPacket) -> ResponsePacket:
         self.logger.debug("Sending packet: %s", packet)
-        timer_start = time.time()
-        self._connection.send(packet.as_bytes())
-        result = self._receive()
+        data = packet.as_bytes()
+        self._datagrams.clear()
+        timer_start = time.perf_counter()
+        self._connection.send(data)
+        try:
+            while True:
+                result = self._receive()
+                if is_expected_response(packet, result):
+                    break
+                self.logger.debug("Dropping stale response to %s", packet)
+                self._datagrams.clear()
+        except socket.timeout:
+            if self._hooks is not None:
+                self._hooks.timeout(self.server, packet)
+            raise
+        if self._hooks is not None:
+            self._hooks.exchange(
+                self.server, packet, self._exchange_stats(timer_start, len(data))
+            )
         response_type = result.read_byte()
         # Reset buffer position and skip reading the request format.
         result.seek(0)
         result.read_long()
-        ping = round((time.time() - timer_start) * 1000, 2)
+        ping = round((time.perf_counter() - timer_start) * 1000, 2)
         response = create_response(response_type, result, ping)
         self.logger.debug("Received package: %s", response)
 
         return response
 
+    def _exchange_stats(self, sent_at: float, bytes_out: int) -> ExchangeStats:
+        first_byte_at = self._datagrams[0][0]
+        return ExchangeStats(
+            first_byte=first_byte_at - sent_at,
+            reassembly=self._datagrams[-1][0] - first_byte_at,
+            bytes_out=bytes_out,
+            bytes_in=sum(size for _, size in self._datagrams),
+            fragments=len(self._datagrams),
+        )
+
+    def _format(self, response: ResponsePacket) -> Any:
+        if self._hooks is None:
+            return format_result(
+                response, self.server, self._result_format, self._response_cache
+            )
+        parse_start = time.perf_counter()
+        try:
+            result = format_result(
+                response, self.server, self._result_format, self._response_cache
+            )
+        except (struct.error, UnicodeDecodeError) as error:
+            self._hooks.invalid_response(self.server, error)
+            raise
+        self._hooks.parse(self.server, response, time.perf_counter() - parse_start)
+        return result
+
+    def probe(self, count: int = 5, interval: float = 0.2) -> Dict[str, Any]:
+        """Measure latency with lightweight info probes.
+
+        Sends `count` InfoRequests `interval` seconds apart without waiting for
+        the replies, which are not parsed. Every probe is sent from a socket of
+        its own, so a lost or reordered reply does not shift the round trips of
+        the other probes. Times are taken with time.perf_counter_ns.
+
+        Returns min/avg/max/jitter in milliseconds (None without replies) and
+        the loss in percent.
+        """
+        self.logger.info("Sending %d latency probes", count)
+        server = self.server
+        payload = InfoRequest().as_bytes()
+        interval_ns = int(interval * 1e9)
+        timeout_ns = int(self._timeout * 1e9)
+        sent = 0
+        last_sent = 0
+        # Probe index -> round trip time, pending sockets are registered with
+        # their probe index and send time.
+        rtts: Dict[int, int] = {}
+        selector = selectors.DefaultSelector()
+        next_send = time.perf_counter_ns()
+
+        try:
+            while len(rtts) < count:
+                now = time.perf_counter_ns()
+                if sent < count and now >= next_send:
+                    probe = socket.socket(address_family(server.ip), socket.SOCK_DGRAM)
+                    probe.setblocking(False)
+                    probe.connect(server.as_tuple())
+                    last_sent = time.perf_counter_ns()
+                    selector.register(probe, selectors.EVENT_READ, (sent, last_sent))
+                    probe.send(payload)
+                    sent += 1
+                    next_send += interval_ns
+                    continue
+
+                if sent == count and not selector.get_map():
+                    break
+                wait_until = next_send if sent < count else last_sent + timeout_ns
+                if sent == count and now >= wait_until:
+                    break
+                for key, _ in selector.select(max(wait_until - now, 0) / 1e9):
+                    received_at = time.perf_counter_ns()
+                    try:
+                        response = key.fileobj.recv(PACKET_SIZE)
+                    except BlockingIOError:
+                        continue
+                    except ConnectionRefusedError:
+                        response = None
+                    if response is not None:
+                        # Only the first fragment of a split reply is counted.
+                        if (
+                            response[:4] != MULTIPLE_PACKET_HEADER
+                            and response[4:5] not in PROBE_RESPONSES
+                        ):
+                            continue
+                        index, sent_at = key.data
+                        rtts[index] = received_at - sent_at
+                    selector.unregister(key.fileobj)
+                    key.fileobj.close()
+        finally:
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+            selector.close()
+
+        return probe_statistics(count, [rtts[index] for index in sorted(rtts)])
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Request info, players and rules concurrently.
+
+        All three requests are sent at once and share a single challenge
+        fetch. Returns a dict with the "info", "players" and "rules" results,
+        each formatted like the result of the individual request and carrying
+        its own ping.
+
+        Requests still unanswered after the timeout are None, as many servers
+        disable A2S_RULES. Raises socket.timeout only if nothing answered.
+        """
+        self.logger.info("Sending snapshot request")
+        self._refresh_connection()
+        packets = {
+            "info": InfoRequest(),
+            "players": PlayersRequest(),
+            "rules": RulesRequest(),
+        }
+        challenge = self._challenges.get(self.server)
+        challenge = NO_CHALLENGE if challenge is None else challenge
+        sent_at: Dict[str, float] = {}
+        self._datagrams.clear()
+
+        def send(names: List[str]) -> None:
+            for name in names:
+                packets[name].challenge = challenge
+                self.logger.debug("Sending packet: %s", packets[name])
+                sent_at[name] = time.perf_counter()
+                self._connection.send(packets[name].as_bytes())
+
+        results: Dict[str, Any] = {}
+        deadline = time.monotonic() + self._timeout
+        send(list(packets))
+
+        try:
+            while len(results) < len(packets):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._connection.settimeout(remaining)
+                try:
+                    packet = self._receive()
+                except socket.timeout:
+                    break
+                received_at = time.perf_counter()
+                response_type = packet.read_byte()
+                packet.seek(0)
+                packet.read_long()
+
+                if response_type == ChallengeResponse.RESPONSE_HEADER:
+                    new_challenge = create_response(response_type, packet, 0).raw
+                    if new_challenge != challenge:
+                        # Resend everything still pending with the new challenge.
+                        challenge = new_challenge
+                        self._challenges.set(self.server, challenge)
+                        self.logger.debug("Retrying with challenge: %s", challenge)
+                        send([name for name in packets if name not in results])
+                    continue
+
+                name = SNAPSHOT_RESPONSES.get(response_type)
+                if name is None or name in results:
+                    self.logger.debug("Ignoring unexpected response %s", response_type)
+                    continue
+                ping = round((received_at - sent_at[name]) * 1000, 2)
+                response = create_response(response_type, packet, ping)
+                self.logger.debug("Received package: %s", response)
+                results[name] = self._format(response)
+        finally:
+            self._connection.settimeout(self._timeout)
+
+        if not results:
+            raise socket.timeout("Snapshot request timed out")
+        for name in packets:
+            if name not in results:
+                self.logger.debug("No %s response in snapshot", name)
+                results[name] = None
+        return results
+
     def request(request: Callable) -> Callable:
         def wrapper(self: "Query") -> Optional[Dict[str, Any]]:
             response = request(self)
-            result = response.result()
-            if result is not None:
-                result["server"] = {
-                    "ip": self.server.ip,
-                    "port": self.server.port,
-                    "ping": response.ping,
-                }
-            return result
+            return self._format(response)
 
         return wrapper
 
@@ -157,12 +586,20 @@ class Query:
         self.logger.info("Sending fake ping request")
 
         def fetch_ping(_: int) -> float:
-            return self.info().get("server").get("ping")
+            return self._send(InfoRequest()).ping
 
         total = sum(map(fetch_ping, range(num_requests)))
         average = round(total / num_requests, 2)
         return average
 
+    def fetch(self, request: str) -> ResponsePacket:
+        """Send a request and return the response packet without parsing it.
+
+        `request` is one of "info", "players" or "rules".
+        """
+        self.logger.info("Sending %s request", request)
+        return self._send(REQUEST_PACKETS[request]())
+
     @request
     def info(self) -> InfoResponseModel:
         """Request basic server information."""
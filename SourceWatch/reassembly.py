@@ -0,0 +1,234 @@
+"""
+Reassembly of split (multi-packet) responses.
+
+See: https://developer.valvesoftware.com/wiki/Server_queries#Multi-packet_Response_Format
+"""
+
+import bz2
+import logging
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+from .buffer import SteamPacketReader
+from .packet import SourceWatchError
+
+SINGLE_PACKET_RESPONSE = -1
+MULTIPLE_PACKET_RESPONSE = -2
+# Set in the request ID of split responses whose payload is bzip2 compressed.
+COMPRESSED_FLAG = 0x80000000
+# Upper bound for decompressed responses. Real responses stay far below.
+MAX_DECOMPRESSED_SIZE = 1 << 20
+
+
+class _PartialMessage:
+    __slots__ = ("fragments", "received", "deadline")
+
+    def __init__(self, total_packets: int, deadline: float) -> None:
+        self.fragments: List[Optional[bytes]] = [None] * total_packets
+        self.received = 0
+        self.deadline = deadline
+
+    def add(self, number: int, payload: bytes) -> None:
+        self.fragments[number] = payload
+        self.received += 1
+
+    def is_complete(self) -> bool:
+        return self.received == len(self.fragments)
+
+    def data(self) -> bytes:
+        return b"".join(self.fragments)
+
+
+class _CompressedMessage(_PartialMessage):
+    """Decompress the contiguous prefix of fragments as they arrive."""
+
+    __slots__ = (
+        "decompressor",
+        "decompressed",
+        "produced",
+        "size",
+        "checksum",
+        "next_fragment",
+        "max_size",
+    )
+
+    def __init__(self, total_packets: int, deadline: float, max_size: int) -> None:
+        super().__init__(total_packets, deadline)
+        self.decompressor = bz2.BZ2Decompressor()
+        self.decompressed: List[bytes] = []
+        self.produced = 0
+        self.size = 0
+        self.checksum = 0
+        self.next_fragment = 0
+        self.max_size = max_size
+
+    def add(self, number: int, payload: bytes) -> None:
+        if number == 0:
+            # The first fragment starts with the decompressed size and CRC32.
+            header = SteamPacketReader(payload)
+            try:
+                self.size = header.read_long()
+                self.checksum = header.read_long() & 0xFFFFFFFF
+            except struct.error as error:
+                raise SourceWatchError("Invalid compressed response") from error
+            if not 0 <= self.size <= self.max_size:
+                raise SourceWatchError("Invalid decompressed size", self.size)
+            payload = header.read()
+        super().add(number, payload)
+
+        while self.next_fragment < len(self.fragments):
+            fragment = self.fragments[self.next_fragment]
+            if fragment is None:
+                break
+            self._decompress(fragment)
+            # Keep the slot filled for duplicate detection, drop the data.
+            self.fragments[self.next_fragment] = b""
+            self.next_fragment += 1
+
+    def _decompress(self, data: bytes) -> None:
+        try:
+            chunk = self.decompressor.decompress(
+                data, self.max_size - self.produced + 1
+            )
+        except (EOFError, OSError) as error:
+            raise SourceWatchError("Invalid compressed response") from error
+        self.produced += len(chunk)
+        if self.produced > self.max_size:
+            raise SourceWatchError("Decompressed response too large")
+        self.decompressed.append(chunk)
+
+    def data(self) -> bytes:
+        data = b"".join(self.decompressed)
+        if not self.decompressor.eof or len(data) != self.size:
+            raise SourceWatchError("Decompressed size mismatch")
+        if zlib.crc32(data) != self.checksum:
+            raise SourceWatchError("CRC32 mismatch of decompressed response")
+        return data
+
+
+class Reassembler:
+    """Collect the fragments of split responses until they are complete.
+
+    Fragments are stored in a fixed-size slot array per request ID, so they
+    may arrive in any order and duplicates are dropped. Partial messages
+    expire `timeout` seconds after their first fragment arrived, and at most
+    `max_pending` of them are kept. Pass the source address to feed() when
+    datagrams of many servers arrive on a shared socket.
+
+    Bzip2 compressed responses are decompressed incrementally while their
+    fragments arrive. Responses decompressing to more than
+    `max_decompressed_size` bytes are rejected.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        max_pending: int = 1024,
+        max_decompressed_size: int = MAX_DECOMPRESSED_SIZE,
+    ) -> None:
+        self.logger = logging.getLogger("SourceWatch")
+        self._timeout = timeout
+        self._max_pending = max_pending
+        self._max_decompressed_size = max_decompressed_size
+        self._pending: "OrderedDict[Tuple[Hashable, int], _PartialMessage]" = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def expire(self) -> int:
+        """Drop partial messages past their deadline. Returns how many."""
+        now = time.monotonic()
+        expired = 0
+        # Deadlines grow with insertion order, the oldest message comes first.
+        while self._pending:
+            key, message = next(iter(self._pending.items()))
+            if message.deadline > now:
+                break
+            del self._pending[key]
+            expired += 1
+        if expired:
+            self.logger.debug("Expired %d partial responses", expired)
+        return expired
+
+    def feed(
+        self, datagram: bytes, source: Hashable = None
+    ) -> Optional[SteamPacketReader]:
+        """Add a received datagram.
+
+        Returns the complete response positioned after its packet header, or
+        None while fragments of a split response are still missing.
+        """
+        packet = SteamPacketReader(datagram)
+        try:
+            response_format = packet.read_long()
+            if response_format == SINGLE_PACKET_RESPONSE:
+                return packet
+            if response_format != MULTIPLE_PACKET_RESPONSE:
+                self.logger.error("Received invalid response type: %s", response_format)
+                raise SourceWatchError("Received invalid response type")
+
+            request_id = packet.read_long()
+            total_packets = packet.read_byte()
+            current_packet_number = packet.read_byte()
+            packet_size = packet.read_short()
+        except struct.error as error:
+            raise SourceWatchError("Truncated response") from error
+        payload = packet.read()
+
+        if current_packet_number >= total_packets:
+            raise SourceWatchError("Invalid fragment number", current_packet_number)
+        # Validate packet size matches what we received
+        if len(payload) != packet_size:
+            self.logger.debug(
+                "Packet size mismatch: expected %d, got %d", packet_size, len(payload)
+            )
+
+        self.expire()
+        key = (source, request_id)
+        message = self._pending.get(key)
+        if message is None or len(message.fragments) != total_packets:
+            message = self._add(key, total_packets, bool(request_id & COMPRESSED_FLAG))
+
+        if message.fragments[current_packet_number] is not None:
+            self.logger.debug("Dropping duplicate fragment %d", current_packet_number)
+            return None
+
+        try:
+            message.add(current_packet_number, payload)
+            if not message.is_complete():
+                return None
+            data = message.data()
+        except SourceWatchError:
+            del self._pending[key]
+            raise
+
+        del self._pending[key]
+        full_packet = SteamPacketReader(data)
+        try:
+            if full_packet.read_long() != SINGLE_PACKET_RESPONSE:
+                raise SourceWatchError("Invalid split response")
+        except struct.error as error:
+            raise SourceWatchError("Truncated response") from error
+        return full_packet
+
+    def _add(
+        self, key: Tuple[Hashable, int], total_packets: int, compressed: bool
+    ) -> _PartialMessage:
+        self._pending.pop(key, None)
+        while len(self._pending) >= self._max_pending:
+            self._pending.popitem(last=False)
+        deadline = time.monotonic() + self._timeout
+        if compressed:
+            self.logger.debug("Got compressed multiple packet response")
+            message: _PartialMessage = _CompressedMessage(
+                total_packets, deadline, self._max_decompressed_size
+            )
+        else:
+            message = _PartialMessage(total_packets, deadline)
+        self._pending[key] = message
+        return message
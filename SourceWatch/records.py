@@ -0,0 +1,161 @@
+"""
+Compact result records.
+
+Records are plain tuples, so they take a fraction of the memory of the
+nested dicts returned by default. Every record can be turned into the
+matching Pydantic model with to_model() when validation or serialization
+is needed.
+"""
+
+import sys
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .models import (
+    BasicServerModel,
+    GoldSrcResponseModel,
+    InfoResponseModel,
+    PlayerModel,
+    PlayersResponseModel,
+    RulesResponseModel,
+    SourceInfoResponseModel,
+)
+
+
+class ServerRecord(NamedTuple):
+    ip: str
+    port: int
+    ping: float
+
+    def to_model(self) -> BasicServerModel:
+        return BasicServerModel(**self._asdict())
+
+
+class SourceInfo(NamedTuple):
+    server_protocol_version: int
+    server_name: str
+    game_map: str
+    game_directory: str
+    game_title: str
+    game_app_id: int
+    players_current: int
+    players_max_slots: int
+    players_bots: int
+    server_type: str
+    server_os: str
+    server_password_protected: int
+    server_vac_secured: int
+    game_version: str
+    players_humans: int
+    players_free_slots: int
+    server_port: Optional[int] = None
+    server_steam_id: Optional[int] = None
+    server_spectator_port: Optional[int] = None
+    server_spectator_name: Optional[str] = None
+    server_tags: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, info: Dict[str, Any]) -> "SourceInfo":
+        return cls(**info)
+
+    def to_model(self) -> SourceInfoResponseModel:
+        return SourceInfoResponseModel(**self._asdict())
+
+
+class GoldSrcInfo(NamedTuple):
+    server_address: str
+    server_name: str
+    game_map: str
+    game_directory: str
+    game_title: str
+    players_current: int
+    players_max_slots: int
+    server_protocol_version: int
+    server_type: str
+    server_os: str
+    server_password_protected: int
+    game_mod: int
+    server_vac_secured: int
+    players_bots: int
+    players_humans: int
+    players_free_slots: int
+
+    @classmethod
+    def from_dict(cls, info: Dict[str, Any]) -> "GoldSrcInfo":
+        return cls(**info)
+
+    def to_model(self) -> GoldSrcResponseModel:
+        return GoldSrcResponseModel(**self._asdict())
+
+
+class Player(NamedTuple):
+    index: int
+    id: int
+    name: str
+    kills: int
+    play_time: float
+
+    @classmethod
+    def from_dict(cls, player: Dict[str, Any]) -> "Player":
+        return cls(**player)
+
+    def to_model(self) -> PlayerModel:
+        return PlayerModel(**self._asdict())
+
+
+class Rules(NamedTuple):
+    """Rule names and values stored side by side.
+
+    Names (and short values) are interned, as most servers of a game share
+    the same set of rules.
+    """
+
+    names: Tuple[str, ...]
+    values: Tuple[str, ...]
+
+    @classmethod
+    def from_dict(cls, rules: Dict[str, str]) -> "Rules":
+        return cls(
+            tuple(sys.intern(name) for name in rules),
+            tuple(sys.intern(v) if len(v) < 16 else v for v in rules.values()),
+        )
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        return zip(self.names, self.values)
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        try:
+            return self.values[self.names.index(name)]
+        except ValueError:
+            return default
+
+    def as_dict(self) -> Dict[str, str]:
+        return dict(self.items())
+
+
+class InfoResult(NamedTuple):
+    info: Union[SourceInfo, GoldSrcInfo]
+    server: ServerRecord
+
+    def to_model(self) -> InfoResponseModel:
+        return InfoResponseModel(
+            info=self.info.to_model(), server=self.server.to_model()
+        )
+
+
+class PlayersResult(NamedTuple):
+    players: Tuple[Player, ...]
+    server: ServerRecord
+
+    def to_model(self) -> PlayersResponseModel:
+        players: List[PlayerModel] = [player.to_model() for player in self.players]
+        return PlayersResponseModel(players=players, server=self.server.to_model())
+
+
+class RulesResult(NamedTuple):
+    rules: Rules
+    server: ServerRecord
+
+    def to_model(self) -> RulesResponseModel:
+        return RulesResponseModel(
+            rules=self.rules.as_dict(), server=self.server.to_model()
+        )
@@ -0,0 +1,201 @@
+"""
+Cached host name resolution.
+
+getaddrinfo() does not report the TTL of DNS records, so resolved addresses
+are cached for a configurable `ttl` and failed lookups for `negative_ttl`.
+IP address literals are returned in their canonical form without a lookup,
+the form recvfrom reports as source of replies.
+"""
+
+import asyncio
+import concurrent.futures
+import ipaddress
+import socket
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, NoReturn, Optional, Tuple, Union
+
+Resolved = Union[str, OSError]
+Lookups = Dict[str, "asyncio.Future[Resolved]"]
+
+
+def address_family(ip: str) -> int:
+    """Return the socket family of an IP address literal."""
+    return socket.AF_INET6 if ":" in ip else socket.AF_INET
+
+
+def canonical_ip(host: str) -> Optional[str]:
+    """Return the canonical form of an IP address literal, None otherwise."""
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return None
+    if address.version == 6 and not address.scope_id:
+        # inet_ntop matches recvfrom, e.g. ::ffff:1.2.3.4 for mapped addresses.
+        return socket.inet_ntop(socket.AF_INET6, address.packed)
+    return address.compressed
+
+
+def _raise(error: OSError) -> NoReturn:
+    # Raise a copy, re-raising the cached error would chain the tracebacks.
+    raise type(error)(*error.args)
+
+
+class Resolver:
+    """Resolve host names to IP addresses through an in-process cache.
+
+    `family` restricts the lookups to socket.AF_INET or socket.AF_INET6.
+    With socket.AF_UNSPEC the first address returned by getaddrinfo wins,
+    which follows the system's address selection rules.
+
+    Example usage:
+
+    resolver = SourceWatch.Resolver(ttl=600)
+    print(resolver.resolve('server.example.com'))
+    print(resolver.resolve_many(['a.example.com', 'b.example.com']))
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+        family: int = socket.AF_UNSPEC,
+        max_size: int = 100000,
+        max_workers: int = 32,
+    ) -> None:
+        if max_size < 1 or max_workers < 1:
+            raise ValueError("max_size and max_workers must be positive.")
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._family = family
+        self._max_size = max_size
+        self._max_workers = max_workers
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Resolved, float]]" = OrderedDict()
+        # Lookups in flight, per event loop: futures cannot be awaited from
+        # another loop, and the default resolver is shared by all of them.
+        self._pending: "weakref.WeakKeyDictionary[Any, Lookups]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _cached(self, host: str) -> Optional[Resolved]:
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None:
+                return None
+            result, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[host]
+                return None
+            self._entries.move_to_end(host)
+            return result
+
+    def _store(self, host: str, result: Resolved) -> None:
+        ttl = self._negative_ttl if isinstance(result, OSError) else self._ttl
+        with self._lock:
+            self._entries[host] = (result, time.monotonic() + ttl)
+            self._entries.move_to_end(host)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def _lookup(self, host: str) -> Resolved:
+        try:
+            addresses = socket.getaddrinfo(
+                host, None, family=self._family, type=socket.SOCK_DGRAM
+            )
+        except OSError as error:
+            return error
+        return addresses[0][4][0]
+
+    def resolve(self, host: str) -> str:
+        """Return the IP address of a host. Raises socket.gaierror."""
+        ip = canonical_ip(host)
+        if ip is not None:
+            return ip
+        result = self._cached(host)
+        if result is None:
+            result = self._lookup(host)
+            self._store(host, result)
+        if isinstance(result, OSError):
+            _raise(result)
+        return result
+
+    def resolve_many(self, hosts: Iterable[str]) -> Dict[str, Resolved]:
+        """Resolve many hosts concurrently on a thread pool.
+
+        Returns the IP address, or the error raised by the lookup, per host.
+        """
+        results: Dict[str, Resolved] = {}
+        missing = []
+        for host in dict.fromkeys(hosts):
+            cached = canonical_ip(host) or self._cached(host)
+            if cached is None:
+                missing.append(host)
+            else:
+                results[host] = cached
+
+        if missing:
+            workers = min(self._max_workers, len(missing))
+            with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+                for host, result in zip(missing, pool.map(self._lookup, missing)):
+                    self._store(host, result)
+                    results[host] = result
+        return results
+
+    async def resolve_async(self, host: str) -> str:
+        """Like resolve(), without blocking the event loop.
+
+        Concurrent lookups of the same host on an event loop share a single
+        getaddrinfo call.
+        """
+        ip = canonical_ip(host)
+        if ip is not None:
+            return ip
+        result = self._cached(host)
+        if result is None:
+            loop = asyncio.get_running_loop()
+            with self._lock:
+                lookups = self._pending.setdefault(loop, {})
+            pending = lookups.get(host)
+            if pending is None:
+                pending = loop.create_task(self._lookup_async(host))
+                lookups[host] = pending
+                pending.add_done_callback(lambda _: lookups.pop(host, None))
+            result = await asyncio.shield(pending)
+        if isinstance(result, OSError):
+            _raise(result)
+        return result
+
+    async def _lookup_async(self, host: str) -> Resolved:
+        loop = asyncio.get_running_loop()
+        try:
+            addresses = await loop.getaddrinfo(
+                host, None, family=self._family, type=socket.SOCK_DGRAM
+            )
+        except OSError as error:
+            result: Resolved = error
+        else:
+            result = addresses[0][4][0]
+        self._store(host, result)
+        return result
+
+    async def resolve_many_async(self, hosts: Iterable[str]) -> Dict[str, Resolved]:
+        """Like resolve_many(), on the running event loop."""
+        unique = list(dict.fromkeys(hosts))
+        results = await asyncio.gather(
+            *(self.resolve_async(host) for host in unique), return_exceptions=True
+        )
+        return dict(zip(unique, results))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by all queries which are not given a resolver of their own.
+default_resolver = Resolver()
@@ -0,0 +1,324 @@
+"""
+Query many servers at once over a small pool of shared UDP sockets.
+
+Replies are routed back to the pending request by the source address
+reported by recvfrom, so the number of open sockets does not grow with the
+number of servers.
+"""
+
+import asyncio
+import collections.abc
+import logging
+import socket
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+from .async_query import AsyncQuery, QueryProtocol, create_endpoint
+from .cache import ChallengeCache, ResponseCache
+from .packet import SourceWatchError
+from .query import Query
+from .resolver import Resolver, address_family, default_resolver
+from .scheduler import RttScheduler
+from .server import AnyServer, CompactServer, Server
+
+REQUESTS = ("info", "players", "rules")
+
+ScanTarget = Union[Server, CompactServer, Query, str]
+
+
+def as_server(target: ScanTarget) -> AnyServer:
+    """Turn a Query or "ip:port" string into a Server, keep servers as they are.
+
+    Host names are not resolved, the Server keeps the host name as its ip.
+    """
+    if isinstance(target, Query):
+        return Server(*target.address)
+    if isinstance(target, (Server, CompactServer)):
+        return target
+    if not isinstance(target, str):
+        raise TypeError(f"Unsupported server type {type(target).__name__}")
+    return Server.from_str(target)
+
+
+def resolve_server(server: AnyServer, ip: str) -> AnyServer:
+    """Return the server at the resolved `ip`, the server itself if unchanged."""
+    if server.ip == ip:
+        return server
+    return Server(ip, server.port)
+
+
+class ScanResult(NamedTuple):
+    """Outcome of a single request sent by the Scanner."""
+
+    server: AnyServer
+    request: str
+    result: Optional[dict]
+    error: Optional[Exception]
+
+
+class Scanner:
+    """
+    Example usage:
+
+    import asyncio
+    import SourceWatch
+
+    async def main():
+        servers = ['1.2.3.4:27015', SourceWatch.Server('5.6.7.8', 27016)]
+        async with SourceWatch.Scanner(requests=('info', 'players')) as scanner:
+            async for item in scanner.scan(servers):
+                print(item.server, item.request, item.result or item.error)
+
+    asyncio.run(main())
+    """
+
+    def __init__(
+        self,
+        requests: Sequence[str] = ("info",),
+        max_in_flight: int = 256,
+        timeout: int = 10,
+        sockets: int = 1,
+        challenge_cache: Optional[ChallengeCache] = None,
+        retries: int = 0,
+        scheduler: Optional[RttScheduler] = None,
+        response_cache: Optional[ResponseCache] = None,
+        resolver: Optional[Resolver] = None,
+    ) -> None:
+        """Timed out requests are retried up to `retries` times.
+
+        Once a server did not answer, its remaining requests are reported as
+        failed without being sent.
+
+        With a `scheduler`, request timeouts adapt to every server's round trip
+        times and servers which are not due are reported as skipped.
+
+        A shared `response_cache` skips decoding responses which did not
+        change since the last scan.
+
+        Host names are resolved concurrently through `resolver`. IPv6
+        servers are queried over separate sockets, opened on first use.
+        """
+        for request in requests:
+            if request not in REQUESTS:
+                raise ValueError(f"Unknown request type: {request}")
+        if max_in_flight < 1 or sockets < 1:
+            raise ValueError("max_in_flight and sockets must be positive.")
+        if retries < 0:
+            raise ValueError("retries must not be negative.")
+        self.logger = logging.getLogger("SourceWatch")
+        self._requests = tuple(requests)
+        self._max_in_flight = max_in_flight
+        self._timeout = timeout
+        self._sockets = sockets
+        self._retries = retries
+        self._scheduler = scheduler
+        self._response_cache = response_cache
+        self._resolver = resolver if resolver is not None else default_resolver
+        self._endpoints: Dict[int, List[QueryProtocol]] = {}
+        self._challenges = (
+            challenge_cache if challenge_cache is not None else ChallengeCache()
+        )
+
+    async def __aenter__(self) -> "Scanner":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    async def open(self, family: int = socket.AF_INET) -> None:
+        endpoints = self._endpoints.setdefault(family, [])
+        while len(endpoints) < self._sockets:
+            endpoint = await create_endpoint(family=family)
+            if len(endpoints) < self._sockets:
+                endpoints.append(endpoint)
+            else:
+                # Another worker opened the last socket in the meantime.
+                endpoint.transport.close()
+
+    def close(self) -> None:
+        for endpoints in self._endpoints.values():
+            for endpoint in endpoints:
+                endpoint.transport.close()
+        self._endpoints = {}
+
+    async def _endpoint(self, ip: str, index: int) -> QueryProtocol:
+        family = address_family(ip)
+        endpoints = self._endpoints.get(family)
+        if endpoints is None or len(endpoints) < self._sockets:
+            await self.open(family)
+            endpoints = self._endpoints[family]
+        return endpoints[index % len(endpoints)]
+
+    async def _query(
+        self,
+        server: AnyServer,
+        resolved: AnyServer,
+        endpoint: QueryProtocol,
+        results: asyncio.Queue,
+    ) -> None:
+        query = AsyncQuery(
+            resolved.ip,
+            resolved.port,
+            self._timeout,
+            protocol=endpoint,
+            challenge_cache=self._challenges,
+            scheduler=self._scheduler,
+            response_cache=self._response_cache,
+            resolver=self._resolver,
+            server=resolved,
+        )
+        timeout_error: Optional[Exception] = None
+        try:
+            for request in self._requests:
+                if timeout_error is not None:
+                    await results.put(ScanResult(server, request, None, timeout_error))
+                    continue
+                try:
+                    result = await self._request(query, request)
+                except asyncio.TimeoutError as error:
+                    timeout_error = error
+                    await results.put(ScanResult(server, request, None, error))
+                except Exception as error:
+                    self.logger.debug(
+                        "Request %s to %s failed: %r", request, server, error
+                    )
+                    await results.put(ScanResult(server, request, None, error))
+                else:
+                    await results.put(ScanResult(server, request, result, None))
+        finally:
+            query.close()
+
+    async def _request(self, query: AsyncQuery, request: str) -> Any:
+        for attempt in range(self._retries + 1):
+            try:
+                return await getattr(query, request)()
+            except asyncio.TimeoutError:
+                if attempt == self._retries:
+                    raise
+                self.logger.debug("Retrying %s request to %s", request, query.server)
+
+    async def _worker(
+        self,
+        next_target: Callable[[], Awaitable[ScanTarget]],
+        seen: set,
+        results: asyncio.Queue,
+    ) -> None:
+        while True:
+            try:
+                target = await next_target()
+            except StopAsyncIteration:
+                return
+            try:
+                server = as_server(target)
+            except (ValueError, TypeError) as error:
+                self.logger.warning("Skipping invalid server %r: %s", target, error)
+                continue
+
+            address = server.as_tuple()
+            if address in seen:
+                self.logger.debug("Skipping duplicate server %s", server)
+                continue
+            seen.add(address)
+
+            try:
+                ip = await self._resolver.resolve_async(server.ip)
+            except OSError as error:
+                for request in self._requests:
+                    await results.put(ScanResult(server, request, None, error))
+                continue
+
+            # The scheduler and caches are keyed on the resolved address.
+            resolved = resolve_server(server, ip)
+            if resolved is not server:
+                # Another spelling of a server which is already scanned.
+                if resolved.as_tuple() in seen:
+                    self.logger.debug(
+                        "Skipping %s, already scanned as %s", server, resolved
+                    )
+                    continue
+                seen.add(resolved.as_tuple())
+            if self._scheduler is not None and not self._scheduler.is_due(resolved):
+                error = SourceWatchError("Skipped unresponsive server", str(server))
+                for request in self._requests:
+                    await results.put(ScanResult(server, request, None, error))
+                continue
+
+            endpoint = await self._endpoint(ip, len(seen))
+            await self._query(server, resolved, endpoint, results)
+
+    async def scan(
+        self, servers: Union[Iterable[ScanTarget], AsyncIterable[ScanTarget]]
+    ) -> AsyncIterator[ScanResult]:
+        """Query all servers and yield the results as they complete.
+
+        `servers` may be an async iterable, such as MasterServer.servers_async(),
+        whose first servers are queried while later ones are still arriving.
+
+        Every address is scanned once: later duplicates, including other
+        spellings or host names resolving to an address already scanned, yield
+        no results. Invalid entries are logged and skipped as well.
+        """
+        await self.open()
+        if isinstance(servers, collections.abc.AsyncIterable):
+            targets = servers.__aiter__()
+            lock = asyncio.Lock()
+
+            async def next_target() -> ScanTarget:
+                # Async generators must not be advanced concurrently.
+                async with lock:
+                    return await targets.__anext__()
+
+        else:
+            iterator = iter(servers)
+
+            async def next_target() -> ScanTarget:
+                try:
+                    return next(iterator)
+                except StopIteration:
+                    raise StopAsyncIteration
+
+        seen: set = set()
+        results: asyncio.Queue = asyncio.Queue()
+        workers = [
+            asyncio.ensure_future(self._worker(next_target, seen, results))
+            for _ in range(self._max_in_flight)
+        ]
+        done = asyncio.ensure_future(asyncio.gather(*workers))
+
+        try:
+            while not (done.done() and results.empty()):
+                getter = asyncio.ensure_future(results.get())
+                await asyncio.wait({getter, done}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+            done.result()
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    def run(
+        self, servers: Union[Iterable[ScanTarget], AsyncIterable[ScanTarget]]
+    ) -> List[ScanResult]:
+        """Blocking helper collecting every result of a scan."""
+
+        async def collect() -> List[ScanResult]:
+            try:
+                return [item async for item in self.scan(servers)]
+            finally:
+                self.close()
+
+        return asyncio.run(collect())
@@ -0,0 +1,131 @@
+"""
+Adaptive per-server timeouts and retries.
+
+Round trip times are tracked the way TCP computes its retransmission timeout
+(RFC 6298): a smoothed RTT and an RTT variance per server, with the timeout
+set to SRTT + 4 * RTTVAR. Retries back off exponentially, and servers that
+keep failing are only probed again after a longer interval.
+
+A scheduler is thread safe, so one instance can back the workers of a
+QueryPool.
+"""
+
+import threading
+import time
+from typing import Dict, Hashable, Optional
+
+# Gains of the smoothed RTT and the RTT variance, as recommended by RFC 6298.
+ALPHA = 1 / 8
+BETA = 1 / 4
+
+
+class _ServerState:
+    __slots__ = ("srtt", "rttvar", "failures", "next_probe")
+
+    def __init__(self) -> None:
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.failures = 0
+        self.next_probe = 0.0
+
+
+class RttScheduler:
+    """Derive request timeouts from the round trip times seen per server.
+
+    Example usage:
+
+    scheduler = SourceWatch.RttScheduler(retries=2)
+    server = SourceWatch.Query('1.2.3.4', 27015, scheduler=scheduler)
+    print(server.info())
+    print(scheduler.timeout(server.server))
+    """
+
+    def __init__(
+        self,
+        initial_timeout: float = 2.0,
+        min_timeout: float = 0.2,
+        max_timeout: float = 10.0,
+        retries: int = 2,
+        backoff: float = 2.0,
+        dead_after: int = 3,
+        dead_interval: float = 300.0,
+    ) -> None:
+        """Timeouts are given in seconds.
+
+        After `dead_after` failed requests in a row a server is only due again
+        every `dead_interval` seconds.
+        """
+        if not 0 < min_timeout <= initial_timeout <= max_timeout:
+            raise ValueError(
+                "Expected 0 < min_timeout <= initial_timeout <= max_timeout."
+            )
+        if retries < 0 or backoff < 1 or dead_after < 1:
+            raise ValueError("Invalid retries, backoff or dead_after.")
+        self.retries = retries
+        self._initial_timeout = initial_timeout
+        self._min_timeout = min_timeout
+        self._max_timeout = max_timeout
+        self._backoff = backoff
+        self._dead_after = dead_after
+        self._dead_interval = dead_interval
+        self._lock = threading.Lock()
+        self._servers: Dict[Hashable, _ServerState] = {}
+
+    def __len__(self) -> int:
+        return len(self._servers)
+
+    def _state(self, server: Hashable) -> _ServerState:
+        state = self._servers.get(server)
+        if state is None:
+            state = self._servers[server] = _ServerState()
+        return state
+
+    def srtt(self, server: Hashable) -> Optional[float]:
+        """Smoothed round trip time in milliseconds, None if never answered."""
+        state = self._servers.get(server)
+        return None if state is None else state.srtt
+
+    def timeout(self, server: Hashable, attempt: int = 0) -> float:
+        """Timeout in seconds for the given (zero based) attempt of a request."""
+        with self._lock:
+            state = self._servers.get(server)
+            if state is None or state.srtt is None:
+                timeout = self._initial_timeout
+            else:
+                timeout = (state.srtt + 4 * state.rttvar) / 1000
+        timeout = max(timeout, self._min_timeout) * self._backoff**attempt
+        return min(timeout, self._max_timeout)
+
+    def observe(self, server: Hashable, rtt: float) -> None:
+        """Record a round trip time in milliseconds."""
+        with self._lock:
+            state = self._state(server)
+            if state.srtt is None:
+                state.srtt = rtt
+                state.rttvar = rtt / 2
+            else:
+                state.rttvar = (1 - BETA) * state.rttvar + BETA * abs(state.srtt - rtt)
+                state.srtt = (1 - ALPHA) * state.srtt + ALPHA * rtt
+            state.failures = 0
+            state.next_probe = 0.0
+
+    def failure(self, server: Hashable) -> None:
+        """Record a request which timed out after all retries."""
+        with self._lock:
+            state = self._state(server)
+            state.failures += 1
+            if state.failures >= self._dead_after:
+                state.next_probe = time.monotonic() + self._dead_interval
+
+    def is_dead(self, server: Hashable) -> bool:
+        state = self._servers.get(server)
+        return state is not None and state.failures >= self._dead_after
+
+    def is_due(self, server: Hashable) -> bool:
+        """Whether the server should be queried now."""
+        state = self._servers.get(server)
+        return state is None or state.next_probe <= time.monotonic()
+
+    def forget(self, server: Hashable) -> None:
+        with self._lock:
+            self._servers.pop(server, None)
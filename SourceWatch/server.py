@@ -2,41 +2,71 @@
 A server should have it's own reprensentation.
 """
 
+import socket
+from typing import Dict, Tuple, Union
+
+
+def validate_port(port: int) -> int:
+    if port < 1 or port > 65535:
+        raise ValueError("Invalid port range.")
+    return port
+
+
+def _split(server: str) -> Tuple[str, int]:
+    """Split "ip:port" or "[ipv6]:port" into its parts."""
+    try:
+        if server.startswith("["):
+            ip, separator, port = server[1:].partition("]:")
+            if not separator:
+                raise ValueError(server)
+        else:
+            ip, port = server.split(":")
+        return ip, int(port)
+    except ValueError:
+        raise ValueError(
+            'Invalid server format. Use "<IP-ADDRESS>:<PORT>" or "[<IPV6-ADDRESS>]:<PORT>"'
+        )
+
 
 class Server:
     @classmethod
     def from_str(cls, server: str):
         """Create a Server instance from a string.
-        Example: Server.from_str('10.0.0.3:27016')
+        Example: Server.from_str('10.0.0.3:27016') or Server.from_str('[::1]:27016')
         """
-        try:
-            ip, port = server.split(":")
-            return cls(ip, int(port))
-        except ValueError:
-            raise ValueError('Invalid server format. Use "<IP-ADDRESS>:<PORT>"')
+        return cls(*_split(server))
 
     def __init__(self, ip: str, port: int = 27015):
         self.ip = ip
         self.port = self._validate_port(port)
 
-    def __getattribute__(self, attr):
-        try:
-            return object.__getattribute__(self, attr)
-        except AttributeError:
-            return self.__dict__.get(attr, None)
+    def __getattr__(self, attr):
+        # Only called for missing attributes, which read as None.
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return None
 
     def __repr__(self):
         return f"<Server: {self}>"
 
     def __str__(self):
+        if ":" in self.ip:
+            return f"[{self.ip}]:{self.port}"
         return f"{self.ip}:{self.port}"
 
     def __eq__(self, other):
-        return isinstance(other, Server) and str(self) == str(other)
+        return (
+            isinstance(other, Server)
+            and self.port == other.port
+            and self.ip == other.ip
+        )
 
     def __ne__(self, other):
         return not (self == other)
 
+    def __hash__(self):
+        return hash(self.as_tuple())
+
     def __iter__(self):
         for attribute in self.__dict__:
             if not attribute.startswith("_"):
@@ -55,6 +85,152 @@ class Server:
         return (self.ip, self.port)
 
     def _validate_port(self, port: int):
-        if port < 1 or port > 65535:
-            raise ValueError("Invalid port range.")
-        return port
+        return validate_port(port)
+
+
+class CompactServer:
+    """Immutable server address for fleets of millions of servers.
+
+    The packed IP address and the port are kept in a single bytes object,
+    which also caches the hash, so instances are small and cheap to use as
+    dict keys. Instances are not equal to Server instances, convert those
+    with ServerRegistry.intern(). Only IP addresses are accepted, resolve
+    host names first.
+
+    Use a ServerRegistry to share one instance per address.
+    """
+
+    __slots__ = ("_address",)
+
+    def __init__(self, ip: str, port: int = 27015) -> None:
+        self._set(_pack(ip) + validate_port(port).to_bytes(2, "big"))
+
+    @classmethod
+    def _from_address(cls, address: bytes) -> "CompactServer":
+        server = cls.__new__(cls)
+        server._set(address)
+        return server
+
+    @classmethod
+    def from_str(cls, server: str) -> "CompactServer":
+        """See Server.from_str."""
+        return cls(*_split(server))
+
+    def _set(self, address: bytes) -> None:
+        object.__setattr__(self, "_address", address)
+
+    def __setattr__(self, attr, value):
+        raise AttributeError("CompactServer is immutable")
+
+    def __reduce__(self):
+        return (CompactServer, self.as_tuple())
+
+    @property
+    def ip(self) -> str:
+        return _unpack(self._address[:-2])
+
+    @property
+    def port(self) -> int:
+        return int.from_bytes(self._address[-2:], "big")
+
+    @property
+    def packed(self) -> bytes:
+        """The IP address in network byte order, 4 or 16 bytes."""
+        return self._address[:-2]
+
+    @property
+    def name(self) -> str:
+        return self.ip
+
+    def __repr__(self):
+        return f"<CompactServer: {self}>"
+
+    def __str__(self):
+        ip = self.ip
+        if len(self._address) > 6:
+            return f"[{ip}]:{self.port}"
+        return f"{ip}:{self.port}"
+
+    def __eq__(self, other):
+        return isinstance(other, CompactServer) and self._address == other._address
+
+    def __ne__(self, other):
+        return not (self == other)
+
+    def __hash__(self):
+        return hash(self._address)
+
+    def as_tuple(self) -> tuple:
+        """Return server IP and port as tuple."""
+        return (self.ip, self.port)
+
+
+AnyServer = Union[Server, CompactServer]
+
+
+def _pack(ip: str) -> bytes:
+    try:
+        if ":" in ip:
+            return socket.inet_pton(socket.AF_INET6, ip)
+        return socket.inet_pton(socket.AF_INET, ip)
+    except (OSError, TypeError):
+        raise ValueError(f"Invalid IP address: {ip!r}")
+
+
+def _unpack(packed: bytes) -> str:
+    family = socket.AF_INET6 if len(packed) == 16 else socket.AF_INET
+    return socket.inet_ntop(family, packed)
+
+
+class ServerRegistry:
+    """Intern CompactServer instances, so every address is a single object.
+
+    Scanner and QueryPool hand interned servers through to their queries, so
+    the scheduler, caches and results key on the same object, stored once.
+
+    Example usage:
+
+    registry = SourceWatch.ServerRegistry()
+    server = registry.get('1.2.3.4', 27015)
+    assert registry.from_str('1.2.3.4:27015') is server
+    """
+
+    def __init__(self) -> None:
+        self._servers: Dict[bytes, CompactServer] = {}
+
+    def __len__(self) -> int:
+        return len(self._servers)
+
+    def __contains__(self, server: AnyServer) -> bool:
+        return self._key(server.ip, server.port) in self._servers
+
+    def __iter__(self):
+        return iter(self._servers.values())
+
+    @staticmethod
+    def _key(ip: str, port: int) -> bytes:
+        return _pack(ip) + validate_port(port).to_bytes(2, "big")
+
+    def get(self, ip: str, port: int = 27015) -> CompactServer:
+        """Return the server with this address, creating it on first use."""
+        key = self._key(ip, port)
+        server = self._servers.get(key)
+        if server is None:
+            # setdefault keeps the first instance if threads race.
+            server = self._servers.setdefault(key, CompactServer._from_address(key))
+        return server
+
+    def from_str(self, server: str) -> CompactServer:
+        return self.get(*_split(server))
+
+    def intern(self, server: AnyServer) -> CompactServer:
+        """Return the registered instance for a Server or CompactServer."""
+        if isinstance(server, CompactServer):
+            return self._servers.setdefault(server._address, server)
+        return self.get(server.ip, server.port)
+
+    def forget(self, server: AnyServer) -> None:
+        self._servers.pop(self._key(server.ip, server.port), None)
+
+    def clear(self) -> None:
+        self._servers.clear()
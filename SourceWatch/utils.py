@@ -0,0 +1,13 @@
+"""
+Small helpers shared by the library and its command line tools.
+"""
+
+from typing import Iterator, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+def chunked(items: Sequence[T], size: int) -> Iterator[List[T]]:
+    """Split a sequence into lists of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield list(items[start : start + size])
@@ -0,0 +1,78 @@
+"""
+Decoding a burst of replies one by one vs with decode_batch().
+
+The per-packet path is the one of the receive loop: a reader, a response
+packet and format_result() per datagram.
+
+Usage: python -m benchmarks.batch [--replies 10000] [--repeat 5] [--workers 4]
+"""
+
+import argparse
+import json
+import timeit
+from typing import Callable, List
+
+from SourceWatch.batch import BatchItem, decode_batch
+from SourceWatch.buffer import SteamPacketReader
+from SourceWatch.packet import create_response
+from SourceWatch.query import SINGLE_PACKET_HEADER, format_result
+from SourceWatch.server import Server
+
+from .payloads import SIZES, info_payload, players_payload, rules_payload
+
+
+def burst(replies: int) -> List[BatchItem]:
+    total_players, total_rules = SIZES["typical"]
+    payloads = (info_payload(), players_payload(total_players), rules_payload(10))
+    return [
+        (
+            Server(f"10.0.{i // 256 % 256}.{i % 256}", 27015),
+            SINGLE_PACKET_HEADER + payloads[i % len(payloads)],
+            12.5,
+        )
+        for i in range(replies)
+    ]
+
+
+def per_packet(items: List[BatchItem]) -> Callable:
+    def run() -> None:
+        for server, data, rtt in items:
+            reader = SteamPacketReader(data)
+            reader.read_long()
+            response = create_response(data[4], reader, rtt)
+            format_result(response, server, "dict")
+
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--replies", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    items = burst(args.replies)
+    runs = {
+        "per_packet": per_packet(items),
+        "decode_batch": lambda: decode_batch(items),
+        f"decode_batch_{args.workers}_workers": lambda: decode_batch(
+            items, workers=args.workers
+        ),
+    }
+    for name, run in runs.items():
+        seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        print(
+            json.dumps(
+                {
+                    "benchmark": "batch",
+                    "decoder": name,
+                    "replies": args.replies,
+                    "replies_per_sec": round(args.replies / seconds),
+                }
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
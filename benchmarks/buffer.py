@@ -0,0 +1,89 @@
+"""
+Cost of the SteamPacketBuffer and SteamPacketReader primitives.
+
+Every read is repeated over a buffer holding `--count` values of its type,
+so the figures include the cursor handling of a real parse.
+
+Usage: python -m benchmarks.buffer [--count 1000] [--repeat 5]
+"""
+
+import argparse
+import json
+import timeit
+from typing import Callable, Dict, Tuple
+
+from SourceWatch.buffer import SteamPacketBuffer, SteamPacketReader
+
+# type -> (write method, sample value)
+VALUES: Dict[str, Tuple[str, object]] = {
+    "byte": ("write_byte", 7),
+    "short": ("write_short", 27015),
+    "long": ("write_long", -1),
+    "float": ("write_float", 61.5),
+    "long_long": ("write_long_long", 90071992547409920),
+    "string": ("write_string", "sm_plugin_setting"),
+}
+
+
+def encoded(kind: str, count: int) -> bytes:
+    method, value = VALUES[kind]
+    buffer = SteamPacketBuffer()
+    for _ in range(count):
+        getattr(buffer, method)(value)
+    return buffer.getvalue()
+
+
+def read_all(buffer_class: type, kind: str, data: bytes, count: int) -> Callable:
+    def run() -> None:
+        read = getattr(buffer_class(data), f"read_{kind}")
+        for _ in range(count):
+            read()
+
+    return run
+
+
+def write_all(kind: str, count: int) -> Callable:
+    method, value = VALUES[kind]
+
+    def run() -> None:
+        write = getattr(SteamPacketBuffer(), method)
+        for _ in range(count):
+            write(value)
+
+    return run
+
+
+def report(buffer_class: type, operation: str, seconds: float, count: int) -> None:
+    print(
+        json.dumps(
+            {
+                "benchmark": "buffer",
+                "class": buffer_class.__name__,
+                "operation": operation,
+                "nsec_per_op": round(seconds / count * 1e9, 1),
+            }
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for kind in VALUES:
+        data = encoded(kind, args.count)
+        for buffer_class in (SteamPacketBuffer, SteamPacketReader):
+            run = read_all(buffer_class, kind, data, args.count)
+            seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+            report(buffer_class, f"read_{kind}", seconds, args.count)
+
+        seconds = min(
+            timeit.repeat(write_all(kind, args.count), number=1, repeat=args.repeat)
+        )
+        report(SteamPacketBuffer, VALUES[kind][0], seconds, args.count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Compare two benchmark runs saved as JSON lines.
+
+Records are matched by their non-numeric fields (benchmark, request, size,
+...) and every numeric field is printed with its relative change.
+
+Usage:
+    python -m benchmarks.decode > before.ndjson
+    git checkout other-branch
+    python -m benchmarks.decode > after.ndjson
+    python -m benchmarks.compare before.ndjson after.ndjson
+"""
+
+import argparse
+import json
+from typing import Any, Dict, Iterable, Tuple
+
+Key = Tuple[Tuple[str, Any], ...]
+
+
+def load(lines: Iterable[str]) -> Dict[Key, Dict[str, float]]:
+    records = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        key = tuple(
+            (name, value)
+            for name, value in sorted(record.items())
+            if not isinstance(value, (int, float)) or isinstance(value, bool)
+        )
+        records[key] = {
+            name: value
+            for name, value in record.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+    return records
+
+
+def compare(
+    before: Dict[Key, Dict[str, float]], after: Dict[Key, Dict[str, float]]
+) -> Iterable[Dict[str, Any]]:
+    for key, old in before.items():
+        new = after.get(key)
+        if new is None:
+            continue
+        for metric, old_value in old.items():
+            if metric not in new:
+                continue
+            new_value = new[metric]
+            change = (new_value - old_value) / old_value * 100 if old_value else None
+            yield {
+                **dict(key),
+                "metric": metric,
+                "before": old_value,
+                "after": new_value,
+                "change_percent": None if change is None else round(change, 1),
+            }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("before", type=argparse.FileType("r"))
+    parser.add_argument("after", type=argparse.FileType("r"))
+    args = parser.parse_args()
+
+    with args.before, args.after:
+        before, after = load(args.before), load(args.after)
+    for row in compare(before, after):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
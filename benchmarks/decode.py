@@ -0,0 +1,78 @@
+"""
+Decode rates of the response packets for small, typical and huge payloads.
+
+Measures result(), which uses the fast decoders, and reference_result(),
+the step-by-step parser, on the same payloads. Info payloads do not depend
+on the size and are reported once with a null size.
+
+Usage: python -m benchmarks.decode [--number 500] [--repeat 5]
+"""
+
+import argparse
+import json
+import timeit
+from typing import Callable, Iterator, Optional, Tuple
+
+from SourceWatch.buffer import SteamPacketReader
+from SourceWatch.packet import create_response
+
+from .payloads import (
+    SIZES,
+    goldsrc_info_payload,
+    info_payload,
+    players_payload,
+    rules_payload,
+)
+
+PARSERS = ("result", "reference_result")
+
+
+def payloads() -> Iterator[Tuple[str, Optional[str], bytes]]:
+    """Yield (response class name, size, payload)."""
+    yield "InfoResponse", None, info_payload()
+    yield "InfoGoldSrcResponse", None, goldsrc_info_payload()
+    for size, (total_players, total_rules) in SIZES.items():
+        yield "PlayersResponse", size, players_payload(total_players)
+        yield "RulesResponse", size, rules_payload(total_rules)
+
+
+def decoder(payload: bytes, parser: str) -> Callable:
+    def run() -> None:
+        response = create_response(payload[0], SteamPacketReader(payload), 0.0)
+        getattr(response, parser)()
+
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for response, size, payload in payloads():
+        for name in PARSERS:
+            seconds = min(
+                timeit.repeat(
+                    decoder(payload, name), number=args.number, repeat=args.repeat
+                )
+            )
+            print(
+                json.dumps(
+                    {
+                        "benchmark": "decode",
+                        "response": response,
+                        "size": size,
+                        "payload_bytes": len(payload),
+                        "parser": name,
+                        "responses_per_sec": round(args.number / seconds),
+                        "mb_per_sec": round(
+                            len(payload) * args.number / seconds / 1e6, 2
+                        ),
+                    }
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Fleet aggregates, Python loops over info dicts vs the columnar FleetStore.
+
+Requires NumPy.
+
+Usage: python -m benchmarks.fleet [--servers 100000] [--repeat 5]
+"""
+
+import argparse
+import json
+import random
+import timeit
+from typing import Any, Callable, Dict, List
+
+from SourceWatch.fleet import FleetStore
+
+MAPS = ["de_dust2", "de_inferno", "de_nuke", "cs_office", "de_mirage", "de_train"]
+APP_IDS = [240, 730, 440, 4000, 550]
+
+
+def fleet_results(servers: int) -> List[Dict[str, Any]]:
+    rng = random.Random(1)
+    results = []
+    for _ in range(servers):
+        max_slots = rng.choice((16, 24, 32, 64))
+        players = rng.randint(0, max_slots)
+        results.append(
+            {
+                "info": {
+                    "game_map": rng.choice(MAPS),
+                    "game_directory": "cstrike",
+                    "game_app_id": rng.choice(APP_IDS),
+                    "players_current": players,
+                    "players_max_slots": max_slots,
+                    "players_bots": rng.randint(0, players),
+                },
+                "server": {"ping": rng.uniform(5, 200)},
+            }
+        )
+    return results
+
+
+def humans_per_app_loop(results: List[Dict[str, Any]]) -> Dict[int, int]:
+    totals: Dict[int, int] = {}
+    for result in results:
+        info = result["info"]
+        app_id = info["game_app_id"]
+        humans = info["players_current"] - info["players_bots"]
+        totals[app_id] = totals.get(app_id, 0) + humans
+    return totals
+
+
+def free_on_map_loop(results: List[Dict[str, Any]]) -> int:
+    return sum(
+        1
+        for result in results
+        if result["info"]["game_map"] == "de_dust2"
+        and result["info"]["players_max_slots"] > result["info"]["players_current"]
+    )
+
+
+def top_loop(results: List[Dict[str, Any]]) -> List[int]:
+    indices = range(len(results))
+    return sorted(
+        indices, key=lambda i: results[i]["info"]["players_current"], reverse=True
+    )[:10]
+
+
+def report(query: str, implementation: str, seconds: float, servers: int) -> None:
+    print(
+        json.dumps(
+            {
+                "benchmark": "fleet",
+                "query": query,
+                "implementation": implementation,
+                "servers": servers,
+                "ms": round(seconds * 1000, 3),
+            }
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--servers", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = fleet_results(args.servers)
+    fleet = FleetStore()
+    for index, result in enumerate(results):
+        fleet.update(index, result)
+
+    queries: Dict[str, Dict[str, Callable[[], Any]]] = {
+        "humans_per_app": {
+            "loop": lambda: humans_per_app_loop(results),
+            "fleet": lambda: fleet.group_by("game_app_id", "players_humans"),
+        },
+        "free_on_map": {
+            "loop": lambda: free_on_map_loop(results),
+            "fleet": lambda: int(
+                fleet.mask(game_map="de_dust2", min_free_slots=1).sum()
+            ),
+        },
+        "top_10": {
+            "loop": lambda: top_loop(results),
+            "fleet": lambda: fleet.top_k("players_current", 10),
+        },
+    }
+    for query, implementations in queries.items():
+        for implementation, run in implementations.items():
+            seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+            report(query, implementation, seconds, args.servers)
+
+
+if __name__ == "__main__":
+    main()
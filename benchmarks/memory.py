@@ -0,0 +1,73 @@
+"""
+Memory used per server snapshot, dict results vs compact records.
+
+Usage: python -m benchmarks.memory [--servers 2000] [--size typical]
+"""
+
+import argparse
+import json
+import tracemalloc
+
+from SourceWatch.buffer import SteamPacketReader
+from SourceWatch.packet import create_response
+from SourceWatch.query import format_result
+from SourceWatch.server import Server
+
+from .payloads import SIZES, info_payload, players_payload, rules_payload
+
+
+def snapshot(server: Server, payloads, result_format: str):
+    results = []
+    for payload in payloads:
+        buffer = SteamPacketReader(payload)
+        response = create_response(payload[0], buffer, 12.5)
+        results.append(format_result(response, server, result_format))
+    return results
+
+
+def measure(servers: int, size: str, result_format: str) -> float:
+    total_players, total_rules = SIZES[size]
+    fleet = [
+        (
+            Server(f"10.0.{i // 256 % 256}.{i % 256}", 27015),
+            (
+                info_payload(i),
+                players_payload(total_players),
+                rules_payload(total_rules),
+            ),
+        )
+        for i in range(servers)
+    ]
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    store = [snapshot(server, payloads, result_format) for server, payloads in fleet]
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    del store
+    return retained / servers
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--servers", type=int, default=2000)
+    parser.add_argument("--size", choices=sorted(SIZES), default="typical")
+    args = parser.parse_args()
+
+    for result_format in ("dict", "record"):
+        per_server = measure(args.servers, args.size, result_format)
+        print(
+            json.dumps(
+                {
+                    "benchmark": "memory_per_server",
+                    "size": args.size,
+                    "result_format": result_format,
+                    "bytes_per_server": round(per_server),
+                }
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Cost of the result formats for info, players and rules responses.
+
+Compares plain dicts, compact records and validated Pydantic models on the
+same recorded payloads.
+
+Usage: python -m benchmarks.models [--size typical] [--number 2000]
+"""
+
+import argparse
+import json
+import timeit
+
+from SourceWatch.buffer import SteamPacketReader
+from SourceWatch.packet import create_response
+from SourceWatch.query import RESULT_FORMATS, format_result
+from SourceWatch.server import Server
+
+from .payloads import SIZES, info_payload, players_payload, rules_payload
+
+
+def parse(payload: bytes, server: Server, result_format: str):
+    response = create_response(payload[0], SteamPacketReader(payload), 12.5)
+    return format_result(response, server, result_format)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", choices=sorted(SIZES), default="typical")
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    total_players, total_rules = SIZES[args.size]
+    payloads = {
+        "info": info_payload(),
+        "players": players_payload(total_players),
+        "rules": rules_payload(total_rules),
+    }
+    server = Server("10.0.0.1")
+
+    for request, payload in payloads.items():
+        for result_format in RESULT_FORMATS:
+            seconds = timeit.timeit(
+                lambda: parse(payload, server, result_format), number=args.number
+            )
+            print(
+                json.dumps(
+                    {
+                        "benchmark": "result_format",
+                        "request": request,
+                        "size": args.size,
+                        "result_format": result_format,
+                        "usec_per_response": round(seconds / args.number * 1e6, 2),
+                    }
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Recorded-style response payloads used by the benchmarks.
+
+The payloads start with the response header byte, exactly like the buffer
+handed to create_response() after the packet header has been stripped.
+"""
+
+from SourceWatch.buffer import SteamPacketBuffer
+from SourceWatch.packet import (
+    InfoGoldSrcResponse,
+    InfoResponse,
+    PlayersResponse,
+    RulesResponse,
+)
+
+# name -> (number of players, number of rules)
+SIZES = {
+    "small": (2, 10),
+    "typical": (24, 120),
+    "huge": (255, 1000),
+}
+
+
+def info_payload(index: int = 0) -> bytes:
+    buffer = SteamPacketBuffer()
+    buffer.write_byte(InfoResponse.RESPONSE_HEADER)
+    buffer.write_byte(17)
+    buffer.write_string(f"SourceWatch Benchmark Server #{index} | 24/7 Dust2")
+    buffer.write_string("de_dust2")
+    buffer.write_string("cstrike")
+    buffer.write_string("Counter-Strike: Source")
+    buffer.write_short(240)
+    buffer.write_byte(20)
+    buffer.write_byte(32)
+    buffer.write_byte(2)
+    buffer.write_char("d")
+    buffer.write_char("l")
+    buffer.write_byte(0)
+    buffer.write_byte(1)
+    buffer.write_string("9540945")
+    buffer.write_byte(0x80 | 0x10 | 0x20 | 0x01)
+    buffer.write_short(27015)
+    buffer.write_long_long(90071992547409920 + index)
+    buffer.write_string("alltalk,increased_maxplayers,secure")
+    buffer.write_long_long(240)
+    return buffer.getvalue()
+
+
+def goldsrc_info_payload(index: int = 0) -> bytes:
+    buffer = SteamPacketBuffer()
+    buffer.write_byte(InfoGoldSrcResponse.RESPONSE_HEADER)
+    buffer.write_string(f"10.0.{index // 256 % 256}.{index % 256}:27015")
+    buffer.write_string(f"SourceWatch GoldSrc Server #{index}")
+    buffer.write_string("de_inferno")
+    buffer.write_string("cstrike")
+    buffer.write_string("Counter-Strike")
+    for value in (12, 32, 48, ord("d"), ord("l"), 0, 0, 1, 0):
+        buffer.write_byte(value)
+    return buffer.getvalue()
+
+
+def players_payload(total_players: int) -> bytes:
+    buffer = SteamPacketBuffer()
+    buffer.write_byte(PlayersResponse.RESPONSE_HEADER)
+    buffer.write_byte(total_players)
+    for i in range(total_players):
+        buffer.write_byte(0)
+        buffer.write_string(f"Player with a fairly long name {i}")
+        buffer.write_long(i * 3)
+        buffer.write_float(i * 61.5)
+    return buffer.getvalue()
+
+
+def rules_payload(total_rules: int) -> bytes:
+    buffer = SteamPacketBuffer()
+    buffer.write_byte(RulesResponse.RESPONSE_HEADER)
+    buffer.write_short(total_rules)
+    for i in range(total_rules):
+        buffer.write_string(f"sm_plugin_setting_{i}")
+        buffer.write_string(str(i % 7))
+    return buffer.getvalue()
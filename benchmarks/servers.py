@@ -0,0 +1,74 @@
+"""
+Memory and dict lookup cost of Server vs CompactServer keys.
+
+Usage: python -m benchmarks.servers [--servers 100000] [--repeat 5]
+"""
+
+import argparse
+import json
+import timeit
+import tracemalloc
+from typing import Callable, Iterable, List
+
+from SourceWatch.server import CompactServer, Server, ServerRegistry
+
+
+def addresses(count: int) -> List[str]:
+    return [
+        f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}:27015" for i in range(count)
+    ]
+
+
+def interned(addresses: List[str]) -> ServerRegistry:
+    registry = ServerRegistry()
+    for address in addresses:
+        registry.from_str(address)
+    return registry
+
+
+def memory(build: Callable[[List[str]], Iterable], addresses: List[str]) -> float:
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    servers = build(addresses)
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del servers
+    return retained / len(addresses)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--servers", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    servers = addresses(args.servers)
+    builders = {
+        "Server": lambda servers: list(map(Server.from_str, servers)),
+        "CompactServer": lambda servers: list(map(CompactServer.from_str, servers)),
+        # Includes the registry itself.
+        "ServerRegistry": interned,
+    }
+    for name, build in builders.items():
+        table = dict.fromkeys(build(servers), 0)
+        # Look up with equal but distinct instances.
+        keys = list(build(servers))
+        seconds = min(
+            timeit.repeat(
+                lambda: [table[key] for key in keys], number=1, repeat=args.repeat
+            )
+        )
+        print(
+            json.dumps(
+                {
+                    "benchmark": "servers",
+                    "class": name,
+                    "bytes_per_server": round(memory(build, servers)),
+                    "lookup_ns": round(seconds / len(keys) * 1e9, 1),
+                }
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+End-to-end queries per second against the local A2S emulator.
+
+The emulated servers run on a background thread and serve as many players
+and rules as the chosen payload size. "sync" runs a single Query in a loop,
+"scan" runs a Scanner against all emulated servers at once. Timed out
+queries are counted as errors.
+
+Usage: python -m benchmarks.throughput [--size typical] [--queries 2000]
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import time
+from typing import Tuple
+
+from SourceWatch.emulator import Emulator, sample_server
+from SourceWatch.query import Query
+from SourceWatch.scanner import Scanner
+
+from .payloads import SIZES
+
+
+def start_emulator(size: str, ports: int) -> Emulator:
+    total_players, total_rules = SIZES[size]
+    servers = [
+        sample_server(index, total_players, total_rules) for index in range(ports)
+    ]
+    emulator = Emulator(servers, seed=0)
+    emulator.start_in_thread()
+    return emulator
+
+
+def run_sync(emulator: Emulator, request: str, queries: int) -> Tuple[int, int]:
+    """Return the number of queries sent and how many of them failed."""
+    query = Query(*emulator.addresses[0], timeout=1)
+    errors = 0
+    for _ in range(queries):
+        try:
+            getattr(query, request)()
+        except socket.timeout:
+            errors += 1
+    return queries, errors
+
+
+def run_scan(emulator: Emulator, request: str, queries: int) -> Tuple[int, int]:
+    """Scan all emulated servers repeatedly, see run_sync."""
+    targets = [f"{host}:{port}" for host, port in emulator.addresses]
+    rounds = max(1, queries // len(targets))
+
+    async def scan() -> int:
+        errors = 0
+        scanner = Scanner(requests=(request,), max_in_flight=len(targets), timeout=1)
+        async with scanner:
+            for _ in range(rounds):
+                async for item in scanner.scan(targets):
+                    errors += item.error is not None
+        return errors
+
+    return rounds * len(targets), asyncio.run(scan())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", choices=sorted(SIZES), default="typical")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--ports", type=int, default=100)
+    args = parser.parse_args()
+
+    emulator = start_emulator(args.size, args.ports)
+    try:
+        for mode, run in (("sync", run_sync), ("scan", run_scan)):
+            for request in ("info", "players", "rules"):
+                start = time.perf_counter()
+                queries, errors = run(emulator, request, args.queries)
+                seconds = time.perf_counter() - start
+                print(
+                    json.dumps(
+                        {
+                            "benchmark": "throughput",
+                            "mode": mode,
+                            "request": request,
+                            "size": args.size,
+                            "queries": queries,
+                            "errors": errors,
+                            "queries_per_sec": round(queries / seconds),
+                        }
+                    )
+                )
+    finally:
+        emulator.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Fake A2S servers and canned payloads shared by the tests.
+"""
+
+import asyncio
+import threading
+import SourceWatch
+
+CHALLENGE = 123456789
+
+
+def build_info_payload():
+    buffer = SourceWatch.buffer.SteamPacketBuffer()
+    buffer.write_long(-1)
+    buffer.write_byte(SourceWatch.packet.InfoResponse.RESPONSE_HEADER)
+    buffer.write_byte(17)  # server_protocol_version
+    buffer.write_string("Test Source Server")  # server_name
+    buffer.write_string("de_dust2")  # game_map
+    buffer.write_string("cstrike")  # game_directory
+    buffer.write_string("Counter-Strike: Source")  # game_title
+    buffer.write_short(240)  # game_app_id
+    buffer.write_byte(12)  # players_current
+    buffer.write_byte(24)  # players_max_slots
+    buffer.write_byte(2)  # players_bots
+    buffer.write_char("d")  # server_type
+    buffer.write_char("l")  # server_os
+    buffer.write_byte(0)  # server_password_protected
+    buffer.write_byte(1)  # server_vac_secured
+    buffer.write_string("1.0.0.0")  # game_version
+    return buffer.getvalue()
+
+
+def build_players_payload():
+    buffer = SourceWatch.buffer.SteamPacketBuffer()
+    buffer.write_long(-1)
+    buffer.write_byte(SourceWatch.packet.PlayersResponse.RESPONSE_HEADER)
+    buffer.write_byte(1)  # total players
+    buffer.write_byte(0)  # id
+    buffer.write_string("Gordon")  # name
+    buffer.write_long(42)  # kills
+    buffer.write_float(12.5)  # play_time
+    return buffer.getvalue()
+
+
+def build_rules_payload():
+    buffer = SourceWatch.buffer.SteamPacketBuffer()
+    buffer.write_long(-1)
+    buffer.write_byte(SourceWatch.packet.RulesResponse.RESPONSE_HEADER)
+    buffer.write_short(1)  # total rules
+    buffer.write_string("sv_gravity")
+    buffer.write_string("800")
+    return buffer.getvalue()
+
+
+def build_challenge_payload():
+    buffer = SourceWatch.buffer.SteamPacketBuffer()
+    buffer.write_long(-1)
+    buffer.write_byte(SourceWatch.packet.ChallengeResponse.RESPONSE_HEADER)
+    buffer.write_long(CHALLENGE)
+    return buffer.getvalue()
+
+
+class FakeServerProtocol(asyncio.DatagramProtocol):
+    """Answer A2S requests with canned responses."""
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.received = 0
+
+    def datagram_received(self, data, addr):
+        self.received += 1
+        packet = SourceWatch.buffer.SteamPacketBuffer(data)
+        packet.read_long()
+        header = packet.read_byte()
+
+        if header == SourceWatch.packet.InfoRequest.REQUEST_HEADER:
+            reply = build_info_payload()
+        else:
+            challenge = packet.read_long()
+            if challenge != CHALLENGE:
+                reply = build_challenge_payload()
+            elif header == SourceWatch.packet.PlayersRequest.REQUEST_HEADER:
+                reply = build_players_payload()
+            else:
+                reply = build_rules_payload()
+
+        self.transport.sendto(reply, addr)
+
+
+class StaleServerProtocol(FakeServerProtocol):
+    """Precede every reply with leftovers of earlier requests."""
+
+    def datagram_received(self, data, addr):
+        self.transport.sendto(build_players_payload(), addr)
+        self.transport.sendto(build_challenge_payload(), addr)
+        super().datagram_received(data, addr)
+
+
+class NoRulesServerProtocol(FakeServerProtocol):
+    """Answer everything but rules requests, like servers disabling A2S_RULES."""
+
+    def datagram_received(self, data, addr):
+        if data[4] == SourceWatch.packet.RulesRequest.REQUEST_HEADER:
+            challenge = int.from_bytes(data[5:9], "little", signed=True)
+            if challenge == CHALLENGE:
+                return
+        super().datagram_received(data, addr)
+
+
+class DroppingServerProtocol(FakeServerProtocol):
+    """Ignore the first request, answer all later ones."""
+
+    def datagram_received(self, data, addr):
+        if self.received == 0:
+            self.received += 1
+            return
+        super().datagram_received(data, addr)
+
+
+class ThreadedFakeServer:
+    """Run FakeServerProtocol on an event loop in a background thread."""
+
+    def __init__(self, protocol_factory=FakeServerProtocol):
+        self.loop = asyncio.new_event_loop()
+        self.transport, self.protocol = self.loop.run_until_complete(
+            self.loop.create_datagram_endpoint(
+                protocol_factory, local_addr=("127.0.0.1", 0)
+            )
+        )
+        self.port = self.transport.get_extra_info("sockname")[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.transport.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+def rules_response(payload):
+    reader = SourceWatch.buffer.SteamPacketReader(payload)
+    reader.read_long()
+    return SourceWatch.packet.RulesResponse(reader, 1.0)
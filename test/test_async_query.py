@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+import SourceWatch
+from test.helpers import (
+    CHALLENGE,
+    FakeServerProtocol,
+)
+
+
+class TestAsyncQuery(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        loop = asyncio.get_running_loop()
+        self.transport, self.fake_server = await loop.create_datagram_endpoint(
+            FakeServerProtocol, local_addr=("127.0.0.1", 0)
+        )
+        self.port = self.transport.get_extra_info("sockname")[1]
+
+    async def asyncTearDown(self):
+        self.transport.close()
+
+    async def test_info(self):
+        async with SourceWatch.AsyncQuery("127.0.0.1", self.port, timeout=1) as query:
+            result = await query.info()
+
+        self.assertEqual(result["info"]["server_name"], "Test Source Server")
+        self.assertEqual(result["info"]["players_humans"], 10)
+        self.assertEqual(result["server"]["ip"], "127.0.0.1")
+        self.assertEqual(result["server"]["port"], self.port)
+
+    async def test_players_and_rules(self):
+        async with SourceWatch.AsyncQuery("127.0.0.1", self.port, timeout=1) as query:
+            players = await query.players()
+            rules = await query.rules()
+
+        self.assertEqual(players["players"][0]["name"], "Gordon")
+        self.assertEqual(players["players"][0]["kills"], 42)
+        self.assertEqual(rules["rules"], {"sv_gravity": "800"})
+
+    async def test_warm_challenge_costs_one_round_trip(self):
+        cache = SourceWatch.ChallengeCache()
+        async with SourceWatch.AsyncQuery(
+            "127.0.0.1", self.port, timeout=1, challenge_cache=cache
+        ) as query:
+            # A cold request fetches the challenge from the 0x41 reply first.
+            await query.players()
+            self.assertEqual(self.fake_server.received, 2)
+
+            # Warm requests reuse the cached challenge.
+            players = await query.players()
+            self.assertEqual(self.fake_server.received, 3)
+
+        self.assertEqual(players["players"][0]["name"], "Gordon")
+        self.assertEqual(cache.get(query.server), CHALLENGE)
+
+    async def test_concurrent_queries(self):
+        queries = [
+            SourceWatch.AsyncQuery("127.0.0.1", self.port, timeout=1) for _ in range(10)
+        ]
+        results = await asyncio.gather(*(query.info() for query in queries))
+        for query in queries:
+            query.close()
+
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(r["info"]["game_map"] == "de_dust2" for r in results))
+
+    async def test_one_query_per_address_on_shared_protocol(self):
+        protocol = await SourceWatch.async_query.create_endpoint()
+        self.addCleanup(protocol.transport.close)
+        first = SourceWatch.AsyncQuery("127.0.0.1", self.port, protocol=protocol)
+        second = SourceWatch.AsyncQuery("127.0.0.1", self.port, protocol=protocol)
+
+        # When a second query of the same address joins the shared protocol
+        await first.info()
+        with self.assertRaises(SourceWatch.packet.SourceWatchError):
+            await second.info()
+
+        # Then it can once the first one is closed
+        first.close()
+        self.assertEqual((await second.info())["info"]["game_map"], "de_dust2")
+        second.close()
+        self.assertFalse(protocol.transport.is_closing())
+
+    async def test_timeout(self):
+        async with SourceWatch.AsyncQuery("127.0.0.1", 1, timeout=0.2) as query:
+            with self.assertRaises(asyncio.TimeoutError):
+                await query.info()
+
+
+if __name__ == "__main__":
+    unittest.main()
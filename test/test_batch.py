@@ -0,0 +1,72 @@
+import multiprocessing
+import unittest
+import SourceWatch
+from SourceWatch.batch import decode_batch
+from test.helpers import (
+    build_challenge_payload,
+    build_info_payload,
+    build_players_payload,
+    build_rules_payload,
+)
+
+
+def expected_result(server, payload, rtt):
+    reader = SourceWatch.buffer.SteamPacketReader(payload)
+    reader.read_long()
+    response = SourceWatch.packet.create_response(payload[4], reader, rtt)
+    return SourceWatch.query.format_result(response, server, "dict")
+
+
+class TestDecodeBatch(unittest.TestCase):
+    def setUp(self):
+        self.server = SourceWatch.Server("1.2.3.4", 27015)
+        self.payloads = [
+            build_info_payload(),
+            build_players_payload(),
+            build_rules_payload(),
+        ]
+
+    def test_results(self):
+        items = [(self.server, payload, 12.5) for payload in self.payloads]
+
+        results = decode_batch(items)
+
+        # Then every item matches the result of the per-packet path
+        self.assertEqual(
+            [item.request for item in results], ["info", "players", "rules"]
+        )
+        for item, payload in zip(results, self.payloads):
+            self.assertIsNone(item.error)
+            self.assertIs(item.server, self.server)
+            self.assertEqual(item.result, expected_result(self.server, payload, 12.5))
+
+    def test_errors_per_item(self):
+        items = [
+            (self.server, build_info_payload()[:12], 1.0),
+            (self.server, b"\xfe\xff\xff\xff" + build_rules_payload()[4:], 1.0),
+            (self.server, build_challenge_payload(), 1.0),
+            (self.server, b"", 1.0),
+            (self.server, build_rules_payload(), 1.0),
+        ]
+
+        results = decode_batch(items)
+
+        # Then the malformed items carry their error and the rest is decoded
+        self.assertEqual(
+            [item.request for item in results], ["info", None, None, None, "rules"]
+        )
+        for item in results[:4]:
+            self.assertIsNone(item.result)
+            self.assertIsInstance(item.error, Exception)
+        self.assertEqual(results[4].result["rules"], {"sv_gravity": "800"})
+
+    def test_pool(self):
+        items = [
+            (SourceWatch.Server("1.2.3.4", 27015 + index), payload, float(index))
+            for index, payload in enumerate(self.payloads * 3)
+        ]
+
+        with multiprocessing.Pool(2) as pool:
+            results = decode_batch(items, chunk_size=2, pool=pool)
+
+        self.assertEqual(results, decode_batch(items))
@@ -1,3 +1,4 @@
+import struct
 import unittest
 import SourceWatch
 
@@ -90,3 +91,72 @@ class TestBuffer(unittest.TestCase):
 
         # Than the message from the buffer should match our original message.
         self.assertEqual(message, decoded)
+
+
+class TestPacketReader(unittest.TestCase):
+    def setUp(self):
+        buffer = SourceWatch.buffer.SteamPacketBuffer()
+        buffer.write_long(-1)
+        buffer.write_byte(0x45)
+        buffer.write_short(-2)
+        buffer.write_string("sv_gravity")
+        buffer.write_float(1.5)
+        buffer.write_long_long(18446744073709551615)
+        buffer.write_char("d")
+        buffer.write_string("𝑯äḽϝ")
+        self.data = buffer.getvalue()
+
+    def test_reads_match_buffer(self):
+        # Given a reader over the serialized datagram
+        reader = SourceWatch.buffer.SteamPacketReader(self.data)
+
+        # When reading the values back in order
+        decoded = [
+            reader.read_long(),
+            reader.read_byte(),
+            reader.read_short(),
+            reader.read_string(),
+            reader.read_float(),
+            reader.read_long_long(),
+            reader.read_char(),
+            reader.read_string(),
+        ]
+
+        # Then they should match what the SteamPacketBuffer wrote.
+        expected = [-1, 0x45, -2, "sv_gravity", 1.5, 18446744073709551615, "d", "𝑯äḽϝ"]
+        self.assertEqual(decoded, expected)
+        self.assertEqual(reader.tell(), len(self.data))
+        self.assertEqual(len(reader), len(self.data))
+
+    def test_memoryview(self):
+        # Given a view into a larger receive buffer
+        received = bytearray(b"xx" + self.data)
+        reader = SourceWatch.buffer.SteamPacketReader(memoryview(received)[2:])
+
+        # When reading values from it
+        reader.seek(7)
+        decoded = [reader.read_string(), reader.read_float()]
+
+        # Then the view is wrapped without a copy and decodes the same values.
+        self.assertIs(reader.getvalue().obj, received)
+        self.assertEqual(decoded, ["sv_gravity", 1.5])
+        self.assertEqual(reader.read(8), self.data[22:30])
+
+    def test_seek_and_read(self):
+        reader = SourceWatch.buffer.SteamPacketReader(self.data)
+        reader.seek(4)
+
+        self.assertEqual(reader.read_byte(), 0x45)
+        self.assertEqual(reader.read(2), self.data[5:7])
+        reader.seek(0)
+        self.assertEqual(reader.read(), self.data)
+        self.assertEqual(reader.read(), b"")
+
+    def test_unterminated_string(self):
+        reader = SourceWatch.buffer.SteamPacketReader(b"abc")
+        self.assertEqual(reader.read_string(), "abc")
+        self.assertEqual(reader.read_string(), "")
+
+    def test_read_past_end(self):
+        reader = SourceWatch.buffer.SteamPacketReader(b"\x01")
+        self.assertRaises(struct.error, reader.read_short)
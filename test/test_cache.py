@@ -0,0 +1,142 @@
+import concurrent.futures
+import time
+import unittest
+from unittest import mock
+import SourceWatch
+from test.helpers import ThreadedFakeServer
+
+
+class TestChallengeCache(unittest.TestCase):
+    def setUp(self):
+        self.server = SourceWatch.Server("1.2.3.4")
+
+    def test_get_set(self):
+        cache = SourceWatch.ChallengeCache()
+        self.assertIsNone(cache.get(self.server))
+
+        cache.set(self.server, 1234)
+
+        # An equal Server instance maps to the same entry.
+        self.assertEqual(cache.get(SourceWatch.Server("1.2.3.4", 27015)), 1234)
+
+    def test_ttl(self):
+        cache = SourceWatch.ChallengeCache(ttl=10)
+        with mock.patch.object(time, "monotonic", return_value=100.0):
+            cache.set(self.server, 1234)
+        with mock.patch.object(time, "monotonic", return_value=111.0):
+            self.assertIsNone(cache.get(self.server))
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction(self):
+        cache = SourceWatch.ChallengeCache(max_size=2)
+        server_b = SourceWatch.Server("1.2.3.5")
+        server_c = SourceWatch.Server("1.2.3.6")
+
+        cache.set(self.server, 1)
+        cache.set(server_b, 2)
+        # Touch the first entry so the second one becomes least recently used.
+        cache.get(self.server)
+        cache.set(server_c, 3)
+
+        self.assertEqual(cache.get(self.server), 1)
+        self.assertIsNone(cache.get(server_b))
+        self.assertEqual(cache.get(server_c), 3)
+
+
+class TestConcurrentCaches(unittest.TestCase):
+    def test_threads(self):
+        challenges = SourceWatch.ChallengeCache(ttl=0, max_size=50)
+        responses = SourceWatch.ResponseCache(max_size=50)
+
+        def hammer(worker):
+            for i in range(2000):
+                server = SourceWatch.Server("10.0.0.1", 1 + (worker * 7 + i) % 200)
+                challenges.set(server, i)
+                challenges.get(server)
+                responses.set(server, b"digest", i)
+                responses.get(server, b"digest")
+
+        # When eight threads share both caches, evicting and expiring entries
+        with concurrent.futures.ThreadPoolExecutor(8) as pool:
+            futures = [pool.submit(hammer, worker) for worker in range(8)]
+
+        # Then no thread failed
+        for future in futures:
+            self.assertIsNone(future.result())
+        self.assertLessEqual(len(responses), 50)
+
+
+class TestRequestChallenge(unittest.TestCase):
+    def test_challenge_is_overwritten(self):
+        packet = SourceWatch.packet.PlayersRequest()
+        packet.challenge = -1
+        packet.challenge = 1234
+
+        self.assertEqual(packet.as_bytes(), b"\xff\xff\xff\xffU\xd2\x04\x00\x00")
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_digest_mismatch(self):
+        cache = SourceWatch.ResponseCache()
+        cache.set("key", b"digest", {"rules": {}})
+
+        self.assertEqual(cache.get("key", b"digest"), {"rules": {}})
+        self.assertIsNone(cache.get("key", b"other"))
+        self.assertIsNone(cache.get("unknown", b"digest"))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_lru_eviction(self):
+        cache = SourceWatch.ResponseCache(max_size=2)
+        cache.set("a", b"1", 1)
+        cache.set("b", b"2", 2)
+        cache.get("a", b"1")
+        cache.set("c", b"3", 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b", b"2"))
+        self.assertEqual(cache.get("a", b"1"), 1)
+
+
+class TestQueryResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.fake_server = ThreadedFakeServer()
+        self.cache = SourceWatch.ResponseCache()
+
+    def tearDown(self):
+        self.fake_server.close()
+
+    def test_rules_are_decoded_once(self):
+        query = SourceWatch.Query(
+            "127.0.0.1", self.fake_server.port, timeout=1, response_cache=self.cache
+        )
+
+        first = query.rules()
+        with mock.patch.object(SourceWatch.packet, "decode_rules") as decode:
+            second = query.rules()
+
+        decode.assert_not_called()
+        self.assertEqual(second["rules"], {"sv_gravity": "800"})
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        # Each result carries its own server entry.
+        self.assertIsNot(first, second)
+        self.assertIsNot(first["server"], second["server"])
+
+    def test_records(self):
+        query = SourceWatch.Query(
+            "127.0.0.1",
+            self.fake_server.port,
+            timeout=1,
+            result_format="record",
+            response_cache=self.cache,
+        )
+
+        first = query.players()
+        second = query.players()
+
+        self.assertIs(first.players, second.players)
+        self.assertEqual(second.server.port, self.fake_server.port)
+        self.assertEqual(self.cache.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+from unittest import mock
+import SourceWatch
+from SourceWatch import changes
+from test.helpers import build_rules_payload, rules_response
+
+
+def player(name, kills, play_time=1.0):
+    return {"index": 0, "id": 0, "name": name, "kills": kills, "play_time": play_time}
+
+
+class TestSnapshotStore(unittest.TestCase):
+    def setUp(self):
+        self.server = SourceWatch.Server("1.2.3.4")
+        self.store = SourceWatch.SnapshotStore()
+
+    def test_info(self):
+        self.store.update(self.server, "info", {"info": {"game_map": "de_dust2"}})
+
+        # When the map and nothing else changes
+        result = {"info": {"game_map": "de_nuke"}, "server": {"ping": 12.0}}
+        diff = self.store.update(self.server, "info", result)
+
+        # Then a single map change is reported
+        self.assertEqual(
+            diff,
+            [
+                SourceWatch.Change(
+                    self.server, changes.MAP_CHANGED, "game_map", "de_dust2", "de_nuke"
+                )
+            ],
+        )
+
+    def test_players(self):
+        self.store.update(
+            self.server,
+            "players",
+            {"players": [player("Gordon", 1), player("Alyx", 2), player("Alyx", 0)]},
+        )
+
+        # When Gordon scores, one Alyx leaves, Barney joins and play times grow
+        diff = self.store.update(
+            self.server,
+            "players",
+            {
+                "players": [
+                    player("Gordon", 2, 5.0),
+                    player("Alyx", 2, 5.0),
+                    player("Barney", 0),
+                ]
+            },
+        )
+
+        kinds = {(change.kind, change.key) for change in diff}
+        self.assertEqual(
+            kinds,
+            {
+                (changes.PLAYER_CHANGED, "Gordon"),
+                (changes.PLAYER_LEFT, "Alyx"),
+                (changes.PLAYER_JOINED, "Barney"),
+            },
+        )
+        self.assertEqual(
+            list(self.store.get(self.server, "players")),
+            [("Gordon", 0), ("Alyx", 0), ("Barney", 0)],
+        )
+
+    def test_rules(self):
+        self.store.update(self.server, "rules", {"rules": {"a": "1", "b": "2"}})
+
+        diff = self.store.update(
+            self.server, "rules", {"rules": {"a": "1", "b": "3", "c": "4"}}
+        )
+        diff += self.store.update(self.server, "rules", {"rules": {"b": "3", "c": "4"}})
+
+        self.assertEqual(
+            [(change.kind, change.key, change.old, change.new) for change in diff],
+            [
+                (changes.RULE_CHANGED, "b", "2", "3"),
+                (changes.RULE_ADDED, "c", None, "4"),
+                (changes.RULE_REMOVED, "a", "1", None),
+            ],
+        )
+
+    def test_first_result(self):
+        diff = self.store.update(self.server, "rules", {"rules": {"a": "1"}})
+
+        self.assertEqual(
+            diff, [SourceWatch.Change(self.server, changes.RULE_ADDED, "a", None, "1")]
+        )
+        self.assertEqual(self.store.get(self.server, "rules"), {"a": "1"})
+
+    def test_update_packet_skips_identical_payload(self):
+        payload = build_rules_payload()
+        first = self.store.update_packet(self.server, rules_response(payload))
+        self.assertEqual(len(first), 1)
+
+        # When the same bytes arrive again
+        response = rules_response(payload)
+        with mock.patch.object(response, "result") as result:
+            diff = self.store.update_packet(self.server, response)
+
+        # Then the response is not parsed and nothing changed
+        result.assert_not_called()
+        self.assertEqual(diff, [])
+
+    def test_forget(self):
+        self.store.update(self.server, "rules", {"rules": {}})
+        self.store.forget(self.server)
+
+        self.assertEqual(len(self.store), 0)
@@ -0,0 +1,136 @@
+import asyncio
+import socket
+import unittest
+import SourceWatch
+from SourceWatch import emulator
+from SourceWatch.decoders import decode_goldsrc_info, decode_info
+
+
+class TestEncoders(unittest.TestCase):
+    def test_info_roundtrip(self):
+        info = emulator.sample_server(0).info.model_copy(
+            update={
+                "game_app_id": 730,
+                "server_port": 27015,
+                "server_steam_id": 90071992547409920,
+                "server_spectator_port": 27020,
+                "server_spectator_name": "SourceTV",
+            }
+        )
+
+        payload = emulator.encode_info(info)
+
+        self.assertEqual(decode_info(payload, 1), info.model_dump())
+
+    def test_large_app_id(self):
+        info = emulator.sample_server(0).info.model_copy(update={"game_app_id": 440000})
+
+        decoded = decode_info(emulator.encode_info(info), 1)
+
+        self.assertEqual(decoded["game_app_id"], 440000)
+
+    def test_goldsrc_info_roundtrip(self):
+        info = SourceWatch.models.GoldSrcResponseModel(
+            server_address="127.0.0.1:27015",
+            server_name="GoldSrc",
+            game_map="de_inferno",
+            game_directory="cstrike",
+            game_title="Counter-Strike",
+            players_current=3,
+            players_max_slots=16,
+            server_protocol_version=47,
+            server_type="d",
+            server_os="w",
+            server_password_protected=0,
+            game_mod=0,
+            server_vac_secured=1,
+            players_bots=0,
+            players_humans=3,
+            players_free_slots=13,
+        )
+
+        payload = emulator.encode_goldsrc_info(info)
+
+        self.assertEqual(decode_goldsrc_info(payload, 1), info.model_dump())
+
+
+class TestEmulator(unittest.TestCase):
+    def serve(self, *servers, **options):
+        instance = emulator.Emulator(servers, seed=1, **options)
+        instance.start_in_thread()
+        self.addCleanup(instance.close)
+        return instance
+
+    def test_requests(self):
+        server = emulator.sample_server(0, players=3, rules=5)
+        instance = self.serve(server)
+        query = SourceWatch.Query(*instance.addresses[0], timeout=1)
+
+        info = query.info()["info"]
+        players = query.players()["players"]
+        rules = query.rules()["rules"]
+
+        self.assertEqual(info["server_name"], "SourceWatch Emulated Server #0")
+        self.assertEqual(
+            [player["name"] for player in players], [p.name for p in server.players]
+        )
+        self.assertEqual(rules, server.rules)
+        # Info, players with a challenge round trip, rules with the cached challenge.
+        self.assertEqual(instance.protocols[0].received, 4)
+
+    def test_split_compressed_reordered(self):
+        # Given rules too large for a single datagram
+        server = emulator.sample_server(
+            0, rules=500, compress=True, reorder=1.0, split_size=200
+        )
+        instance = self.serve(server)
+        query = SourceWatch.Query(*instance.addresses[0], timeout=1)
+
+        self.assertEqual(query.rules()["rules"], server.rules)
+
+    def test_info_challenge(self):
+        server = emulator.sample_server(0, info_challenge=True)
+        instance = self.serve(server)
+        query = SourceWatch.Query(*instance.addresses[0], timeout=1)
+
+        self.assertEqual(query.info()["info"]["game_map"], "de_dust2")
+        self.assertEqual(instance.protocols[0].received, 2)
+
+    def test_latency(self):
+        instance = self.serve(emulator.sample_server(0, latency=0.05))
+        query = SourceWatch.Query(*instance.addresses[0], timeout=1)
+
+        self.assertGreaterEqual(query.info()["server"]["ping"], 50)
+
+    def test_loss(self):
+        instance = self.serve(emulator.sample_server(0, loss=1.0))
+        query = SourceWatch.Query(*instance.addresses[0], timeout=0.1)
+
+        with self.assertRaises(socket.timeout):
+            query.info()
+
+    def test_update(self):
+        server = emulator.sample_server(0)
+        instance = self.serve(server)
+        query = SourceWatch.Query(*instance.addresses[0], timeout=1)
+        query.rules()
+
+        server.update(rules={"sv_gravity": "400"})
+
+        self.assertEqual(query.rules()["rules"], {"sv_gravity": "400"})
+
+
+class TestEmulatorScan(unittest.TestCase):
+    def test_many_servers(self):
+        servers = [emulator.sample_server(i, players=2, rules=3) for i in range(50)]
+
+        async def scan():
+            async with emulator.Emulator(servers) as instance:
+                targets = [f"{host}:{port}" for host, port in instance.addresses]
+                async with SourceWatch.Scanner(("info", "rules"), timeout=1) as scanner:
+                    return [item async for item in scanner.scan(targets)]
+
+        results = asyncio.run(scan())
+
+        self.assertEqual(len(results), 100)
+        self.assertTrue(all(item.error is None for item in results))
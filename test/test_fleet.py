@@ -0,0 +1,131 @@
+import unittest
+import SourceWatch
+from SourceWatch import fleet
+from test.helpers import build_info_payload, build_rules_payload, rules_response
+
+
+def info_result(game_map, players, bots=0, max_slots=24, app_id=240, ping=10.0):
+    return {
+        "info": {
+            "game_map": game_map,
+            "game_directory": "cstrike",
+            "game_app_id": app_id,
+            "players_current": players,
+            "players_max_slots": max_slots,
+            "players_bots": bots,
+        },
+        "server": {"ping": ping},
+    }
+
+
+@unittest.skipIf(fleet.np is None, "NumPy is not installed")
+class TestFleetStore(unittest.TestCase):
+    def setUp(self):
+        self.fleet = SourceWatch.FleetStore(capacity=2)
+        self.fleet.update("a", info_result("de_dust2", 10, bots=2))
+        self.fleet.update("b", info_result("de_dust2", 24, app_id=730, ping=20.0))
+        self.fleet.update("c", info_result("cs_office", 5, ping=80.0))
+
+    def test_app_ids(self):
+        # Given app ids decoded as signed short and as 64-bit GameID
+        self.fleet.update("d", info_result("de_dust2", 1, app_id=-10166))
+        self.fleet.update("e", info_result("de_dust2", 1, app_id=2**40 + 240))
+
+        app_ids = self.fleet.column("game_app_id")
+        self.assertEqual(app_ids[self.fleet.slot("d")], 55370)
+        self.assertEqual(app_ids[self.fleet.slot("e")], 240)
+
+    def test_invalid_result_is_not_stored(self):
+        # When a result does not fit the columns
+        with self.assertRaises(ValueError):
+            self.fleet.update("d", info_result("de_dust2", 70000))
+        with self.assertRaises(KeyError):
+            self.fleet.update("e", {"info": {"game_map": "de_dust2"}})
+
+        # Then no slot was taken
+        self.assertNotIn("d", self.fleet)
+        self.assertNotIn("e", self.fleet)
+        self.assertEqual(self.fleet.servers(), ["a", "b", "c"])
+
+    def test_update_in_place(self):
+        slot = self.fleet.slot("a")
+
+        # When a server reports a new result
+        self.assertEqual(self.fleet.update("a", info_result("de_nuke", 3)), slot)
+
+        # Then its slot is overwritten
+        self.assertEqual(len(self.fleet), 3)
+        self.assertEqual(self.fleet.column("players_current")[slot], 3)
+        self.assertEqual(self.fleet.servers(self.fleet.mask(game_map="de_nuke")), ["a"])
+
+    def test_mask(self):
+        mask = self.fleet.mask(game_map="de_dust2", min_free_slots=1)
+
+        self.assertEqual(self.fleet.servers(mask), ["a"])
+        self.assertEqual(self.fleet.servers(self.fleet.mask(max_ping=50)), ["a", "b"])
+        self.assertEqual(self.fleet.servers(self.fleet.mask(game_map="unknown")), [])
+
+    def test_group_by(self):
+        self.assertEqual(
+            self.fleet.group_by("game_app_id", "players_humans"), {240: 13, 730: 24}
+        )
+        self.assertEqual(
+            self.fleet.group_by("game_map", aggregate="count"),
+            {"de_dust2": 2, "cs_office": 1},
+        )
+        self.assertEqual(
+            self.fleet.group_by("game_map", "players_current", "max"),
+            {"de_dust2": 24, "cs_office": 5},
+        )
+        self.assertEqual(
+            self.fleet.group_by("game_map", "players_current", "mean"),
+            {"de_dust2": 17.0, "cs_office": 5.0},
+        )
+
+    def test_top_k(self):
+        self.assertEqual(self.fleet.top_k("players_current", 2), [("b", 24), ("a", 10)])
+        self.assertEqual(self.fleet.top_k("ping", 1, largest=False), [("a", 10.0)])
+
+        # Servers with an unknown ping never rank first.
+        self.fleet.update("d", info_result("de_dust2", 1, ping=float("nan")))
+        self.assertEqual(
+            self.fleet.top_k("ping", 4), [("c", 80.0), ("b", 20.0), ("a", 10.0)]
+        )
+        self.assertEqual(self.fleet.top_k("ping", 1, largest=False), [("a", 10.0)])
+
+    def test_remove(self):
+        self.fleet.remove("b")
+
+        # The slot is reused by the next server
+        self.assertEqual(self.fleet.servers(), ["a", "c"])
+        self.assertEqual(self.fleet.update("d", info_result("de_inferno", 1)), 1)
+        self.assertEqual(
+            self.fleet.group_by("game_app_id", aggregate="count"), {240: 3}
+        )
+
+    def test_update_record(self):
+        # Given an info result in the record format
+        payload = build_info_payload()
+        reader = SourceWatch.buffer.SteamPacketReader(payload)
+        reader.read_long()
+        response = SourceWatch.packet.create_response(payload[4], reader, 12.5)
+        record = SourceWatch.query.format_result(
+            response, SourceWatch.Server("10.0.0.1"), "record"
+        )
+
+        # When storing it
+        slot = self.fleet.update("d", record)
+
+        # Then it is stored like the dict result.
+        self.assertEqual(self.fleet.column("players_current")[slot], 12)
+        self.assertEqual(self.fleet.column("ping")[slot], 12.5)
+        self.assertIn("d", self.fleet.servers(self.fleet.mask(game_map="de_dust2")))
+
+        # Other result types are rejected before taking a slot.
+        with self.assertRaises(TypeError):
+            self.fleet.update("e", record.to_model())
+        self.assertNotIn("e", self.fleet)
+
+    def test_update_packet(self):
+        with self.assertRaises(ValueError):
+            self.fleet.update_packet("a", rules_response(build_rules_payload()))
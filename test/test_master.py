@@ -0,0 +1,99 @@
+import functools
+import socket
+import unittest
+import SourceWatch
+from SourceWatch import emulator, master
+from test.helpers import ThreadedFakeServer
+
+ADDRESSES = [(f"10.0.{i // 250}.{i % 250 + 1}", 27015 + i % 3) for i in range(500)]
+
+
+class LossyMasterProtocol(emulator.MasterEmulatorProtocol):
+    """Drop the first request and answer the second one twice."""
+
+    def datagram_received(self, data, addr):
+        if self.received == 0:
+            self.received += 1
+            return
+        super().datagram_received(data, addr)
+        if self.received == 2:
+            super().datagram_received(data, addr)
+
+
+class TestPages(unittest.TestCase):
+    def test_roundtrip(self):
+        page = master.encode_page(ADDRESSES[:3] + [master.LAST_ADDRESS])
+
+        servers = master.decode_page(page)
+
+        self.assertEqual([server.as_tuple() for server in servers], ADDRESSES[:3])
+
+    def test_invalid_page(self):
+        with self.assertRaises(SourceWatch.packet.SourceWatchError):
+            master.decode_page(b"\xff\xff\xff\xff\x66\x0a\x01")
+
+    def test_request(self):
+        request = master.build_request(
+            "1.2.3.4:27015", master.REGION_EUROPE, r"\appid\240"
+        )
+
+        self.assertEqual(
+            master.parse_request(request),
+            (master.REGION_EUROPE, "1.2.3.4:27015", r"\appid\240"),
+        )
+
+
+class TestMasterServer(unittest.TestCase):
+    def serve(self, protocol_factory):
+        fake_master = ThreadedFakeServer(protocol_factory)
+        self.addCleanup(fake_master.close)
+        return fake_master
+
+    def test_servers(self):
+        fake_master = self.serve(
+            functools.partial(emulator.MasterEmulatorProtocol, ADDRESSES)
+        )
+        client = SourceWatch.MasterServer("127.0.0.1", fake_master.port, timeout=1)
+
+        servers = list(client.servers())
+
+        self.assertEqual([server.as_tuple() for server in servers], ADDRESSES)
+        # One request per page of 231 addresses.
+        self.assertEqual(fake_master.protocol.received, 3)
+
+    def test_lost_and_duplicate_pages(self):
+        fake_master = self.serve(functools.partial(LossyMasterProtocol, ADDRESSES))
+        client = SourceWatch.MasterServer("127.0.0.1", fake_master.port, timeout=0.2)
+
+        servers = list(client.servers())
+
+        self.assertEqual([server.as_tuple() for server in servers], ADDRESSES)
+
+    def test_timeout(self):
+        silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        silent.bind(("127.0.0.1", 0))
+        self.addCleanup(silent.close)
+        client = SourceWatch.MasterServer(
+            "127.0.0.1", silent.getsockname()[1], timeout=0.05, retries=1
+        )
+
+        with self.assertRaises(socket.timeout):
+            list(client.servers())
+
+
+class TestMasterScan(unittest.IsolatedAsyncioTestCase):
+    async def test_scan_streamed_servers(self):
+        servers = [emulator.sample_server(index) for index in range(3)]
+        async with emulator.Emulator(servers, master_port=0) as instance:
+            client = SourceWatch.MasterServer(*instance.master_address, timeout=1)
+
+            # When scanning the servers while they are listed
+            async with SourceWatch.Scanner(timeout=1) as scanner:
+                results = [item async for item in scanner.scan(client.servers_async())]
+
+        # Then every listed server was queried
+        self.assertEqual(
+            sorted(item.server.as_tuple() for item in results),
+            sorted(instance.addresses),
+        )
+        self.assertTrue(all(item.error is None for item in results))
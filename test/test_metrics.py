@@ -0,0 +1,106 @@
+import concurrent.futures
+import socket
+import unittest
+import SourceWatch
+from SourceWatch.metrics import ExchangeStats, Histogram, render_prometheus
+from test.helpers import ThreadedFakeServer
+
+
+class TestHistogram(unittest.TestCase):
+    def test_observe(self):
+        histogram = Histogram((1, 2, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+
+        # Values equal to a bound count into that bucket, like Prometheus "le".
+        self.assertEqual(
+            histogram.cumulative(), [(1, 2), (2, 2), (5, 3), (float("inf"), 4)]
+        )
+        self.assertEqual(histogram.sum, 14.5)
+        self.assertEqual(histogram.quantile(0.5), 1)
+        self.assertEqual(histogram.quantile(0.75), 5)
+        self.assertIsNone(Histogram((1,)).quantile(0.5))
+
+
+class TestPrometheus(unittest.TestCase):
+    def test_render(self):
+        collector = SourceWatch.HistogramCollector()
+        packet = SourceWatch.InfoRequest()
+        collector.exchange(None, packet, ExchangeStats(0.002, 0.0, 25, 100, 1))
+        collector.timeout(None, packet)
+
+        text = render_prometheus(collector)
+
+        self.assertIn("# TYPE sourcewatch_first_byte_seconds histogram\n", text)
+        self.assertIn(
+            'sourcewatch_first_byte_seconds_bucket{request="InfoRequest",le="0.0025"} 1\n',
+            text,
+        )
+        self.assertIn(
+            'sourcewatch_first_byte_seconds_bucket{request="InfoRequest",le="+Inf"} 1\n',
+            text,
+        )
+        self.assertIn(
+            'sourcewatch_bytes_received_total{request="InfoRequest"} 100\n', text
+        )
+        self.assertIn('sourcewatch_timeouts_total{request="InfoRequest"} 1\n', text)
+
+    def test_threads(self):
+        collector = SourceWatch.HistogramCollector()
+        packet = SourceWatch.InfoRequest()
+
+        def hammer(worker):
+            for _ in range(1000):
+                collector.exchange(None, packet, ExchangeStats(0.002, 0.0, 25, 1, 1))
+                collector.timeout(None, packet)
+                render_prometheus(collector)
+
+        # When four threads report to and render a shared collector
+        with concurrent.futures.ThreadPoolExecutor(4) as pool:
+            futures = [pool.submit(hammer, worker) for worker in range(4)]
+
+        # Then no thread failed and no measurement was lost.
+        for future in futures:
+            self.assertIsNone(future.result())
+        key = ("first_byte_seconds", "InfoRequest")
+        self.assertEqual(collector.histograms[key].count, 4000)
+        self.assertEqual(collector.counters[("timeouts_total", "InfoRequest")], 4000)
+
+
+class TestQueryHooks(unittest.TestCase):
+    def test_hooks(self):
+        fake_server = ThreadedFakeServer()
+        self.addCleanup(fake_server.close)
+        collector = SourceWatch.HistogramCollector()
+        query = SourceWatch.Query(
+            "127.0.0.1", fake_server.port, timeout=1, hooks=collector
+        )
+
+        query.info()
+        query.rules()
+
+        histograms = collector.histograms
+        self.assertEqual(histograms[("dns_seconds", "")].count, 1)
+        # The rules request first fetches a challenge.
+        self.assertEqual(histograms[("challenge_seconds", "")].count, 1)
+        self.assertEqual(histograms[("first_byte_seconds", "RulesRequest")].count, 2)
+        self.assertEqual(histograms[("fragments", "InfoRequest")].sum, 1)
+        self.assertEqual(histograms[("parse_seconds", "InfoResponse")].count, 1)
+        self.assertEqual(histograms[("parse_seconds", "RulesResponse")].count, 1)
+        self.assertGreater(
+            collector.counters[("bytes_received_total", "InfoRequest")], 0
+        )
+
+    def test_timeout(self):
+        silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        silent.bind(("127.0.0.1", 0))
+        self.addCleanup(silent.close)
+        collector = SourceWatch.HistogramCollector()
+        query = SourceWatch.Query(
+            "127.0.0.1", silent.getsockname()[1], timeout=0.05, hooks=collector
+        )
+
+        with self.assertRaises(socket.timeout):
+            query.info()
+
+        self.assertEqual(collector.counters[("timeouts_total", "InfoRequest")], 1)
@@ -1,3 +1,4 @@
+import random
 import unittest
 import SourceWatch
 
@@ -155,5 +156,105 @@ class TestInfoGoldSrcResponse(unittest.TestCase):
         self.assertEqual(result["info"], expected_info)
 
 
+class TestFastDecoders(unittest.TestCase):
+    """The fast decoders must produce the same output as the reference parsers."""
+
+    def setUp(self):
+        self.random = random.Random(1337)
+
+    def random_string(self):
+        alphabet = "abcdefghijklmnopqrstuvwxyz_ 0123456789äöü𝑯"
+        return "".join(
+            self.random.choice(alphabet) for _ in range(self.random.randint(0, 24))
+        )
+
+    def assert_same_result(self, response_class, payload):
+        def parse(method):
+            buffer = SourceWatch.buffer.SteamPacketReader(payload)
+            return getattr(response_class(buffer, 0.0), method)()
+
+        self.assertEqual(parse("result"), parse("reference_result"))
+
+    def test_info(self):
+        for extra_data_flags in (None, 0x00, 0x80, 0x10, 0x40, 0x20, 0x01, 0xF1):
+            buffer = SourceWatch.buffer.SteamPacketBuffer()
+            buffer.write_byte(SourceWatch.packet.InfoResponse.RESPONSE_HEADER)
+            buffer.write_byte(self.random.randint(0, 255))
+            for _ in range(4):
+                buffer.write_string(self.random_string())
+            buffer.write_short(self.random.randint(-32768, 32767))
+            for _ in range(3):
+                buffer.write_byte(self.random.randint(0, 255))
+            buffer.write_char(self.random.choice("dlp"))
+            buffer.write_char(self.random.choice("lwmo"))
+            buffer.write_byte(self.random.randint(0, 1))
+            buffer.write_byte(self.random.randint(0, 1))
+            buffer.write_string(self.random_string())
+            if extra_data_flags is not None:
+                buffer.write_byte(extra_data_flags)
+                if extra_data_flags & 0x80:
+                    buffer.write_short(27015)
+                if extra_data_flags & 0x10:
+                    buffer.write_long_long(self.random.getrandbits(64))
+                if extra_data_flags & 0x40:
+                    buffer.write_short(27020)
+                    buffer.write_string(self.random_string())
+                if extra_data_flags & 0x20:
+                    buffer.write_string(self.random_string())
+                if extra_data_flags & 0x01:
+                    buffer.write_long_long(self.random.getrandbits(64))
+
+            self.assert_same_result(SourceWatch.packet.InfoResponse, buffer.getvalue())
+
+    def test_goldsrc_info(self):
+        for _ in range(20):
+            buffer = SourceWatch.buffer.SteamPacketBuffer()
+            buffer.write_byte(SourceWatch.packet.InfoGoldSrcResponse.RESPONSE_HEADER)
+            for _ in range(5):
+                buffer.write_string(self.random_string())
+            for _ in range(9):
+                buffer.write_byte(self.random.randint(0, 255))
+
+            self.assert_same_result(
+                SourceWatch.packet.InfoGoldSrcResponse, buffer.getvalue()
+            )
+
+    def test_players(self):
+        for total_players in (0, 1, 32, 255):
+            buffer = SourceWatch.buffer.SteamPacketBuffer()
+            buffer.write_byte(SourceWatch.packet.PlayersResponse.RESPONSE_HEADER)
+            buffer.write_byte(total_players)
+            for _ in range(total_players):
+                buffer.write_byte(self.random.randint(0, 255))
+                buffer.write_string(self.random_string())
+                buffer.write_long(self.random.randint(-(2**31), 2**31 - 1))
+                buffer.write_float(self.random.uniform(0, 100000))
+
+            self.assert_same_result(
+                SourceWatch.packet.PlayersResponse, buffer.getvalue()
+            )
+
+    def test_rules(self):
+        for total_rules in (0, 1, 150):
+            buffer = SourceWatch.buffer.SteamPacketBuffer()
+            buffer.write_byte(SourceWatch.packet.RulesResponse.RESPONSE_HEADER)
+            buffer.write_short(total_rules)
+            for _ in range(total_rules):
+                buffer.write_string(self.random_string())
+                buffer.write_string(self.random_string())
+
+            self.assert_same_result(SourceWatch.packet.RulesResponse, buffer.getvalue())
+
+    def test_truncated_rules(self):
+        # Servers sometimes announce more rules than fit into the response.
+        buffer = SourceWatch.buffer.SteamPacketBuffer()
+        buffer.write_byte(SourceWatch.packet.RulesResponse.RESPONSE_HEADER)
+        buffer.write_short(3)
+        buffer.write_string("sv_gravity")
+        buffer.write_string("800")
+
+        self.assert_same_result(SourceWatch.packet.RulesResponse, buffer.getvalue())
+
+
 if __name__ == "__main__":
     unittest.main()
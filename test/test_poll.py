@@ -0,0 +1,65 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from SourceWatch import poll
+from test.helpers import ThreadedFakeServer
+
+
+class TestPoll(unittest.TestCase):
+    def setUp(self):
+        self.fake_servers = [ThreadedFakeServer() for _ in range(3)]
+        self.directory = tempfile.TemporaryDirectory()
+        self.server_list = os.path.join(self.directory.name, "servers.txt")
+        self.output = os.path.join(self.directory.name, "results.ndjson")
+        with open(self.server_list, "w") as servers:
+            servers.write("# fleet\n\n")
+            for fake_server in self.fake_servers:
+                servers.write(f"127.0.0.1:{fake_server.port}\n")
+            servers.write("127.0.0.1:1  # dead\n")
+
+    def tearDown(self):
+        for fake_server in self.fake_servers:
+            fake_server.close()
+        self.directory.cleanup()
+
+    def run_poll(self, *args):
+        poll.main([self.server_list, "-o", self.output, "-t", "0.3", *args])
+        with open(self.output) as output:
+            return [json.loads(line) for line in output]
+
+    def test_poll(self):
+        # When polling info and rules with a single worker
+        results = self.run_poll("-w", "1", "-r", "info", "rules", "--retries", "0")
+
+        # Then every server and request got a line
+        self.assertEqual(len(results), 8)
+        failed = [r for r in results if r["error"]]
+        self.assertEqual({r["server"] for r in failed}, {"127.0.0.1:1"})
+        self.assertEqual(failed[0]["error"], "TimeoutError")
+        rules = [
+            r["result"] for r in results if r["request"] == "rules" and not r["error"]
+        ]
+        self.assertEqual(
+            rules,
+            [{"rules": {"sv_gravity": "800"}, "server": r["server"]} for r in rules],
+        )
+
+    def test_poll_worker_processes(self):
+        results = self.run_poll("-w", "2", "--chunk-size", "2", "--retries", "0")
+
+        self.assertEqual(len(results), 4)
+        ok = [r for r in results if not r["error"]]
+        self.assertEqual(len(ok), 3)
+        self.assertTrue(all(r["result"]["info"]["game_map"] == "de_dust2" for r in ok))
+
+    def test_read_servers(self):
+        lines = io.StringIO("1.2.3.4:27015\n  # comment\n\n5.6.7.8:27016 # x\n")
+        self.assertEqual(
+            list(poll.read_servers(lines)), ["1.2.3.4:27015", "5.6.7.8:27016"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import socket
+import unittest
+from unittest import mock
+import SourceWatch
+from test.helpers import ThreadedFakeServer
+
+
+class TestQueryPool(unittest.TestCase):
+    def setUp(self):
+        self.fake_servers = [ThreadedFakeServer(), ThreadedFakeServer()]
+        self.servers = [
+            f"127.0.0.1:{fake_server.port}" for fake_server in self.fake_servers
+        ]
+        self.pool = SourceWatch.QueryPool(
+            requests=("info", "players"), max_workers=4, timeout=1
+        )
+
+    def tearDown(self):
+        self.pool.close()
+        for fake_server in self.fake_servers:
+            fake_server.close()
+
+    def test_map(self):
+        # Given a server list with a closed port and an invalid entry
+        closed = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        closed.bind(("127.0.0.1", 0))
+        closed_port = closed.getsockname()[1]
+        closed.close()
+        servers = self.servers + ["not a server", f"127.0.0.1:{closed_port}"]
+
+        # When mapping over it
+        results = list(self.pool.map(servers))
+
+        # Then the results follow the input order and failures stay per server
+        self.assertEqual(
+            [(str(item.server), item.request) for item in results],
+            [
+                (server, request)
+                for server in self.servers + [f"127.0.0.1:{closed_port}"]
+                for request in ("info", "players")
+            ],
+        )
+        for item in results[:4]:
+            self.assertIsNone(item.error)
+        self.assertEqual(results[0].result["info"]["game_map"], "de_dust2")
+        self.assertEqual(results[1].result["players"][0]["name"], "Gordon")
+        for item in results[4:]:
+            self.assertIsNone(item.result)
+            self.assertIsInstance(item.error, OSError)
+
+    def test_as_completed(self):
+        results = list(self.pool.as_completed(self.servers))
+
+        self.assertEqual(len(results), 4)
+        self.assertEqual({str(item.server) for item in results}, set(self.servers))
+        self.assertTrue(all(item.error is None for item in results))
+
+    def test_queries_are_reused(self):
+        server = SourceWatch.Server("127.0.0.1", self.fake_servers[0].port)
+        list(self.pool.map([server]))
+        query = self.pool._idle[server.as_tuple()]
+        sockname = query._connection.getsockname()
+
+        # When polling the server again
+        list(self.pool.map([server]))
+
+        # Then the same socket is used
+        self.assertIs(self.pool._idle[server.as_tuple()], query)
+        self.assertEqual(query._connection.getsockname(), sockname)
+
+    def test_max_idle(self):
+        pool = SourceWatch.QueryPool(max_workers=1, timeout=1, max_idle=1)
+        with pool:
+            list(pool.map(self.servers))
+            self.assertEqual(len(pool._idle), 1)
+        self.assertEqual(len(pool._idle), 0)
+
+    def test_resolution_failure_stays_per_server(self):
+        # Given a lazy query of a host which does not resolve
+        pool = SourceWatch.QueryPool(timeout=1, resolver=SourceWatch.Resolver())
+        servers = [
+            SourceWatch.Query("missing.example.com", 27015, lazy=True),
+            self.servers[0],
+        ]
+
+        with pool, mock.patch.object(
+            socket, "getaddrinfo", side_effect=socket.gaierror("Name not known")
+        ):
+            results = list(pool.map(servers))
+
+        # Then only that server failed
+        self.assertEqual(len(results), 2)
+        self.assertIsInstance(results[0].error, socket.gaierror)
+        self.assertEqual(str(results[0].server), "missing.example.com:27015")
+        self.assertIsNone(results[1].error)
@@ -0,0 +1,207 @@
+import unittest
+import SourceWatch
+from test.helpers import (
+    CHALLENGE,
+    DroppingServerProtocol,
+    NoRulesServerProtocol,
+    StaleServerProtocol,
+    ThreadedFakeServer,
+    build_challenge_payload,
+    build_players_payload,
+)
+
+
+class TestQuery(unittest.TestCase):
+    def setUp(self):
+        self.fake_server = ThreadedFakeServer()
+        self.query = SourceWatch.Query("127.0.0.1", self.fake_server.port, timeout=1)
+
+    def tearDown(self):
+        self.fake_server.close()
+
+    def test_requests(self):
+        self.assertEqual(self.query.info()["info"]["game_map"], "de_dust2")
+        self.assertEqual(self.query.players()["players"][0]["name"], "Gordon")
+        self.assertEqual(self.query.rules()["rules"], {"sv_gravity": "800"})
+
+    def test_fetch_changes(self):
+        store = SourceWatch.SnapshotStore()
+
+        # When polling the unchanged rules twice
+        first = store.update_packet(self.query.server, self.query.fetch("rules"))
+        second = store.update_packet(self.query.server, self.query.fetch("rules"))
+
+        # Then only the first poll reports the rule
+        self.assertEqual([change.key for change in first], ["sv_gravity"])
+        self.assertEqual(second, [])
+
+    def test_snapshot(self):
+        # When requesting a cold snapshot
+        snapshot = self.query.snapshot()
+
+        # Then all results are there, each with its own ping
+        self.assertEqual(snapshot["info"]["info"]["server_name"], "Test Source Server")
+        self.assertEqual(snapshot["players"]["players"][0]["kills"], 42)
+        self.assertEqual(snapshot["rules"]["rules"], {"sv_gravity": "800"})
+        for name in ("info", "players", "rules"):
+            self.assertIn("ping", snapshot[name]["server"])
+
+        # And players and rules shared a single challenge fetch.
+        self.assertEqual(self.fake_server.protocol.received, 5)
+
+        # A warm snapshot costs one request per result.
+        self.query.snapshot()
+        self.assertEqual(self.fake_server.protocol.received, 8)
+
+    def test_snapshot_without_rules(self):
+        fake_server = ThreadedFakeServer(NoRulesServerProtocol)
+        self.addCleanup(fake_server.close)
+        query = SourceWatch.Query("127.0.0.1", fake_server.port, timeout=0.5)
+        self.addCleanup(query.close)
+
+        # When the server never answers the rules request
+        snapshot = query.snapshot()
+
+        # Then the other results are kept
+        self.assertEqual(snapshot["info"]["info"]["game_map"], "de_dust2")
+        self.assertEqual(snapshot["players"]["players"][0]["name"], "Gordon")
+        self.assertIsNone(snapshot["rules"])
+
+    def test_connection_reuse(self):
+        self.query.info()
+        sockname = self.query._connection.getsockname()
+
+        # When sending further challenge-based requests
+        self.query.players()
+        self.query.rules()
+
+        # Then they all went through the same socket
+        self.assertEqual(self.query._connection.getsockname(), sockname)
+
+    def test_reconnect_per_request(self):
+        query = SourceWatch.Query(
+            "127.0.0.1", self.fake_server.port, timeout=1, reuse_connection=False
+        )
+        query.players()
+        sockname = query._connection.getsockname()
+
+        query.rules()
+
+        self.assertNotEqual(query._connection.getsockname(), sockname)
+        query.close()
+
+    def test_close(self):
+        # Given a query used as a context manager
+        with SourceWatch.Query("127.0.0.1", self.fake_server.port, timeout=1) as query:
+            query.info()
+
+        # Then the socket is closed on exit
+        self.assertIsNone(query._connection)
+
+        # And a later request opens a new one
+        self.assertEqual(query.info()["info"]["game_map"], "de_dust2")
+        query.close()
+        query.close()
+
+    def test_probe(self):
+        stats = self.query.probe(count=3, interval=0.01)
+
+        self.assertEqual(stats["sent"], 3)
+        self.assertEqual(stats["received"], 3)
+        self.assertEqual(stats["loss"], 0.0)
+        self.assertLessEqual(stats["min"], stats["avg"])
+        self.assertLessEqual(stats["avg"], stats["max"])
+        self.assertGreaterEqual(stats["jitter"], 0.0)
+
+    def test_probe_matches_replies_to_their_probe(self):
+        # Given a server which drops the first probe
+        fake_server = ThreadedFakeServer(DroppingServerProtocol)
+        self.addCleanup(fake_server.close)
+        query = SourceWatch.Query("127.0.0.1", fake_server.port, timeout=0.5)
+        self.addCleanup(query.close)
+
+        stats = query.probe(count=3, interval=0.2)
+
+        # Then the later replies are not timed against earlier probes
+        self.assertEqual(stats["received"], 2)
+        self.assertLess(stats["max"], 100)
+
+    def test_probe_loss(self):
+        query = SourceWatch.Query("127.0.0.1", 1, timeout=0.1)
+        stats = query.probe(count=2, interval=0.01)
+
+        self.assertEqual(stats["received"], 0)
+        self.assertEqual(stats["loss"], 100.0)
+        self.assertIsNone(stats["avg"])
+
+
+class TestStaleResponses(unittest.TestCase):
+    def setUp(self):
+        self.fake_server = ThreadedFakeServer(StaleServerProtocol)
+
+    def tearDown(self):
+        self.fake_server.close()
+
+    def test_stale_responses_are_dropped(self):
+        with SourceWatch.Query("127.0.0.1", self.fake_server.port, timeout=1) as query:
+            # When stale players and challenge replies arrive first
+            info = query.info()
+            rules = query.rules()
+
+        # Then every request still gets the matching response
+        self.assertEqual(info["info"]["game_map"], "de_dust2")
+        self.assertEqual(rules["rules"], {"sv_gravity": "800"})
+
+    def test_is_expected_response(self):
+        def reader(payload):
+            result = SourceWatch.buffer.SteamPacketReader(payload)
+            result.read_long()
+            return result
+
+        packet = SourceWatch.packet.RulesRequest()
+        packet.challenge = SourceWatch.packet.NO_CHALLENGE
+        self.assertTrue(
+            SourceWatch.query.is_expected_response(
+                packet, reader(build_challenge_payload())
+            )
+        )
+        self.assertFalse(
+            SourceWatch.query.is_expected_response(
+                packet, reader(build_players_payload())
+            )
+        )
+
+        # A challenge equal to the one sent is a late reply to an earlier request.
+        packet.challenge = CHALLENGE
+        result = reader(build_challenge_payload())
+        self.assertFalse(SourceWatch.query.is_expected_response(packet, result))
+        self.assertEqual(result.tell(), 4)
+
+        # A challenge request is answered by a challenge, and nothing else.
+        packet = SourceWatch.packet.ChallengeRequest()
+        for payload, expected in (
+            (build_challenge_payload(), True),
+            (build_players_payload(), False),
+        ):
+            self.assertEqual(
+                SourceWatch.query.is_expected_response(packet, reader(payload)),
+                expected,
+            )
+
+
+class TestProbeStatistics(unittest.TestCase):
+    def test_statistics(self):
+        stats = SourceWatch.query.probe_statistics(
+            4, [10_000_000, 14_000_000, 12_000_000]
+        )
+
+        self.assertEqual(stats["received"], 3)
+        self.assertEqual(stats["loss"], 25.0)
+        self.assertEqual(stats["min"], 10.0)
+        self.assertEqual(stats["avg"], 12.0)
+        self.assertEqual(stats["max"], 14.0)
+        self.assertEqual(stats["jitter"], 3.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import bz2
+import time
+import unittest
+import zlib
+from unittest import mock
+import SourceWatch
+from SourceWatch.reassembly import Reassembler
+
+
+def split_response(payload, request_id, fragment_size, compress=False, size=None):
+    """Split a single packet response into multi-packet fragments."""
+    data = b"\xff\xff\xff\xff" + payload
+    if compress:
+        request_id |= -0x80000000
+        header = SourceWatch.buffer.SteamPacketBuffer()
+        header.write_long(len(data) if size is None else size)
+        header.write_long(
+            zlib.crc32(data) - (1 << 32 if zlib.crc32(data) >= 1 << 31 else 0)
+        )
+        data = header.getvalue() + bz2.compress(data)
+    chunks = [data[i : i + fragment_size] for i in range(0, len(data), fragment_size)]
+    fragments = []
+    for number, chunk in enumerate(chunks):
+        fragment = SourceWatch.buffer.SteamPacketBuffer()
+        fragment.write_long(-2)
+        fragment.write_long(request_id)
+        fragment.write_byte(len(chunks))
+        fragment.write_byte(number)
+        fragment.write_short(len(chunk))
+        fragment.write(chunk)
+        fragments.append(fragment.getvalue())
+    return fragments
+
+
+class TestReassembler(unittest.TestCase):
+    def setUp(self):
+        self.reassembler = Reassembler(timeout=5)
+        self.payload = b"E" + bytes(range(256)) * 4
+
+    def feed_all(self, fragments, source=None):
+        results = [self.reassembler.feed(f, source) for f in fragments]
+        return [r for r in results if r is not None]
+
+    def test_single_packet(self):
+        packet = self.reassembler.feed(b"\xff\xff\xff\xffI\x11")
+        self.assertEqual(packet.read(), b"I\x11")
+
+    def test_out_of_order_and_duplicates(self):
+        # Given fragments arriving reversed and with duplicates
+        fragments = split_response(self.payload, 7, 100)
+        received = fragments[::-1]
+        received[3:3] = [fragments[-1], fragments[-2]]
+
+        # When feeding them all
+        results = self.feed_all(received)
+
+        # Then the response is complete exactly once and in order.
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].read(), self.payload)
+        self.assertEqual(len(self.reassembler), 0)
+
+    def test_interleaved_sources(self):
+        # Given the same request ID used by two servers on a shared socket
+        payload_b = b"D" + b"x" * 500
+        fragments_a = split_response(self.payload, 1, 200)
+        fragments_b = split_response(payload_b, 1, 200)
+
+        results = {}
+        for fragment_a, fragment_b in zip(fragments_a, fragments_b + [None] * 10):
+            for source, fragment in (("a", fragment_a), ("b", fragment_b)):
+                if fragment is not None:
+                    packet = self.reassembler.feed(fragment, source)
+                    if packet is not None:
+                        results[source] = packet.read()
+
+        self.assertEqual(results, {"a": self.payload, "b": payload_b})
+
+    def test_expiry(self):
+        fragments = split_response(self.payload, 3, 300)
+        with mock.patch.object(time, "monotonic", return_value=100.0):
+            self.reassembler.feed(fragments[0])
+        self.assertEqual(len(self.reassembler), 1)
+
+        with mock.patch.object(time, "monotonic", return_value=106.0):
+            self.assertEqual(self.reassembler.expire(), 1)
+            # The remaining fragments alone cannot complete the response.
+            self.assertEqual(self.feed_all(fragments[1:]), [])
+
+    def test_max_pending(self):
+        reassembler = Reassembler(max_pending=2)
+        for request_id in range(3):
+            reassembler.feed(split_response(self.payload, request_id, 300)[0])
+        self.assertEqual(len(reassembler), 2)
+
+    def test_invalid(self):
+        self.assertRaises(
+            SourceWatch.packet.SourceWatchError, self.reassembler.feed, b"\x00" * 8
+        )
+        fragment = bytearray(split_response(self.payload, 1, 300)[0])
+        fragment[9] = 9  # fragment number beyond the total
+        self.assertRaises(
+            SourceWatch.packet.SourceWatchError, self.reassembler.feed, bytes(fragment)
+        )
+
+    def test_truncated(self):
+        fragment = split_response(self.payload, 1, 300)[0]
+        for datagram in (
+            b"\xff\xff",  # truncated single packet header
+            fragment[:9],  # truncated split packet header
+            # a complete split response shorter than its own header
+            split_response(b"", 1, 4)[0][:-2],
+        ):
+            with self.subTest(datagram=datagram):
+                with self.assertRaisesRegex(
+                    SourceWatch.packet.SourceWatchError, "Truncated response"
+                ):
+                    self.reassembler.feed(datagram)
+
+
+class TestCompressedReassembly(unittest.TestCase):
+    def setUp(self):
+        rules = [f"sv_setting_{i}\x00{i * 7919 % 1000}\x00" for i in range(1000)]
+        self.payload = b"E" + "".join(rules).encode()
+
+    def test_compressed(self):
+        # Given a compressed response arriving out of order
+        fragments = split_response(self.payload, 5, 100, compress=True)
+        self.assertGreater(len(fragments), 2)
+        fragments.insert(0, fragments.pop())
+
+        # When feeding all fragments
+        reassembler = Reassembler()
+        results = [reassembler.feed(f) for f in fragments]
+
+        # Then the decompressed payload is returned once complete.
+        self.assertTrue(all(r is None for r in results[:-1]))
+        self.assertEqual(results[-1].read(), self.payload)
+
+    def test_crc_mismatch(self):
+        fragments = split_response(self.payload, 5, 1000, compress=True)
+        first = bytearray(fragments[0])
+        first[16] ^= 0xFF  # corrupt the CRC32
+        fragments[0] = bytes(first)
+
+        reassembler = Reassembler()
+        with self.assertRaises(SourceWatch.packet.SourceWatchError):
+            for fragment in fragments:
+                reassembler.feed(fragment)
+        self.assertEqual(len(reassembler), 0)
+
+    def test_declared_size_too_large(self):
+        fragments = split_response(self.payload, 5, 1000, compress=True)
+        reassembler = Reassembler(max_decompressed_size=1000)
+        self.assertRaises(
+            SourceWatch.packet.SourceWatchError, reassembler.feed, fragments[0]
+        )
+
+    def test_decompression_bomb(self):
+        # Given a response lying about its decompressed size
+        fragments = split_response(self.payload, 5, 1000, compress=True, size=100)
+        reassembler = Reassembler(max_decompressed_size=1000)
+
+        # Then decompression stops as soon as the cap is exceeded.
+        with self.assertRaises(SourceWatch.packet.SourceWatchError):
+            for fragment in fragments:
+                reassembler.feed(fragment)
+
+
+if __name__ == "__main__":
+    unittest.main()
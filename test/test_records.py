@@ -0,0 +1,89 @@
+import unittest
+import SourceWatch
+from SourceWatch.records import InfoResult, PlayersResult, RulesResult, ServerRecord
+from test.helpers import (
+    build_info_payload,
+    build_players_payload,
+    build_rules_payload,
+)
+
+
+def create_response(payload):
+    buffer = SourceWatch.buffer.SteamPacketReader(payload)
+    buffer.read_long()
+    return SourceWatch.packet.create_response(payload[4], buffer, 10.0)
+
+
+class TestRecords(unittest.TestCase):
+    def setUp(self):
+        self.server = SourceWatch.Server("1.2.3.4")
+
+    def assert_record_matches_dict(self, payload):
+        # Given the same response parsed as dict and as record
+        expected = SourceWatch.query.format_result(
+            create_response(payload), self.server, "dict"
+        )
+        record = SourceWatch.query.format_result(
+            create_response(payload), self.server, "record"
+        )
+
+        # Then the Pydantic models built from both should be identical.
+        model_class = type(record.to_model())
+        self.assertEqual(record.to_model(), model_class.model_validate(expected))
+        self.assertEqual(record.server, ServerRecord("1.2.3.4", 27015, 10.0))
+        return record
+
+    def test_info(self):
+        record = self.assert_record_matches_dict(build_info_payload())
+        self.assertIsInstance(record, InfoResult)
+        self.assertEqual(record.info.game_map, "de_dust2")
+        self.assertIsNone(record.info.server_tags)
+
+    def test_players(self):
+        record = self.assert_record_matches_dict(build_players_payload())
+        self.assertIsInstance(record, PlayersResult)
+        self.assertEqual(record.players[0].name, "Gordon")
+
+    def test_rules(self):
+        record = self.assert_record_matches_dict(build_rules_payload())
+        self.assertIsInstance(record, RulesResult)
+        self.assertEqual(record.rules.get("sv_gravity"), "800")
+        self.assertIsNone(record.rules.get("sv_cheats"))
+        self.assertEqual(record.rules.as_dict(), {"sv_gravity": "800"})
+
+    def test_models(self):
+        for payload, model_class in (
+            (build_info_payload(), SourceWatch.models.InfoResponseModel),
+            (build_players_payload(), SourceWatch.models.PlayersResponseModel),
+            (build_rules_payload(), SourceWatch.models.RulesResponseModel),
+        ):
+            # Given a response parsed with the model result format
+            model = SourceWatch.query.format_result(
+                create_response(payload), self.server, "model"
+            )
+
+            # Then it should hold the same data as the dict result format.
+            expected = SourceWatch.query.format_result(
+                create_response(payload), self.server, "dict"
+            )
+            self.assertIsInstance(model, model_class)
+            self.assertEqual(model, model_class.model_validate(expected))
+
+    def test_info_model(self):
+        model = SourceWatch.query.format_result(
+            create_response(build_info_payload()), self.server, "model"
+        )
+
+        self.assertIsInstance(model.info, SourceWatch.models.SourceInfoResponseModel)
+        self.assertEqual(model.info.players_humans, 10)
+        self.assertIsNone(model.info.server_tags)
+        self.assertEqual(model.server.ping, 10.0)
+
+    def test_invalid_result_format(self):
+        self.assertRaises(
+            ValueError, SourceWatch.AsyncQuery, "1.2.3.4", result_format="foo"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
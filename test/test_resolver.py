@@ -0,0 +1,151 @@
+import asyncio
+import concurrent.futures
+import socket
+import threading
+import time
+import unittest
+from unittest import mock
+import SourceWatch
+from SourceWatch import emulator
+
+
+def addrinfo(ip):
+    family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+    return [(family, socket.SOCK_DGRAM, 17, "", (ip, 0))]
+
+
+class TestResolver(unittest.TestCase):
+    def setUp(self):
+        self.resolver = SourceWatch.Resolver(ttl=60, negative_ttl=5)
+        patcher = mock.patch.object(
+            socket, "getaddrinfo", return_value=addrinfo("10.0.0.1")
+        )
+        self.getaddrinfo = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_ip_literals(self):
+        self.assertEqual(self.resolver.resolve("1.2.3.4"), "1.2.3.4")
+        self.assertEqual(self.resolver.resolve("::1"), "::1")
+        # IPv6 literals come back in the canonical form recvfrom reports.
+        self.assertEqual(self.resolver.resolve("0:0:0:0:0:0:0:1"), "::1")
+        self.assertEqual(self.resolver.resolve("2001:0DB8::1"), "2001:db8::1")
+        self.assertEqual(self.resolver.resolve("::ffff:0102:0304"), "::ffff:1.2.3.4")
+        self.getaddrinfo.assert_not_called()
+
+    def test_cache(self):
+        with mock.patch.object(time, "monotonic", return_value=100.0):
+            self.assertEqual(self.resolver.resolve("example.com"), "10.0.0.1")
+            self.assertEqual(self.resolver.resolve("example.com"), "10.0.0.1")
+        self.assertEqual(self.getaddrinfo.call_count, 1)
+
+        # When the TTL passed
+        with mock.patch.object(time, "monotonic", return_value=161.0):
+            self.resolver.resolve("example.com")
+        # Then the host is looked up again
+        self.assertEqual(self.getaddrinfo.call_count, 2)
+
+    def test_negative_cache(self):
+        self.getaddrinfo.side_effect = socket.gaierror("Name or service not known")
+
+        errors = []
+        for _ in range(2):
+            with self.assertRaises(socket.gaierror) as context:
+                self.resolver.resolve("missing.example.com")
+            errors.append(context.exception)
+
+        self.assertEqual(self.getaddrinfo.call_count, 1)
+        # Every call raises a fresh error, not the cached instance.
+        self.assertIsNot(errors[0], errors[1])
+        self.assertEqual(errors[0].args, errors[1].args)
+
+    def test_resolve_many(self):
+        def lookup(host, *args, **kwargs):
+            if host == "missing.example.com":
+                raise socket.gaierror("Name or service not known")
+            return addrinfo("10.0.0.2")
+
+        self.getaddrinfo.side_effect = lookup
+
+        results = self.resolver.resolve_many(
+            ["a.example.com", "1.2.3.4", "missing.example.com", "a.example.com"]
+        )
+
+        self.assertEqual(results["a.example.com"], "10.0.0.2")
+        self.assertEqual(results["1.2.3.4"], "1.2.3.4")
+        self.assertIsInstance(results["missing.example.com"], socket.gaierror)
+        self.assertEqual(self.getaddrinfo.call_count, 2)
+
+    def test_resolve_async_coalesces_lookups(self):
+        async def resolve():
+            return await self.resolver.resolve_many_async(
+                ["a.example.com", "b.example.com"]
+            ), await asyncio.gather(
+                *(self.resolver.resolve_async("c.example.com") for _ in range(5))
+            )
+
+        many, same = asyncio.run(resolve())
+
+        self.assertEqual(
+            many, {"a.example.com": "10.0.0.1", "b.example.com": "10.0.0.1"}
+        )
+        self.assertEqual(same, ["10.0.0.1"] * 5)
+        self.assertEqual(self.getaddrinfo.call_count, 3)
+
+    def test_resolve_async_on_several_loops(self):
+        # Given lookups which only finish once both loops started theirs
+        barrier = threading.Barrier(2, timeout=5)
+
+        def lookup(*args, **kwargs):
+            barrier.wait()
+            return addrinfo("10.0.0.3")
+
+        self.getaddrinfo.side_effect = lookup
+
+        # When two threads resolve the same host on event loops of their own
+        def resolve():
+            return asyncio.run(self.resolver.resolve_async("a.example.com"))
+
+        with concurrent.futures.ThreadPoolExecutor(2) as pool:
+            futures = [pool.submit(resolve) for _ in range(2)]
+
+        # Then every loop awaited a lookup of its own.
+        self.assertEqual([f.result() for f in futures], ["10.0.0.3"] * 2)
+        self.assertEqual(self.getaddrinfo.call_count, 2)
+
+
+class TestQueryResolution(unittest.TestCase):
+    def test_lazy(self):
+        resolver = mock.Mock(spec=SourceWatch.Resolver)
+        resolver.resolve.return_value = "127.0.0.1"
+        instance = emulator.Emulator([emulator.sample_server(0)])
+        instance.start_in_thread()
+        self.addCleanup(instance.close)
+        port = instance.addresses[0][1]
+
+        query = SourceWatch.Query("emulator.test", port, resolver=resolver, lazy=True)
+        resolver.resolve.assert_not_called()
+
+        self.assertEqual(query.info()["info"]["game_map"], "de_dust2")
+        resolver.resolve.assert_called_once_with("emulator.test")
+
+    def test_ipv6(self):
+        if not socket.has_ipv6:
+            self.skipTest("IPv6 is not available")
+        instance = emulator.Emulator([emulator.sample_server(0)], host="::1")
+        try:
+            instance.start_in_thread()
+        except OSError:
+            self.skipTest("IPv6 loopback is not available")
+        self.addCleanup(instance.close)
+        port = instance.addresses[0][1]
+
+        query = SourceWatch.Query("::1", port, timeout=1)
+        # Non-canonical literals are routed by the canonical source address.
+        results = SourceWatch.Scanner(("rules",), timeout=1).run(
+            [f"[0:0:0:0:0:0:0:1]:{port}", f"[::1]:{port}"]
+        )
+
+        self.assertEqual(query.info()["server"]["ip"], "::1")
+        # And scanned once.
+        self.assertEqual(len(results), 1)
+        self.assertIsNone(results[0].error)
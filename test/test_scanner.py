@@ -0,0 +1,74 @@
+import asyncio
+import socket
+import unittest
+from unittest import mock
+import SourceWatch
+from test.helpers import FakeServerProtocol
+
+
+class TestScanner(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        loop = asyncio.get_running_loop()
+        self.transports = []
+        for _ in range(5):
+            transport, _ = await loop.create_datagram_endpoint(
+                FakeServerProtocol, local_addr=("127.0.0.1", 0)
+            )
+            self.transports.append(transport)
+        self.ports = [t.get_extra_info("sockname")[1] for t in self.transports]
+
+    async def asyncTearDown(self):
+        for transport in self.transports:
+            transport.close()
+
+    async def test_scan_many_servers(self):
+        # Given a mix of string and Server inputs, a duplicate and invalid ones
+        servers = [f"127.0.0.1:{port}" for port in self.ports]
+        servers += [SourceWatch.Server("127.0.0.1", self.ports[0]), None, ("x", 1)]
+
+        # When scanning all of them over a single socket
+        async with SourceWatch.Scanner(
+            requests=("info", "rules"), max_in_flight=2, timeout=1
+        ) as scanner:
+            results = [item async for item in scanner.scan(servers)]
+
+        # Then every unique, valid server answered every request
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(item.error is None for item in results))
+        self.assertEqual({item.server.port for item in results}, set(self.ports))
+        rules = [item.result for item in results if item.request == "rules"]
+        self.assertTrue(all(r["rules"] == {"sv_gravity": "800"} for r in rules))
+
+    async def test_scan_reports_failures(self):
+        async with SourceWatch.Scanner(timeout=0.2) as scanner:
+            results = [item async for item in scanner.scan(["127.0.0.1:1"])]
+
+        self.assertEqual(len(results), 1)
+        self.assertIsNone(results[0].result)
+        self.assertIsInstance(results[0].error, asyncio.TimeoutError)
+
+    async def test_scan_reports_resolution_failures(self):
+        # Given a lazy query of a host which does not resolve
+        query = SourceWatch.Query("missing.example.com", 27015, lazy=True)
+        servers = [query, f"127.0.0.1:{self.ports[0]}"]
+
+        # When scanning it next to a working server
+        with mock.patch.object(
+            socket, "getaddrinfo", side_effect=socket.gaierror("Name not known")
+        ):
+            async with SourceWatch.Scanner(
+                timeout=1, resolver=SourceWatch.Resolver()
+            ) as scanner:
+                results = [item async for item in scanner.scan(servers)]
+
+        # Then only the unresolvable server failed
+        errors = {str(item.server): item.error for item in results}
+        self.assertIsInstance(errors["missing.example.com:27015"], socket.gaierror)
+        self.assertIsNone(errors[f"127.0.0.1:{self.ports[0]}"])
+
+    def test_invalid_request(self):
+        self.assertRaises(ValueError, SourceWatch.Scanner, requests=("foo",))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+import concurrent.futures
+import socket
+import time
+import unittest
+from unittest import mock
+import SourceWatch
+from test.helpers import DroppingServerProtocol, ThreadedFakeServer
+
+
+class TestRttScheduler(unittest.TestCase):
+    def setUp(self):
+        self.server = SourceWatch.Server("1.2.3.4")
+
+    def test_initial_timeout(self):
+        scheduler = SourceWatch.RttScheduler(initial_timeout=2.0, max_timeout=10.0)
+
+        self.assertEqual(scheduler.timeout(self.server), 2.0)
+        self.assertEqual(scheduler.timeout(self.server, attempt=1), 4.0)
+        # Backoff is capped at max_timeout.
+        self.assertEqual(scheduler.timeout(self.server, attempt=5), 10.0)
+
+    def test_observe(self):
+        scheduler = SourceWatch.RttScheduler(min_timeout=0.01)
+
+        # Given a first sample of 100ms
+        scheduler.observe(self.server, 100.0)
+        # Then SRTT = 100 and RTTVAR = 50, so the timeout is 100 + 4 * 50 ms
+        self.assertEqual(scheduler.srtt(SourceWatch.Server("1.2.3.4")), 100.0)
+        self.assertAlmostEqual(scheduler.timeout(self.server), 0.3)
+
+        # When a second sample of 200ms arrives
+        scheduler.observe(self.server, 200.0)
+        # Then both estimates are smoothed
+        self.assertAlmostEqual(scheduler.srtt(self.server), 112.5)
+        self.assertAlmostEqual(
+            scheduler.timeout(self.server), (112.5 + 4 * 62.5) / 1000
+        )
+
+    def test_threads(self):
+        scheduler = SourceWatch.RttScheduler(dead_after=10**6)
+
+        def hammer(worker):
+            for i in range(1000):
+                scheduler.observe(SourceWatch.Server("10.0.0.1", 1 + i % 50), 10.0)
+                scheduler.failure(self.server)
+
+        # When eight threads record samples and failures on a shared scheduler
+        with concurrent.futures.ThreadPoolExecutor(8) as pool:
+            futures = [pool.submit(hammer, worker) for worker in range(8)]
+
+        # Then no thread failed and no failure was lost.
+        for future in futures:
+            self.assertIsNone(future.result())
+        self.assertEqual(scheduler._servers[self.server].failures, 8000)
+        self.assertEqual(len(scheduler), 51)
+
+    def test_min_timeout(self):
+        scheduler = SourceWatch.RttScheduler(min_timeout=0.2)
+        scheduler.observe(self.server, 1.0)
+
+        self.assertEqual(scheduler.timeout(self.server), 0.2)
+
+    def test_dead_server(self):
+        scheduler = SourceWatch.RttScheduler(dead_after=2, dead_interval=60)
+
+        with mock.patch.object(time, "monotonic", return_value=100.0):
+            scheduler.failure(self.server)
+            self.assertTrue(scheduler.is_due(self.server))
+            scheduler.failure(self.server)
+            self.assertTrue(scheduler.is_dead(self.server))
+            self.assertFalse(scheduler.is_due(self.server))
+        with mock.patch.object(time, "monotonic", return_value=160.0):
+            self.assertTrue(scheduler.is_due(self.server))
+
+        # An answer revives the server.
+        scheduler.observe(self.server, 50.0)
+        self.assertFalse(scheduler.is_dead(self.server))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            SourceWatch.RttScheduler(min_timeout=5, initial_timeout=1)
+        with self.assertRaises(ValueError):
+            SourceWatch.RttScheduler(backoff=0.5)
+
+
+class TestScheduledQuery(unittest.TestCase):
+    def test_retry(self):
+        fake_server = ThreadedFakeServer(DroppingServerProtocol)
+        self.addCleanup(fake_server.close)
+        scheduler = SourceWatch.RttScheduler(initial_timeout=0.2, retries=1)
+        query = SourceWatch.Query("127.0.0.1", fake_server.port, scheduler=scheduler)
+
+        # Given a server which drops the first request
+        result = query.info()
+
+        # Then the request is retried and its round trip time recorded
+        self.assertEqual(fake_server.protocol.received, 2)
+        self.assertEqual(result["info"]["server_name"], "Test Source Server")
+        self.assertIsNotNone(scheduler.srtt(query.server))
+
+    def test_failure(self):
+        scheduler = SourceWatch.RttScheduler(
+            initial_timeout=0.05, min_timeout=0.05, retries=1, dead_after=1
+        )
+        # Given a bound socket which never answers
+        silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        silent.bind(("127.0.0.1", 0))
+        self.addCleanup(silent.close)
+        port = silent.getsockname()[1]
+        query = SourceWatch.Query("127.0.0.1", port, scheduler=scheduler)
+
+        with self.assertRaises(socket.timeout):
+            query.info()
+
+        self.assertTrue(scheduler.is_dead(query.server))
+
+
+class TestScheduledScanner(unittest.TestCase):
+    def test_skip_dead_server(self):
+        server = SourceWatch.Server("127.0.0.1", 1)
+        scheduler = SourceWatch.RttScheduler(dead_after=1)
+        scheduler.failure(server)
+        scanner = SourceWatch.Scanner(requests=("info", "rules"), scheduler=scheduler)
+
+        results = scanner.run([server])
+
+        self.assertEqual(len(results), 2)
+        for result in results:
+            self.assertIsInstance(result.error, SourceWatch.packet.SourceWatchError)
+
+    def test_skip_dead_host_name(self):
+        scheduler = SourceWatch.RttScheduler(
+            initial_timeout=0.05, min_timeout=0.05, retries=0, dead_after=1
+        )
+        # Given a host name of a silent server
+        silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        silent.bind(("127.0.0.1", 0))
+        self.addCleanup(silent.close)
+        target = f"game.example.com:{silent.getsockname()[1]}"
+        resolver = SourceWatch.Resolver()
+
+        with mock.patch.object(
+            socket,
+            "getaddrinfo",
+            return_value=[
+                (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("127.0.0.1", 0))
+            ],
+        ):
+            # When scanning it twice, through the scanner and the pool
+            first = SourceWatch.Scanner(scheduler=scheduler, resolver=resolver).run(
+                [target]
+            )
+            with SourceWatch.QueryPool(scheduler=scheduler, resolver=resolver) as pool:
+                second = list(pool.map([target]))
+
+        # Then the failure is recorded under the resolved address and skipped
+        self.assertNotIsInstance(first[0].error, SourceWatch.packet.SourceWatchError)
+        self.assertIsInstance(second[0].error, SourceWatch.packet.SourceWatchError)
+        self.assertEqual(str(second[0].server), target)
+
+    def test_interned_server_is_the_key(self):
+        scheduler = SourceWatch.RttScheduler(
+            initial_timeout=0.05, min_timeout=0.05, retries=0, dead_after=1
+        )
+        silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        silent.bind(("127.0.0.1", 0))
+        self.addCleanup(silent.close)
+        registry = SourceWatch.ServerRegistry()
+        server = registry.get("127.0.0.1", silent.getsockname()[1])
+
+        # When scanning an interned server which does not answer
+        SourceWatch.Scanner(scheduler=scheduler).run([server])
+
+        # Then its failure is recorded under the interned object itself
+        self.assertEqual(len(scheduler), 1)
+        self.assertIs(next(iter(scheduler._servers)), server)
+        # And the pool skips it
+        with SourceWatch.QueryPool(scheduler=scheduler) as pool:
+            results = list(pool.map([registry.from_str(str(server))]))
+        self.assertIsInstance(results[0].error, SourceWatch.packet.SourceWatchError)
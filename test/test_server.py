@@ -1,3 +1,4 @@
+import pickle
 import unittest
 import SourceWatch
 
@@ -16,6 +17,13 @@ class TestServer(unittest.TestCase):
         self.assertEqual(server.ip, "1.2.3.4")
         self.assertEqual(server.port, 27016)
 
+    def test_from_str_ipv6(self):
+        server = SourceWatch.Server.from_str("[::1]:27016")
+
+        self.assertEqual(server.as_tuple(), ("::1", 27016))
+        self.assertEqual(str(server), "[::1]:27016")
+        self.assertRaises(ValueError, SourceWatch.Server.from_str, "[::1]")
+
     def test_equality(self):
         server_a = SourceWatch.Server("1.2.3.4")
         server_b = SourceWatch.Server("1.2.3.4", 27015)
@@ -39,3 +47,53 @@ class TestServer(unittest.TestCase):
     def test_none_existing_attribute(self):
         server = SourceWatch.Server("1.2.3.4")
         self.assertIsNone(server.foobar)
+
+
+class TestCompactServer(unittest.TestCase):
+    def test_equality(self):
+        compact = SourceWatch.CompactServer("1.2.3.4", 27015)
+        same = SourceWatch.CompactServer.from_str("1.2.3.4:27015")
+
+        self.assertEqual(compact, same)
+        self.assertEqual(hash(compact), hash(same))
+        self.assertEqual({compact: "cached"}[same], "cached")
+        self.assertNotEqual(compact, SourceWatch.CompactServer("1.2.3.4", 27016))
+        self.assertNotEqual(compact, SourceWatch.Server("1.2.3.4", 27015))
+
+    def test_attributes(self):
+        server = SourceWatch.CompactServer.from_str("[2001:db8::1]:27016")
+
+        self.assertEqual(server.as_tuple(), ("2001:db8::1", 27016))
+        self.assertEqual(str(server), "[2001:db8::1]:27016")
+        self.assertEqual(len(server.packed), 16)
+        self.assertFalse(hasattr(server, "__dict__"))
+        with self.assertRaises(AttributeError):
+            server.port = 1
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, SourceWatch.CompactServer, "example.com")
+        self.assertRaises(ValueError, SourceWatch.CompactServer, "1.2.3.4", 0)
+
+    def test_pickle(self):
+        server = SourceWatch.CompactServer("1.2.3.4", 27015)
+
+        self.assertEqual(pickle.loads(pickle.dumps(server)), server)
+
+
+class TestServerRegistry(unittest.TestCase):
+    def test_interning(self):
+        registry = SourceWatch.ServerRegistry()
+
+        server = registry.get("1.2.3.4", 27015)
+
+        # Every spelling of the address returns the same object
+        self.assertIs(registry.from_str("1.2.3.4:27015"), server)
+        self.assertIs(registry.intern(SourceWatch.Server("1.2.3.4")), server)
+        self.assertIs(registry.intern(SourceWatch.CompactServer("1.2.3.4")), server)
+        self.assertIs(
+            registry.get("2001:db8::1", 1), registry.get("2001:0db8:0:0:0:0:0:1", 1)
+        )
+        self.assertEqual(len(registry), 2)
+
+        registry.forget(server)
+        self.assertNotIn(server, registry)